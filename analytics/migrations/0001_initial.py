@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('doctors', '0004_doctor_availability'),
+        ('authentication', '0002_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpecializationRollup',
+            fields=[
+                ('specialization', models.CharField(choices=[('CARDIOLOGY', 'Cardiology'), ('DERMATOLOGY', 'Dermatology'), ('ENDOCRINOLOGY', 'Endocrinology'), ('GASTROENTEROLOGY', 'Gastroenterology'), ('GENERAL_PRACTICE', 'General Practice'), ('NEUROLOGY', 'Neurology'), ('ONCOLOGY', 'Oncology'), ('ORTHOPEDICS', 'Orthopedics'), ('PEDIATRICS', 'Pediatrics'), ('PSYCHIATRY', 'Psychiatry'), ('RADIOLOGY', 'Radiology'), ('SURGERY', 'Surgery'), ('UROLOGY', 'Urology')], max_length=50, primary_key=True, serialize=False)),
+                ('doctors', models.BigIntegerField(default=0)),
+                ('active_doctors', models.BigIntegerField(default=0)),
+                ('mappings', models.BigIntegerField(default=0)),
+                ('active_mappings', models.BigIntegerField(default=0)),
+                ('primary_mappings', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserRollup',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('patients', models.BigIntegerField(default=0)),
+                ('mappings', models.BigIntegerField(default=0)),
+                ('active_mappings', models.BigIntegerField(default=0)),
+                ('primary_mappings', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-patients', 'user'], name='user_rollup_patients_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DoctorCaseload',
+            fields=[
+                ('doctor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='caseload', serialize=False, to='doctors.doctor')),
+                ('mappings', models.BigIntegerField(default=0)),
+                ('active_mappings', models.BigIntegerField(default=0)),
+                ('primary_mappings', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-active_mappings', 'doctor'], name='caseload_active_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:38
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='SpecializationRollup',
+        ),
+    ]
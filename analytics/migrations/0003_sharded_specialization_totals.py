@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_delete_specializationrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpecializationRollup',
+            fields=[
+                ('key', models.CharField(max_length=60, primary_key=True, serialize=False)),
+                ('doctors', models.BigIntegerField(default=0)),
+                ('active_doctors', models.BigIntegerField(default=0)),
+                ('mappings', models.BigIntegerField(default=0)),
+                ('active_mappings', models.BigIntegerField(default=0)),
+                ('primary_mappings', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TotalsRollup',
+            fields=[
+                ('shard', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('patients', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.db import models
+from doctors.models import Doctor
+
+# Every rollup row is kept current by analytics.rollups as the underlying
+# rows change; rebuild_analytics recomputes them from scratch.
+
+
+class DoctorCaseload(models.Model):
+    """Mappings of one doctor (one mapping per patient, so also its patients)."""
+    doctor = models.OneToOneField(Doctor, on_delete=models.CASCADE, primary_key=True, related_name='caseload')
+    mappings = models.BigIntegerField(default=0)
+    active_mappings = models.BigIntegerField(default=0)
+    primary_mappings = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Busiest doctors first
+            models.Index(fields=['-active_mappings', 'doctor'], name='caseload_active_idx'),
+        ]
+
+    def __str__(self):
+        return f"Doctor {self.doctor_id}: {self.active_mappings} active patients"
+
+
+class SpecializationRollup(models.Model):
+    """
+    Doctors and mappings per specialization, spread over shards (see
+    ``analytics.rollups``): a specialization's numbers are the sum of its
+    rows, keyed ``<specialization>:<shard>``.
+    """
+    key = models.CharField(max_length=60, primary_key=True)
+    doctors = models.BigIntegerField(default=0)
+    active_doctors = models.BigIntegerField(default=0)
+    mappings = models.BigIntegerField(default=0)
+    active_mappings = models.BigIntegerField(default=0)
+    primary_mappings = models.BigIntegerField(default=0)
+
+    @staticmethod
+    def shard_key(specialization, shard):
+        return f'{specialization}:{shard}'
+
+    @staticmethod
+    def group(key):
+        return key.rsplit(':', 1)[0]
+
+    def __str__(self):
+        return f"{self.key}: {self.active_mappings} active mappings"
+
+
+class TotalsRollup(models.Model):
+    """All patients, spread over shards like ``SpecializationRollup``."""
+    shard = models.PositiveSmallIntegerField(primary_key=True)
+    patients = models.BigIntegerField(default=0)
+
+    @staticmethod
+    def shard_key(group, shard):
+        return shard
+
+    @staticmethod
+    def group(key):
+        return None
+
+    def __str__(self):
+        return f"Shard {self.shard}: {self.patients} patients"
+
+
+class UserRollup(models.Model):
+    """
+    Patients of one user and their mappings. A patient has at most one
+    primary mapping, so primary_mappings is the number of patients with a
+    primary doctor.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+    patients = models.BigIntegerField(default=0)
+    mappings = models.BigIntegerField(default=0)
+    active_mappings = models.BigIntegerField(default=0)
+    primary_mappings = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-patients', 'user'], name='user_rollup_patients_idx'),
+        ]
+
+    def __str__(self):
+        return f"User {self.user_id}: {self.patients} patients"
@@ -0,0 +1,125 @@
+"""
+Recompute the analytics rollups from the underlying tables.
+
+``rebuild_rollups`` aggregates patients, doctors and mappings with a few
+GROUP BY queries and writes only the rows that differ, so it doubles as a
+drift check. On PostgreSQL the rollup tables are locked (SHARE ROW
+EXCLUSIVE) first: writers updating them wait until the rebuild commits,
+and the aggregates see every write that has already counted itself.
+
+Sharded rollups (``SpecializationRollup``, ``TotalsRollup``) are compared
+per specialization, summing the shards; one that drifted is rewritten as a
+single shard.
+"""
+from django.db import connections, router, transaction
+from django.db.models import Count, Q
+
+from doctors.models import Doctor
+from mappings.models import PatientDoctorMapping
+from patients.models import Patient
+from .models import DoctorCaseload, SpecializationRollup, TotalsRollup, UserRollup
+
+ROLLUP_MODELS = (DoctorCaseload, SpecializationRollup, TotalsRollup, UserRollup)
+
+
+def expected_rollups(using):
+    """
+    ``{model: {pk: {field: value}}}`` computed from scratch; sharded
+    models are keyed by group (specialization, or None for the totals).
+    """
+    mapping_counts = {
+        'mappings': Count('pk'),
+        'active_mappings': Count('pk', filter=Q(is_active=True)),
+        'primary_mappings': Count('pk', filter=Q(is_primary=True)),
+    }
+    mappings = PatientDoctorMapping.objects.using(using).order_by()
+    expected = {model: {} for model in ROLLUP_MODELS}
+
+    for row in mappings.values('doctor_id').annotate(**mapping_counts):
+        doctor_id = row.pop('doctor_id')
+        expected[DoctorCaseload][doctor_id] = row
+
+    specializations = expected[SpecializationRollup]
+    for row in Doctor.objects.using(using).order_by().values('specialization').annotate(
+        doctors=Count('pk'), active_doctors=Count('pk', filter=Q(is_active=True))
+    ):
+        specialization = row.pop('specialization')
+        specializations[specialization] = dict(row, mappings=0, active_mappings=0, primary_mappings=0)
+    for row in mappings.values('doctor__specialization').annotate(**mapping_counts):
+        specializations[row.pop('doctor__specialization')].update(row)
+
+    expected[TotalsRollup][None] = {'patients': Patient.objects.using(using).count()}
+
+    users = expected[UserRollup]
+    for row in Patient.objects.using(using).order_by().values('created_by_id').annotate(patients=Count('pk')):
+        user_id = row.pop('created_by_id')
+        users[user_id] = dict(row, mappings=0, active_mappings=0, primary_mappings=0)
+    for row in mappings.values('patient__created_by_id').annotate(**mapping_counts):
+        users[row.pop('patient__created_by_id')].update(row)
+    return expected
+
+
+def rebuild_rollups(using=None, dry_run=False, batch_size=1000):
+    """
+    Bring the rollups in line with the data. Returns ``{model name:
+    {'created': n, 'updated': n, 'deleted': n}}``; with ``dry_run`` only
+    counts the differences.
+    """
+    using = using or router.db_for_write(DoctorCaseload)
+    connection = connections[using]
+    report = {}
+    with transaction.atomic(using=using):
+        if connection.vendor == 'postgresql' and not dry_run:
+            tables = ', '.join(connection.ops.quote_name(model._meta.db_table) for model in ROLLUP_MODELS)
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {tables} IN SHARE ROW EXCLUSIVE MODE')
+
+        for model, rows in expected_rollups(using).items():
+            manager = model._default_manager.using(using)
+            fields = [field.attname for field in model._meta.concrete_fields if not field.primary_key]
+            current = {row.pop('pk'): row for row in manager.values('pk', *fields)}
+            if hasattr(model, 'shard_key'):
+                report[model.__name__] = rebuild_sharded(model, rows, current, fields, dry_run, batch_size, using)
+                continue
+            # Rows that are all zeros are as good as missing
+            rows = {key: row for key, row in rows.items() if any(row.values())}
+            created = [model(pk=key, **row) for key, row in rows.items() if key not in current]
+            updated = [model(pk=key, **row) for key, row in rows.items() if key in current and current[key] != row]
+            deleted = [key for key, row in current.items() if key not in rows and any(row.values())]
+            report[model.__name__] = {'created': len(created), 'updated': len(updated), 'deleted': len(deleted)}
+            if dry_run:
+                continue
+            manager.bulk_create(created, batch_size=batch_size)
+            manager.bulk_update(updated, fields, batch_size=batch_size)
+            for start in range(0, len(deleted), batch_size):
+                manager.filter(pk__in=deleted[start:start + batch_size]).delete()
+    return report
+
+
+def rebuild_sharded(model, rows, current, fields, dry_run, batch_size, using):
+    """Like the loop in ``rebuild_rollups``, per group of shards."""
+    manager = model._default_manager.using(using)
+    shards, totals = {}, {}
+    for key, row in current.items():
+        group = model.group(key)
+        shards.setdefault(group, []).append(key)
+        total = totals.setdefault(group, dict.fromkeys(fields, 0))
+        for field, value in row.items():
+            total[field] += value
+    rows = {group: row for group, row in rows.items() if any(row.values())}
+    totals = {group: row for group, row in totals.items() if any(row.values())}
+    drifted = [group for group in rows.keys() | totals.keys() if rows.get(group) != totals.get(group)]
+    report = {
+        'created': sum(group not in totals for group in drifted),
+        'updated': sum(group in totals and group in rows for group in drifted),
+        'deleted': sum(group not in rows for group in drifted),
+    }
+    if not dry_run and drifted:
+        stale = [key for group in drifted for key in shards.get(group, ())]
+        for start in range(0, len(stale), batch_size):
+            manager.filter(pk__in=stale[start:start + batch_size]).delete()
+        manager.bulk_create(
+            [model(pk=model.shard_key(group, 0), **rows[group]) for group in drifted if group in rows],
+            batch_size=batch_size,
+        )
+    return report
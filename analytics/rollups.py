@@ -0,0 +1,201 @@
+"""
+Incremental maintenance of the analytics rollups.
+
+A write describes what it changed in a ``RollupDeltas`` and applies it in
+its own transaction, so the rollups commit (or roll back) with the rows
+they count. ``apply()`` runs one UPDATE per rollup table, adding each row's
+delta with ``F() + CASE``; rows that don't exist yet are inserted as zeros
+first. Mapping changes only need the patient and doctor: owners and
+specializations the caller doesn't already have are looked up with one
+query each.
+
+A write applies its deltas once, at the end. Each table's rows are locked
+with ``SELECT ... FOR UPDATE`` in primary key order before the UPDATE (an
+UPDATE locks in scan order, whatever the order of its IN list), one table
+after the other in a fixed order, so concurrent writers queue instead of
+deadlocking.
+
+Every write of any user would otherwise update the same few
+per-specialization and total rows. Those are spread over
+ANALYTICS_ROLLUP_SHARDS rows each instead: a write adds to the rows of one
+shard picked at random, and readers sum a specialization's shards, which
+is still a fixed number of rows.
+
+The rollups are updated by:
+
+- ``PatientDoctorMapping.save()``/``delete()``, the mapping queryset's
+  ``delete()``, ``bulk_assign()``, ``demote_primary()`` and ``set_primary()``
+- post_save and pre_delete signals of patients, doctors and users
+  (``analytics.signals``)
+- ``PatientImporter``, which inserts patients without signals
+
+Anything else that writes these tables in bulk (``seed_data``, raw SQL)
+should call ``analytics.rebuild.rebuild_rollups`` afterwards.
+"""
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import BigIntegerField, Case, Count, F, Q, Value, When
+
+from doctors.models import Doctor
+from patients.models import Patient
+from .models import DoctorCaseload, SpecializationRollup, TotalsRollup, UserRollup
+
+MAPPING_FIELDS = ('mappings', 'active_mappings', 'primary_mappings')
+SPECIALIZATION_FIELDS = ('doctors', 'active_doctors') + MAPPING_FIELDS
+
+
+def counters():
+    return defaultdict(int)
+
+
+class RollupDeltas:
+    def __init__(self):
+        self.doctors = defaultdict(counters)
+        self.specializations = defaultdict(counters)
+        self.totals = counters()
+        self.users = defaultdict(counters)
+        # (patient_id, doctor_id) -> [owner_id, specialization, counts]
+        self._mappings = {}
+
+    def mapping(self, patient_id, doctor_id, mappings=0, active=0, primary=0, owner_id=None, specialization=None):
+        """
+        Add to the counts of one patient-doctor pair, e.g. ``mappings=1,
+        active=1`` for a new active mapping or ``primary=-1`` for a demotion.
+        """
+        entry = self._mappings.setdefault((patient_id, doctor_id), [None, None, counters()])
+        entry[0] = owner_id if owner_id is not None else entry[0]
+        entry[1] = specialization if specialization is not None else entry[1]
+        counts = entry[2]
+        counts['mappings'] += mappings
+        counts['active_mappings'] += active
+        counts['primary_mappings'] += primary
+        return self
+
+    def mapping_rows(self, queryset, sign=1, doctors=True, specializations=True, users=True, owner_id=None):
+        """
+        Count (``sign=1``) or uncount (``sign=-1``) every mapping of
+        ``queryset``, grouped in the database. Leave out the tables whose
+        rows are about to be deleted anyway; ``owner_id`` credits the
+        mappings to that user instead of their patients' current owner.
+        """
+        rows = queryset.order_by().values('doctor_id', 'doctor__specialization', 'patient__created_by_id').annotate(
+            mappings=Count('pk'),
+            active_mappings=Count('pk', filter=Q(is_active=True)),
+            primary_mappings=Count('pk', filter=Q(is_primary=True)),
+        )
+        for row in rows:
+            for field in MAPPING_FIELDS:
+                value = sign * row[field]
+                if doctors:
+                    self.doctors[row['doctor_id']][field] += value
+                if specializations:
+                    self.specializations[row['doctor__specialization']][field] += value
+                if users:
+                    self.users[owner_id or row['patient__created_by_id']][field] += value
+        return self
+
+    def patients(self, owner_id, count):
+        self.users[owner_id]['patients'] += count
+        self.totals['patients'] += count
+        return self
+
+    def patient_rows(self, queryset, sign=1, users=True):
+        """Count or uncount the patients of ``queryset`` (per owner, unless ``users=False``)."""
+        for row in queryset.order_by().values('created_by_id').annotate(n=Count('pk')):
+            if users:
+                self.users[row['created_by_id']]['patients'] += sign * row['n']
+            self.totals['patients'] += sign * row['n']
+        return self
+
+    def doctor(self, specialization, active, count=1):
+        counts = self.specializations[specialization]
+        counts['doctors'] += count
+        counts['active_doctors'] += count if active else 0
+        return self
+
+    def apply(self, using=None):
+        using = using or router.db_for_write(DoctorCaseload)
+        self._resolve(using)
+        shard = random.randrange(max(settings.ANALYTICS_ROLLUP_SHARDS, 1))
+        specializations = {
+            SpecializationRollup.shard_key(specialization, shard): counts
+            for specialization, counts in self.specializations.items() if specialization is not None
+        }
+        with transaction.atomic(using=using):
+            for model, deltas in (
+                (DoctorCaseload, self.doctors),
+                (SpecializationRollup, specializations),
+                (TotalsRollup, {TotalsRollup.shard_key(None, shard): self.totals}),
+                (UserRollup, self.users),
+            ):
+                apply_deltas(model, deltas, using)
+
+    def _resolve(self, using):
+        """Move the per-pair counts onto the doctor, specialization and user rows."""
+        pending = {key: entry for key, entry in self._mappings.items() if any(entry[2].values())}
+        self._mappings = {}
+        if not pending:
+            return
+        owners = {patient_id: entry[0] for (patient_id, _), entry in pending.items() if entry[0] is not None}
+        missing = {patient_id for patient_id, _ in pending} - owners.keys()
+        if missing:
+            owners.update(Patient.objects.using(using).filter(pk__in=missing).values_list('pk', 'created_by_id'))
+        specializations = {doctor_id: entry[1] for (_, doctor_id), entry in pending.items() if entry[1] is not None}
+        missing = {doctor_id for _, doctor_id in pending} - specializations.keys()
+        if missing:
+            specializations.update(Doctor.objects.using(using).filter(pk__in=missing).values_list('pk', 'specialization'))
+
+        for (patient_id, doctor_id), (_, _, counts) in pending.items():
+            # A patient or doctor deleted meanwhile took its rollup rows along
+            owner_id, specialization = owners.get(patient_id), specializations.get(doctor_id)
+            for field, value in counts.items():
+                if specialization is not None:
+                    self.doctors[doctor_id][field] += value
+                    self.specializations[specialization][field] += value
+                if owner_id is not None:
+                    self.users[owner_id][field] += value
+
+
+def apply_deltas(model, deltas, using):
+    """
+    Add ``deltas`` (``{pk: {field: delta}}``) to the rows of ``model``,
+    creating missing rows (for doctors and users, only those that still
+    exist).
+    """
+    deltas = {
+        key: {field: value for field, value in counts.items() if value}
+        for key, counts in deltas.items() if key is not None
+    }
+    deltas = {key: counts for key, counts in deltas.items() if counts}
+    if not deltas:
+        return
+    manager = model._default_manager.using(using)
+    fields = sorted({field for counts in deltas.values() for field in counts})
+
+    def update(keys):
+        changes = {}
+        for field in fields:
+            whens = [When(pk=key, then=Value(deltas[key][field])) for key in keys if field in deltas[key]]
+            if whens:
+                changes[field] = F(field) + Case(*whens, default=Value(0), output_field=BigIntegerField())
+        return manager.filter(pk__in=keys).update(**changes)
+
+    def lock(keys):
+        return list(manager.select_for_update().filter(pk__in=keys).order_by('pk').values_list('pk', flat=True))
+
+    keys = sorted(deltas)
+    locked = lock(keys)
+    if len(locked) < len(keys):
+        missing = sorted(set(keys) - set(locked))
+        owner = model._meta.pk.related_model
+        if owner is not None:
+            # Keyed by their doctor or user, which may have been deleted meanwhile
+            missing = sorted(owner._default_manager.using(using).filter(pk__in=missing).values_list('pk', flat=True))
+        if missing:
+            manager.bulk_create([model(pk=key) for key in missing], ignore_conflicts=True)
+            locked = sorted(locked + lock(missing))
+    if locked:
+        update(locked)
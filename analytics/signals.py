@@ -0,0 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, QuerySet
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from doctors.models import Doctor
+from mappings.models import PatientDoctorMapping
+from patients.models import Patient
+from .models import DoctorCaseload
+from .rollups import MAPPING_FIELDS, RollupDeltas
+
+User = get_user_model()
+
+
+def deleted_queryset(sender, instance, using, origin):
+    """
+    The rows of ``sender`` this delete() call removes, the first time the
+    collector reports one of them; None when they go as part of deleting
+    something else (that model's receiver counts them) or were counted.
+    pre_delete is sent per row, but the rollups are updated per call.
+    """
+    if isinstance(origin, QuerySet):
+        if origin.model is not sender or getattr(origin, '_rollups_counted', False):
+            return None
+        origin._rollups_counted = True
+        return origin.using(using)
+    if origin is not None and origin is not instance:
+        return None
+    return sender._default_manager.using(using).filter(pk=instance.pk)
+
+
+@receiver(pre_save, sender=Patient)
+def load_patient_owner(sender, instance, using, raw=False, **kwargs):
+    # Deferred or never loaded: read the stored owner before it is overwritten
+    if not raw and not instance._state.adding and getattr(instance, '_loaded_owner', None) is None:
+        instance._loaded_owner = sender._default_manager.using(using).filter(pk=instance.pk).values_list(
+            'created_by_id', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Patient)
+def count_patient(sender, instance, created, using, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    previous, instance._loaded_owner = getattr(instance, '_loaded_owner', None), instance.created_by_id
+    if created:
+        RollupDeltas().patients(instance.created_by_id, 1).apply(using)
+    elif previous is not None and previous != instance.created_by_id and (
+        update_fields is None or {'created_by', 'created_by_id'} & set(update_fields)
+    ):
+        # Moved to another user, with its mappings
+        mappings = PatientDoctorMapping.objects.using(using).filter(patient=instance)
+        (
+            RollupDeltas()
+            .patients(previous, -1).patients(instance.created_by_id, 1)
+            .mapping_rows(mappings, -1, doctors=False, specializations=False, owner_id=previous)
+            .mapping_rows(mappings, 1, doctors=False, specializations=False)
+            .apply(using)
+        )
+
+
+@receiver(pre_delete, sender=Patient)
+def uncount_patients(sender, instance, using, origin=None, **kwargs):
+    patients = deleted_queryset(sender, instance, using, origin)
+    if patients is not None:
+        mappings = PatientDoctorMapping.objects.using(using).filter(patient__in=patients)
+        RollupDeltas().patient_rows(patients, -1).mapping_rows(mappings, -1).apply(using)
+
+
+@receiver(pre_save, sender=Doctor)
+def load_doctor_roster(sender, instance, using, raw=False, **kwargs):
+    if not raw and not instance._state.adding and None in getattr(instance, '_loaded_roster', (None, None)):
+        instance._loaded_roster = sender._default_manager.using(using).filter(pk=instance.pk).values_list(
+            'specialization', 'is_active'
+        ).first() or (None, None)
+
+
+@receiver(post_save, sender=Doctor)
+def count_doctor(sender, instance, created, using, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_loaded_roster', (None, None))
+    instance._loaded_roster = (instance.specialization, instance.is_active)
+    if created:
+        RollupDeltas().doctor(instance.specialization, instance.is_active).apply(using)
+        return
+    specialization, active = previous
+    if specialization is None or previous == instance._loaded_roster:
+        return
+    deltas = RollupDeltas().doctor(specialization, active, -1).doctor(instance.specialization, instance.is_active)
+    with transaction.atomic(using=using):
+        if specialization != instance.specialization:
+            # The doctor's mappings move to the new specialization. Locking the
+            # caseload holds off mapping writes, which lock it before the
+            # specialization rows too.
+            caseload = DoctorCaseload.objects.using(using).select_for_update().filter(
+                pk=instance.pk
+            ).values(*MAPPING_FIELDS).first()
+            for field, value in (caseload or {}).items():
+                deltas.specializations[specialization][field] -= value
+                deltas.specializations[instance.specialization][field] += value
+        deltas.apply(using)
+
+
+@receiver(pre_delete, sender=Doctor)
+def uncount_doctors(sender, instance, using, origin=None, **kwargs):
+    doctors = deleted_queryset(sender, instance, using, origin)
+    if doctors is None:
+        return
+    deltas = RollupDeltas()
+    for row in doctors.order_by().values('specialization', 'is_active').annotate(n=Count('pk')):
+        deltas.doctor(row['specialization'], row['is_active'], -row['n'])
+    # Their DoctorCaseload rows are deleted with them
+    mappings = PatientDoctorMapping.objects.using(using).filter(doctor__in=doctors)
+    deltas.mapping_rows(mappings, -1, doctors=False).apply(using)
+
+
+@receiver(pre_delete, sender=User)
+def uncount_users(sender, instance, using, origin=None, **kwargs):
+    users = deleted_queryset(sender, instance, using, origin)
+    if users is not None:
+        # Their UserRollup rows are deleted with them, their patients too
+        patients = Patient.objects.using(using).filter(created_by__in=users)
+        mappings = PatientDoctorMapping.objects.using(using).filter(patient__created_by__in=users)
+        RollupDeltas().patient_rows(patients, -1, users=False).mapping_rows(mappings, -1, users=False).apply(using)
@@ -0,0 +1,86 @@
+from django.db.models import F, Sum
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .models import DoctorCaseload, SpecializationRollup, TotalsRollup, UserRollup
+from .rollups import MAPPING_FIELDS, SPECIALIZATION_FIELDS
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def coverage(row):
+    """Share of patients with a primary doctor."""
+    return round(row['primary_mappings'] / row['patients'], 4) if row['patients'] else None
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard(request):
+    """
+    Caseload and roster numbers from the precomputed rollups: the user's own
+    patients, and for staff the totals, specializations, busiest doctors and
+    users with the most patients (?limit=, default 20)
+    """
+    try:
+        limit = request.query_params.get('limit', DEFAULT_LIMIT)
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            limit = 0
+        if not 1 <= limit <= MAX_LIMIT:
+            return Response({
+                'error': 'Invalid limit',
+                'details': f'limit must be an integer from 1 to {MAX_LIMIT}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        own = UserRollup.objects.filter(user=request.user).values('patients', *MAPPING_FIELDS).first()
+        own = own or dict.fromkeys(('patients',) + MAPPING_FIELDS, 0)
+        response_data = {
+            'message': 'Analytics retrieved successfully',
+            'user': dict(own, primary_coverage=coverage(own))
+        }
+        
+        if request.user.is_staff:
+            # A fixed number of shard rows, however many doctors and users there are
+            by_specialization = {}
+            for row in SpecializationRollup.objects.values('key', *SPECIALIZATION_FIELDS):
+                counts = by_specialization.setdefault(
+                    SpecializationRollup.group(row.pop('key')), dict.fromkeys(SPECIALIZATION_FIELDS, 0)
+                )
+                for field, value in row.items():
+                    counts[field] += value
+            specializations = [
+                dict(specialization=specialization, **counts)
+                for specialization, counts in sorted(by_specialization.items()) if any(counts.values())
+            ]
+            totals = {'patients': TotalsRollup.objects.aggregate(patients=Sum('patients'))['patients'] or 0}
+            for field in SPECIALIZATION_FIELDS:
+                totals[field] = sum(row[field] for row in specializations)
+            totals['primary_coverage'] = coverage(totals)
+            
+            response_data['totals'] = totals
+            response_data['specializations'] = specializations
+            response_data['doctors'] = list(
+                DoctorCaseload.objects.filter(active_mappings__gt=0)
+                .order_by('-active_mappings', 'doctor')
+                .values(
+                    'doctor_id', *MAPPING_FIELDS,
+                    name=F('doctor__name'), specialization=F('doctor__specialization')
+                )[:limit]
+            )
+            response_data['users'] = [
+                dict(row, primary_coverage=coverage(row)) for row in
+                UserRollup.objects.filter(patients__gt=0)
+                .order_by('-patients', 'user')
+                .values('user_id', 'patients', *MAPPING_FIELDS, email=F('user__email'))[:limit]
+            ]
+        
+        return Response(response_data, status=status.HTTP_200_OK)
+    
+    except Exception as e:
+        return Response({
+            'error': 'Internal server error',
+            'details': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from healthcare_backend.deletion import delete_user
+from .models import CustomUser, RevokedToken
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -13,3 +14,18 @@ class CustomUserAdmin(UserAdmin):
         ('Additional Info', {'fields': ('name', 'created_at', 'updated_at')}),
     )
     readonly_fields = ('created_at', 'updated_at')
+
+    # Patients go in batches rather than all loaded at once
+    def delete_model(self, request, obj):
+        delete_user(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            delete_user(user)
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ('jti', 'token_type', 'user_id', 'revoked_at', 'expires_at')
+    list_filter = ('token_type',)
+    search_fields = ('jti',)
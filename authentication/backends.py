@@ -0,0 +1,144 @@
+"""
+JWT authentication without the per-request user query.
+
+``JWTAuthentication`` loads the user row on every request. Here the row's
+field values are kept in a small per-worker LRU cache keyed by user id, and
+each request gets its own ``CustomUser`` instance rebuilt from them, so
+``created_by=request.user`` filters and ``created_by != request.user``
+comparisons behave exactly as before. Saving or deleting a user drops its
+entry in the worker that made the change; other workers pick the change up
+within ``AUTH_USER_CACHE_TTL`` seconds. Tokens are also checked against
+``authentication.revocation``.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from healthcare_backend.db.replicas import use_primary
+
+from .revocation import revocation_list
+
+
+class UserCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        """Return a fresh user instance for ``user_id``, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < now:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+        expires_at, db, field_names, values = entry
+        return get_user_model().from_db(db, field_names, values)
+
+    def set(self, user):
+        if settings.AUTH_USER_CACHE_MAX_SIZE <= 0:
+            return
+        fields = user._meta.concrete_fields
+        entry = (
+            time.monotonic() + settings.AUTH_USER_CACHE_TTL,
+            user._state.db,
+            [field.attname for field in fields],
+            [getattr(user, field.attname) for field in fields],
+        )
+        with self._lock:
+            self._entries[user.pk] = entry
+            self._entries.move_to_end(user.pk)
+            while len(self._entries) > settings.AUTH_USER_CACHE_MAX_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that serves ``request.user`` from ``user_cache`` and
+    rejects tokens in the revocation list. ``aauthenticate`` is the same for
+    async views.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocation_list.is_revoked(validated_token[api_settings.JTI_CLAIM]):
+            raise InvalidToken(_('Token has been revoked'))
+        return validated_token
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                with use_primary():
+                    user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            user_cache.set(user)
+        self.check_user(validated_token, user)
+        return user
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = super().get_validated_token(raw_token)
+        if await revocation_list.ais_revoked(validated_token[api_settings.JTI_CLAIM]):
+            raise InvalidToken(_('Token has been revoked'))
+
+        user_id = self.get_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                with use_primary():
+                    user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            user_cache.set(user)
+        self.check_user(validated_token, user)
+        return user, validated_token
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    def check_user(self, validated_token, user):
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code='password_changed'
+                )
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.models import CustomUser
+from healthcare_backend.deletion import delete_user, estimated_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete a user with all of their patients and mappings in batches, '
+        'each in its own transaction, printing progress. Use this for large '
+        'accounts instead of the admin. Safe to run again after a failure.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the user to delete.')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Patients per batch (default: DELETE_BATCH_SIZE).')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        try:
+            user = CustomUser.objects.get(email=options['email'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}')
+
+        total = estimated_rows(user)
+        deleted = 0
+        started = time.perf_counter()
+
+        def progress(count):
+            nonlocal deleted
+            deleted += count
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'Deleted {deleted} of about {total} rows')
+
+        delete_user(user, options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {options["email"]} ({deleted} rows) in {time.perf_counter() - started:.1f}s'
+        ))
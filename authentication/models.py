@@ -12,3 +12,15 @@ class CustomUser(AbstractUser):
 
     def __str__(self):
         return self.email
+
+
+class RevokedToken(models.Model):
+    """A refresh or access token that must no longer be accepted."""
+    jti = models.CharField(max_length=255, unique=True)
+    token_type = models.CharField(max_length=20)
+    user_id = models.BigIntegerField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.token_type} {self.jti}"
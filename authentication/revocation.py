@@ -0,0 +1,164 @@
+"""
+Revoked JWT ids (``jti``), checked on every authenticated request.
+
+``RevokedToken`` rows are the source of truth. Each worker mirrors them in a
+Bloom filter, so the common "not revoked" answer comes from memory. Only a
+filter hit (a revoked token, or a rare false positive) is confirmed against
+the DB. Every ``REVOCATION_SYNC_INTERVAL`` seconds a worker adds the rows
+revoked since its last sync. A token revoked in another worker can therefore
+still be accepted here for up to that long. Expired rows are deleted, and
+the filter rebuilt without them, every ``REVOCATION_PRUNE_INTERVAL`` seconds.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from healthcare_backend.db.replicas import use_primary
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RevokedToken
+
+# Rows committed slightly out of revoked_at order must not fall between two
+# syncs, so each sync re-reads this much of the previous window.
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._synced_at = None
+        self._checked_at = 0.0
+        self._pruned_at = 0.0
+        self.checks = 0
+        self.filter_hits = 0
+
+    def is_revoked(self, jti):
+        self.sync()
+        self.checks += 1
+        if jti not in self._filter:
+            return False
+        self.filter_hits += 1
+        with use_primary():
+            return RevokedToken.objects.filter(jti=jti).exists()
+
+    async def ais_revoked(self, jti):
+        """``is_revoked`` for async views; only goes to the DB when it has to."""
+        if self._sync_due() or jti in self._filter:
+            return await sync_to_async(self.is_revoked)(jti)
+        self.checks += 1
+        return False
+
+    def revoke(self, token, user_id=None):
+        """
+        Revoke a validated simplejwt token. Returns False if it was already
+        revoked, which is how refresh rotation detects a reused token.
+        """
+        jti = token[api_settings.JTI_CLAIM]
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(
+                    jti=jti,
+                    token_type=token.token_type,
+                    user_id=user_id,
+                    expires_at=datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc),
+                )
+        except IntegrityError:
+            return False
+        if self._filter is not None:
+            self._filter.add(jti)
+        return True
+
+    def _sync_due(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        return self._filter is None or now - self._checked_at >= settings.REVOCATION_SYNC_INTERVAL
+
+    def sync(self):
+        now = time.monotonic()
+        if not self._sync_due(now):
+            return
+        with self._lock:
+            if not self._sync_due(now):
+                return
+            # A replica behind the primary would miss fresh revocations.
+            with use_primary():
+                if self._filter is None or now - self._pruned_at >= settings.REVOCATION_PRUNE_INTERVAL:
+                    self._prune_and_rebuild()
+                    self._pruned_at = now
+                else:
+                    self._add_recent()
+            self._checked_at = now
+
+    def _prune_and_rebuild(self):
+        started = timezone.now()
+        RevokedToken.objects.filter(expires_at__lt=started).delete()
+        jtis = list(RevokedToken.objects.values_list('jti', flat=True))
+        bloom = BloomFilter(
+            max(settings.REVOCATION_FILTER_CAPACITY, 2 * len(jtis)),
+            settings.REVOCATION_FILTER_ERROR_RATE
+        )
+        for jti in jtis:
+            bloom.add(jti)
+        self._filter = bloom
+        self._synced_at = started
+
+    def _add_recent(self):
+        started = timezone.now()
+        jtis = RevokedToken.objects.filter(
+            revoked_at__gte=self._synced_at - SYNC_OVERLAP
+        ).values_list('jti', flat=True)
+        bloom = self._filter
+        for jti in jtis:
+            bloom.add(jti)
+        self._synced_at = started
+        if bloom.count > bloom.capacity:
+            # Past capacity the false-positive rate climbs; resize now.
+            self._prune_and_rebuild()
+
+    def stats(self):
+        bloom = self._filter
+        return {
+            'entries': bloom.count if bloom else 0,
+            'capacity': bloom.capacity if bloom else 0,
+            'checks': self.checks,
+            'filter_hits': self.filter_hits,
+        }
+
+
+revocation_list = RevocationList()
@@ -1,9 +1,15 @@
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
-from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer
+from .models import CustomUser
+from .revocation import revocation_list
+from .serializers import (
+    UserRegistrationSerializer, UserLoginSerializer, UserSerializer,
+    RefreshTokenSerializer
+)
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -70,3 +76,91 @@ def login(request):
             'error': 'Internal server error',
             'details': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def refresh(request):
+    """
+    Exchange a refresh token for a new access token (and a new refresh
+    token when rotation is on; the old one is revoked)
+    """
+    try:
+        serializer = RefreshTokenSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'error': 'Token refresh failed',
+                'details': serializer.errors
+            }, status=status.HTTP_401_UNAUTHORIZED)
+
+        token = serializer.validated_data['refresh']
+        user = CustomUser.objects.filter(
+            **{api_settings.USER_ID_FIELD: token.get(api_settings.USER_ID_CLAIM)},
+            is_active=True
+        ).first()
+        if user is None:
+            return Response({
+                'error': 'Token refresh failed',
+                'details': 'User not found or inactive'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            # The unique jti makes this the single winner if the same
+            # refresh token is presented twice concurrently.
+            revoked = not revocation_list.revoke(token, user_id=user.pk)
+        else:
+            revoked = revocation_list.is_revoked(token[api_settings.JTI_CLAIM])
+        if revoked:
+            return Response({
+                'error': 'Token refresh failed',
+                'details': 'Token has been revoked'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            token = RefreshToken.for_user(user)
+        return Response({
+            'message': 'Token refreshed successfully',
+            'tokens': {
+                'refresh': str(token),
+                'access': str(token.access_token),
+            }
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'error': 'Internal server error',
+            'details': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout(request):
+    """
+    Revoke the given refresh token and the access token used for this request
+    """
+    try:
+        serializer = RefreshTokenSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'error': 'Logout failed',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        token = serializer.validated_data['refresh']
+        if token.get(api_settings.USER_ID_CLAIM) != getattr(request.user, api_settings.USER_ID_FIELD):
+            return Response({
+                'error': 'Logout failed',
+                'details': 'Refresh token belongs to another user'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        revocation_list.revoke(token, user_id=request.user.pk)
+        if request.auth is not None:
+            revocation_list.revoke(request.auth, user_id=request.user.pk)
+        return Response({
+            'message': 'Logout successful'
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'error': 'Internal server error',
+            'details': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,5 +1,16 @@
 from django.contrib import admin
-from .models import Doctor
+from .models import Doctor, DoctorAvailability
+
+
+class DoctorAvailabilityInline(admin.TabularInline):
+    model = DoctorAvailability
+    fields = ('weekday', 'start_minute', 'end_minute')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 @admin.register(Doctor)
 class DoctorAdmin(admin.ModelAdmin):
@@ -7,6 +18,7 @@ class DoctorAdmin(admin.ModelAdmin):
     list_filter = ('specialization', 'is_active', 'hospital_affiliation', 'created_at')
     search_fields = ('name', 'email', 'license_number', 'hospital_affiliation')
     readonly_fields = ('created_at', 'updated_at')
+    inlines = [DoctorAvailabilityInline]
     
     fieldsets = (
         ('Personal Information', {
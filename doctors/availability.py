@@ -0,0 +1,243 @@
+"""
+Structured weekly availability.
+
+``Doctor.availability_hours`` is free text ("Mon-Fri 9AM-5PM",
+"Mon, Wed 09:00-13:00; Sat 10-2", "24/7"). ``parse_availability`` turns it
+into ``(weekday, start_minute, end_minute)`` intervals (Monday is 0, minutes
+from local midnight, end exclusive), which are stored as ``DoctorAvailability``
+rows whenever a doctor is saved. "Who is available on Tuesday at 14:00" is
+then one range lookup on ``availability_spec_slot_idx`` instead of parsing
+every doctor in Python.
+
+Intervals past midnight ("10PM-6AM") are split at midnight. Text that can't
+be parsed yields no intervals, so the doctor never matches a slot search;
+``backfill_availability`` reports those rows.
+"""
+import re
+
+from django.db import transaction
+
+from .models import Doctor, DoctorAvailability
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+MINUTES_PER_DAY = 24 * 60
+
+DAY_NAMES = {
+    'mon': 0, 'monday': 0,
+    'tue': 1, 'tues': 1, 'tuesday': 1,
+    'wed': 2, 'weds': 2, 'wednesday': 2,
+    'thu': 3, 'thur': 3, 'thurs': 3, 'thursday': 3,
+    'fri': 4, 'friday': 4,
+    'sat': 5, 'saturday': 5,
+    'sun': 6, 'sunday': 6,
+}
+DAY_GROUPS = {
+    'weekdays': range(0, 5), 'weekday': range(0, 5),
+    'weekends': range(5, 7), 'weekend': range(5, 7),
+    'daily': range(7), 'everyday': range(7), 'every day': range(7), 'all week': range(7),
+}
+
+_DAY = '|'.join(sorted(DAY_NAMES, key=len, reverse=True))
+_GROUP = '|'.join(sorted(DAY_GROUPS, key=len, reverse=True))
+_TIME = r'(?:\d{1,2}(?::\d{2})?\s*(?:[ap]\.?m\.?)?|noon|midnight)'
+TOKEN = re.compile(
+    rf'(?P<always>\b24\s*/\s*7\b)'
+    rf'|(?P<allday>\b(?:24\s*(?:hours|hrs|h)|all\s+day)\b)'
+    rf'|\b(?P<day_from>{_DAY})\.?\s*-\s*(?P<day_to>{_DAY})\b\.?'
+    rf'|\b(?P<group>{_GROUP})\b'
+    rf'|\b(?P<day>{_DAY})\b\.?'
+    rf'|(?<![\d:])(?P<time_from>{_TIME})\s*-\s*(?P<time_to>{_TIME})(?![\d:])'
+)
+TIME = re.compile(r'(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?:(?P<meridiem>[ap])\.?m\.?)?')
+
+
+def parse_availability(text):
+    """
+    The weekly intervals described by ``text`` as a sorted list of
+    ``(weekday, start_minute, end_minute)``, overlapping ones merged.
+    """
+    text = (text or '').lower()
+    text = re.sub(r'\s*[–—]\s*|\s+(?:to|through|thru|until)\s+', '-', text)
+
+    # Alternating runs of day sets and time ranges; each run of one kind
+    # pairs with the run of the other kind that follows it.
+    runs = []
+    for match in TOKEN.finditer(text):
+        if match['always']:
+            runs.append(('days', set(range(7))))
+            runs.append(('times', [(0, MINUTES_PER_DAY)]))
+            continue
+        if match['allday']:
+            kind, value = 'times', (0, MINUTES_PER_DAY)
+        elif match['day_from']:
+            first, last = DAY_NAMES[match['day_from']], DAY_NAMES[match['day_to']]
+            kind, value = 'days', {(first + offset) % 7 for offset in range((last - first) % 7 + 1)}
+        elif match['group']:
+            kind, value = 'days', set(DAY_GROUPS[match['group']])
+        elif match['day']:
+            kind, value = 'days', {DAY_NAMES[match['day']]}
+        else:
+            value = parse_time_range(match['time_from'], match['time_to'])
+            if value is None:
+                continue
+            kind = 'times'
+
+        if runs and runs[-1][0] == kind:
+            if kind == 'days':
+                runs[-1][1].update(value)
+            else:
+                runs[-1][1].append(value)
+        else:
+            runs.append((kind, set(value) if kind == 'days' else [value]))
+
+    intervals = []
+    for index in range(0, len(runs) - 1, 2):
+        (first_kind, first), (_, second) = runs[index], runs[index + 1]
+        days, times = (first, second) if first_kind == 'days' else (second, first)
+        for weekday in days:
+            for start, end in times:
+                intervals.extend(split_interval(weekday, start, end))
+    return merge_intervals(intervals)
+
+
+def parse_time(value):
+    """``(minutes, meridiem)`` for "9", "9:30", "9:30 PM", "17:00", "noon"."""
+    value = value.strip()
+    if value == 'noon':
+        return 12 * 60, 'p'
+    if value == 'midnight':
+        return 0, 'a'
+    match = TIME.fullmatch(value)
+    if match is None:
+        return None
+    hour, minute = int(match['hour']), int(match['minute'] or 0)
+    meridiem = match['meridiem']
+    if minute > 59 or hour > 24 or (meridiem and not 1 <= hour <= 12):
+        return None
+    if meridiem:
+        hour = hour % 12 + (12 if meridiem == 'p' else 0)
+    return hour * 60 + minute, meridiem
+
+
+def parse_time_range(start, end):
+    """``(start_minute, end_minute)``; the end may be at or before the start (overnight)."""
+    start, end = parse_time(start), parse_time(end)
+    if start is None or end is None:
+        return None
+    (start_minute, start_meridiem), (end_minute, end_meridiem) = start, end
+    if start_meridiem is None and end_meridiem == 'p' and start_minute < 12 * 60:
+        # "11-2pm" is 11AM, but "1-5pm" is 1PM
+        if start_minute + 12 * 60 < end_minute:
+            start_minute += 12 * 60
+    elif start_meridiem is None and end_meridiem is None and end_minute <= start_minute <= 12 * 60:
+        # "9-5" means 9AM-5PM
+        if end_minute + 12 * 60 <= MINUTES_PER_DAY:
+            end_minute += 12 * 60
+    if start_minute >= MINUTES_PER_DAY or end_minute > MINUTES_PER_DAY or start_minute == end_minute:
+        return None
+    return start_minute, end_minute
+
+
+def split_interval(weekday, start, end):
+    if end > start:
+        return [(weekday, start, end)]
+    intervals = [(weekday, start, MINUTES_PER_DAY)]
+    if end:
+        intervals.append(((weekday + 1) % 7, 0, end))
+    return intervals
+
+
+def merge_intervals(intervals):
+    merged = []
+    for weekday, start, end in sorted(intervals):
+        if merged and merged[-1][0] == weekday and start <= merged[-1][2]:
+            merged[-1] = (weekday, merged[-1][1], max(end, merged[-1][2]))
+        else:
+            merged.append((weekday, start, end))
+    return merged
+
+
+def availability_rows(doctor):
+    return [
+        DoctorAvailability(
+            doctor_id=doctor.pk, specialization=doctor.specialization,
+            weekday=weekday, start_minute=start, end_minute=end
+        )
+        for weekday, start, end in parse_availability(doctor.availability_hours)
+    ]
+
+
+def rebuild_availability(doctors, using=None):
+    """
+    Replace the availability rows of ``doctors``. Returns the doctors whose
+    text yielded no intervals.
+    """
+    rows, unparsed = [], []
+    for doctor in doctors:
+        doctor_rows = availability_rows(doctor)
+        if not doctor_rows:
+            unparsed.append(doctor)
+        rows.extend(doctor_rows)
+    manager = DoctorAvailability.objects.db_manager(using)
+    with transaction.atomic(using=manager.db):
+        manager.filter(doctor_id__in=[doctor.pk for doctor in doctors]).delete()
+        manager.bulk_create(rows)
+    for doctor in doctors:
+        doctor.mark_availability_synced()
+    return unparsed
+
+
+def parse_slot(params):
+    """
+    Parse ``day``, ``time``, ``duration`` and ``specialization`` from query
+    params; returns ``(slot, errors)`` where ``slot`` is
+    ``(weekday, start_minute, duration, specialization)``.
+    """
+    errors = {}
+    day = params.get('day', '').strip().lower()
+    weekday = DAY_NAMES.get(day)
+    if weekday is None:
+        errors['day'] = [f'One of: {", ".join(WEEKDAYS)}.']
+
+    match = re.fullmatch(r'(\d{1,2}):(\d{2})', params.get('time', '').strip())
+    start = int(match[1]) * 60 + int(match[2]) if match else None
+    if start is None or int(match[1]) > 23 or int(match[2]) > 59:
+        errors['time'] = ['A 24-hour HH:MM time is required.']
+
+    duration = params.get('duration', '30')
+    if not duration.isdigit() or not 1 <= int(duration) <= MINUTES_PER_DAY:
+        errors['duration'] = [f'Minutes between 1 and {MINUTES_PER_DAY}.']
+        duration = None
+    else:
+        duration = int(duration)
+
+    specialization = params.get('specialization') or None
+    if specialization and specialization not in {code for code, _ in Doctor.SPECIALIZATION_CHOICES}:
+        errors['specialization'] = [f'Unknown specialization: {specialization}']
+
+    if errors:
+        return None, errors
+    return (weekday, start, duration, specialization), errors
+
+
+def available_doctors(queryset, weekday, start, duration, specialization=None):
+    """
+    Filter ``queryset`` to the active doctors free for ``duration`` minutes
+    from ``start`` on ``weekday``. A slot running past midnight needs both
+    halves, since intervals are stored split at midnight.
+    """
+    end = start + duration
+    parts = [(weekday, start, min(end, MINUTES_PER_DAY))]
+    if end > MINUTES_PER_DAY:
+        parts.append(((weekday + 1) % 7, 0, end - MINUTES_PER_DAY))
+
+    queryset = queryset.filter(is_active=True)
+    for part_weekday, part_start, part_end in parts:
+        slots = DoctorAvailability.objects.filter(
+            weekday=part_weekday, start_minute__lte=part_start, end_minute__gte=part_end
+        )
+        if specialization:
+            slots = slots.filter(specialization=specialization)
+            queryset = queryset.filter(specialization=specialization)
+        queryset = queryset.filter(pk__in=slots.values('doctor_id'))
+    return queryset
@@ -0,0 +1,189 @@
+"""
+In-process snapshot of the active doctor catalog.
+
+``Doctor`` is small and read-mostly, so each worker keeps an immutable
+snapshot of the active doctors as rendered by ``DoctorListSerializer``.
+Staleness is detected through a version token in the Django cache, which
+``Doctor`` save/delete signals replace. A worker only re-reads the token
+every ``DOCTOR_CATALOG_CHECK_INTERVAL`` seconds, and a snapshot is never
+used past ``DOCTOR_CATALOG_MAX_AGE`` seconds. That age limit bounds
+staleness when the cache backend is not shared between workers (the
+default local-memory cache).
+"""
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from healthcare_backend.db.replicas import use_primary
+
+VERSION_KEY = 'doctors:catalog:version'
+
+# Set by ``asnapshot`` so an async request keeps using the snapshot it
+# prepared, and never rebuilds (a DB query) from inside the event loop.
+_UNSET = object()
+_pinned_snapshot = ContextVar('doctor_catalog_pinned_snapshot', default=_UNSET)
+
+
+class CatalogSnapshot:
+    __slots__ = (
+        'version', 'built_at', 'fields', 'rows', 'positions',
+        'by_specialization', 'has_inactive',
+    )
+
+    def __init__(self, version, fields, rows, has_inactive):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.fields = fields
+        self.rows = rows
+        self.has_inactive = has_inactive
+        id_index = fields.index('id')
+        spec_index = fields.index('specialization')
+        self.positions = {row[id_index]: i for i, row in enumerate(rows)}
+        by_specialization = {}
+        for row in rows:
+            by_specialization.setdefault(row[spec_index], []).append(row)
+        self.by_specialization = {key: tuple(value) for key, value in by_specialization.items()}
+
+    def as_dicts(self, rows):
+        fields = self.fields
+        return [dict(zip(fields, row)) for row in rows]
+
+
+class DoctorCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._disabled_version = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def get(self, doctor_id):
+        """Return the ``DoctorListSerializer`` data for an active doctor, or None."""
+        snapshot = self.snapshot()
+        position = snapshot.positions.get(doctor_id) if snapshot else None
+        if position is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(zip(snapshot.fields, snapshot.rows[position]))
+
+    def list_snapshot(self, is_active=None):
+        """
+        Return the current snapshot if it can answer a doctor list query with
+        this ``is_active`` filter, or None (it only holds active doctors).
+        """
+        snapshot = self.snapshot()
+        if snapshot is None or is_active is False or (is_active is None and snapshot.has_inactive):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return snapshot
+
+    def list(self, snapshot, specialization=None):
+        """Return ``snapshot``'s doctors as ``DoctorListSerializer`` data, ordered by name."""
+        if specialization:
+            return snapshot.as_dicts(snapshot.by_specialization.get(specialization, ()))
+        return snapshot.as_dicts(snapshot.rows)
+
+    def snapshot(self):
+        pinned = _pinned_snapshot.get()
+        if pinned is not _UNSET:
+            return pinned
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if self._is_current(snapshot, now):
+            return snapshot
+
+        version = current_version()
+        self._checked_at = now
+        if snapshot is not None and snapshot.version == version and self._is_fresh(snapshot, now):
+            return snapshot
+        if self._disabled_version == version:
+            return None
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version or not self._is_fresh(snapshot, now):
+                # Served to every request of this worker, so never built
+                # from a lagging replica.
+                with use_primary():
+                    snapshot = self._snapshot = self._build(version)
+            return snapshot
+
+    async def asnapshot(self):
+        """
+        ``snapshot`` for async views. Refreshes in a worker thread when due
+        and pins the result for the rest of the current request.
+        """
+        snapshot = self._snapshot
+        if not self._is_current(snapshot, time.monotonic()):
+            snapshot = await sync_to_async(self.snapshot)()
+        _pinned_snapshot.set(snapshot)
+        return snapshot
+
+    def _is_current(self, snapshot, now):
+        return (
+            snapshot is not None and self._is_fresh(snapshot, now)
+            and now - self._checked_at < settings.DOCTOR_CATALOG_CHECK_INTERVAL
+        )
+
+    @staticmethod
+    def _is_fresh(snapshot, now):
+        return now - snapshot.built_at <= settings.DOCTOR_CATALOG_MAX_AGE
+
+    def invalidate(self):
+        """Drop this worker's snapshot and move the global version."""
+        bump_version()
+        self._snapshot = None
+        self._disabled_version = None
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'size': len(snapshot.rows) if snapshot else 0,
+        }
+
+    def _build(self, version):
+        from .models import Doctor
+        from .serializers import DoctorListSerializer
+
+        limit = settings.DOCTOR_CATALOG_MAX_ENTRIES
+        doctors = list(Doctor.objects.filter(is_active=True).order_by('name', 'id')[:limit + 1])
+        self.refreshes += 1
+        if len(doctors) > limit:
+            # Too big to hold in every worker: serve everything from the DB
+            # until the catalog changes again.
+            self._disabled_version = version
+            return None
+        fields = tuple(DoctorListSerializer.Meta.fields)
+        rows = tuple(
+            tuple(data[field] for field in fields)
+            for data in DoctorListSerializer(doctors, many=True).data
+        )
+        has_inactive = Doctor.objects.filter(is_active=False).exists()
+        return CatalogSnapshot(version, fields, rows, has_inactive)
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    # A random token rather than a counter: if the key is evicted, the next
+    # reader creates a fresh token and every worker rebuilds.
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+doctor_catalog = DoctorCatalog()
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from doctors.availability import rebuild_availability
+from doctors.models import Doctor
+
+
+class Command(BaseCommand):
+    help = (
+        'Parse availability_hours of every doctor into DoctorAvailability rows, '
+        'in batches. Safe to re-run; each batch replaces its doctors\' rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Doctors per batch (default: 500).')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        queryset = Doctor.objects.only('id', 'name', 'specialization', 'availability_hours').order_by('pk')
+        done = 0
+        unparsed = []
+        last_pk = None
+        while True:
+            batch = queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            unparsed.extend(rebuild_availability(batch))
+            done += len(batch)
+            last_pk = batch[-1].pk
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{done} doctors processed')
+
+        for doctor in unparsed:
+            self.stdout.write(self.style.WARNING(
+                f'Doctor {doctor.pk} ({doctor.name}): could not parse {doctor.availability_hours!r}'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled availability for {done - len(unparsed)} of {done} doctors.'
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0002_doctor_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['is_active', 'specialization', 'hospital_affiliation', 'consultation_fee', 'years_of_experience'], name='doctor_facet_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0003_doctor_facet_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('specialization', models.CharField(choices=[('CARDIOLOGY', 'Cardiology'), ('DERMATOLOGY', 'Dermatology'), ('ENDOCRINOLOGY', 'Endocrinology'), ('GASTROENTEROLOGY', 'Gastroenterology'), ('GENERAL_PRACTICE', 'General Practice'), ('NEUROLOGY', 'Neurology'), ('ONCOLOGY', 'Oncology'), ('ORTHOPEDICS', 'Orthopedics'), ('PEDIATRICS', 'Pediatrics'), ('PSYCHIATRY', 'Psychiatry'), ('RADIOLOGY', 'Radiology'), ('SURGERY', 'Surgery'), ('UROLOGY', 'Urology')], max_length=50)),
+                ('weekday', models.PositiveSmallIntegerField(help_text='0 = Monday')),
+                ('start_minute', models.PositiveSmallIntegerField(help_text='Minutes after midnight')),
+                ('end_minute', models.PositiveSmallIntegerField(help_text='Minutes after midnight, exclusive')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_slots', to='doctors.doctor')),
+            ],
+            options={
+                'verbose_name_plural': 'doctor availability',
+                'ordering': ['doctor', 'weekday', 'start_minute'],
+                'indexes': [models.Index(fields=['specialization', 'weekday', 'start_minute', 'end_minute', 'doctor'], name='availability_spec_slot_idx'), models.Index(fields=['weekday', 'start_minute', 'end_minute', 'doctor'], name='availability_slot_idx')],
+            },
+        ),
+    ]
@@ -33,6 +33,68 @@ class Doctor(models.Model):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='doctor_name_idx'),
+            models.Index(fields=['specialization', 'is_active', 'name', 'id'], name='doctor_spec_active_name_idx'),
+            models.Index(
+                fields=['name', 'id'], name='doctor_active_name_idx',
+                condition=models.Q(is_active=True)
+            ),
+            # doctors.search.facet_groups: GROUP BY all of these, index-only
+            models.Index(
+                fields=['is_active', 'specialization', 'hospital_affiliation', 'consultation_fee', 'years_of_experience'],
+                name='doctor_facet_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Dr. {self.name} - {self.specialization}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.mark_availability_synced()
+        # What analytics.signals last counted; deferred fields read as unknown
+        instance._loaded_roster = (instance.__dict__.get('specialization'), instance.__dict__.get('is_active'))
+        return instance
+
+    def availability_key(self):
+        # The fields copied into DoctorAvailability; deferred ones read as unknown.
+        deferred = self.get_deferred_fields()
+        if deferred & {'availability_hours', 'specialization'}:
+            return None
+        return self.availability_hours, self.specialization
+
+    def mark_availability_synced(self):
+        self._synced_availability = self.availability_key()
+
+    def availability_changed(self):
+        key = self.availability_key()
+        return key is None or key != getattr(self, '_synced_availability', None)
+
+
+class DoctorAvailability(models.Model):
+    """One weekly interval parsed from ``Doctor.availability_hours``, see ``doctors.availability``."""
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='availability_slots')
+    # Copied from the doctor so a slot lookup by specialization is one index range
+    specialization = models.CharField(max_length=50, choices=Doctor.SPECIALIZATION_CHOICES)
+    weekday = models.PositiveSmallIntegerField(help_text="0 = Monday")
+    start_minute = models.PositiveSmallIntegerField(help_text="Minutes after midnight")
+    end_minute = models.PositiveSmallIntegerField(help_text="Minutes after midnight, exclusive")
+
+    class Meta:
+        ordering = ['doctor', 'weekday', 'start_minute']
+        verbose_name_plural = 'doctor availability'
+        indexes = [
+            models.Index(
+                fields=['specialization', 'weekday', 'start_minute', 'end_minute', 'doctor'],
+                name='availability_spec_slot_idx'
+            ),
+            models.Index(
+                fields=['weekday', 'start_minute', 'end_minute', 'doctor'],
+                name='availability_slot_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor_id}: {self.weekday} {self.start_minute}-{self.end_minute}"
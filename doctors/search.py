@@ -0,0 +1,182 @@
+"""
+Faceted doctor search.
+
+Facet counts come from one grouped query over the facet columns (served by
+``doctor_facet_idx``), cached under the doctor catalog version, so they are
+recomputed only after a doctor changes. Each request then rolls the groups
+up in Python: every facet is counted with all the other filters applied
+but not its own, so the booking UI can show what widening that filter
+would add.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from healthcare_backend.db.replicas import use_primary
+
+from .catalog import current_version
+from .models import Doctor
+
+FACETS_KEY = 'doctors:facets:{}'
+GROUP_FIELDS = ('is_active', 'specialization', 'hospital_affiliation', 'consultation_fee', 'years_of_experience')
+
+# Lower bounds of the fee buckets (the last one is open-ended)
+FEE_BUCKETS = (Decimal('0'), Decimal('50'), Decimal('100'), Decimal('200'), Decimal('500'))
+# "At least N years" experience facet
+EXPERIENCE_THRESHOLDS = (0, 5, 10, 20, 30)
+
+
+class DoctorSearchFilters:
+    """The filters of a search request, parsed from its query params."""
+
+    def __init__(self, specializations=(), hospitals=(), fee_min=None, fee_max=None,
+                 experience_min=None, is_active=True):
+        self.specializations = set(specializations)
+        self.hospitals = set(hospitals)
+        self.fee_min = fee_min
+        self.fee_max = fee_max
+        self.experience_min = experience_min
+        self.is_active = is_active
+
+    @classmethod
+    def from_query_params(cls, params):
+        """Parse ``params``; returns ``(filters, errors)``."""
+        errors = {}
+        specializations = [value for value in params.getlist('specialization') if value]
+        valid = {code for code, _ in Doctor.SPECIALIZATION_CHOICES}
+        unknown = [value for value in specializations if value not in valid]
+        if unknown:
+            errors['specialization'] = [f'Unknown specialization: {value}' for value in unknown]
+
+        def decimal_param(name):
+            value = params.get(name)
+            if value in (None, ''):
+                return None
+            try:
+                number = Decimal(value)
+            except InvalidOperation:
+                errors[name] = ['A valid number is required.']
+                return None
+            if not number.is_finite() or number < 0:
+                errors[name] = ['Must be a non-negative number.']
+                return None
+            return number
+
+        fee_min = decimal_param('fee_min')
+        fee_max = decimal_param('fee_max')
+        if fee_min is not None and fee_max is not None and fee_min > fee_max:
+            errors['fee_max'] = ['Must not be less than fee_min.']
+
+        experience_min = params.get('experience_min')
+        if experience_min in (None, ''):
+            experience_min = None
+        elif not experience_min.isdigit():
+            errors['experience_min'] = ['A non-negative integer is required.']
+            experience_min = None
+        else:
+            experience_min = int(experience_min)
+
+        is_active = params.get('is_active', 'true').lower() == 'true'
+        filters = cls(
+            specializations, [value for value in params.getlist('hospital') if value],
+            fee_min, fee_max, experience_min, is_active
+        )
+        return filters, errors
+
+    def apply(self, queryset):
+        queryset = queryset.filter(is_active=self.is_active)
+        if self.specializations:
+            queryset = queryset.filter(specialization__in=sorted(self.specializations))
+        if self.hospitals:
+            queryset = queryset.filter(hospital_affiliation__in=sorted(self.hospitals))
+        if self.fee_min is not None:
+            queryset = queryset.filter(consultation_fee__gte=self.fee_min)
+        if self.fee_max is not None:
+            queryset = queryset.filter(consultation_fee__lte=self.fee_max)
+        if self.experience_min is not None:
+            queryset = queryset.filter(years_of_experience__gte=self.experience_min)
+        return queryset
+
+    def matches(self, group, skip=None):
+        """Whether a facet group passes every filter except ``skip``."""
+        is_active, specialization, hospital, fee, years, _ = group
+        if is_active != self.is_active:
+            return False
+        if skip != 'specialization' and self.specializations and specialization not in self.specializations:
+            return False
+        if skip != 'hospital' and self.hospitals and hospital not in self.hospitals:
+            return False
+        if skip != 'fee':
+            if self.fee_min is not None and fee < self.fee_min:
+                return False
+            if self.fee_max is not None and fee > self.fee_max:
+                return False
+        if skip != 'experience' and self.experience_min is not None and years < self.experience_min:
+            return False
+        return True
+
+
+def facet_groups():
+    """
+    ``(is_active, specialization, hospital, fee, years, count)`` for every
+    distinct combination, cached until the doctor catalog changes.
+    """
+    # Read the version first: a change committed while the query runs then
+    # lands under a newer version and this result is never served for it.
+    key = FACETS_KEY.format(current_version())
+    groups = cache.get(key)
+    if groups is None:
+        with use_primary():
+            groups = [tuple(row) for row in facet_queryset()]
+        cache.set(key, groups, settings.DOCTOR_CATALOG_MAX_AGE)
+    return groups
+
+
+def facet_queryset():
+    return Doctor.objects.order_by().values_list(*GROUP_FIELDS).annotate(n=Count('id'))
+
+
+def facet_counts(groups, filters):
+    specializations, hospitals = {}, {}
+    fees = [0] * len(FEE_BUCKETS)
+    experience = [0] * len(EXPERIENCE_THRESHOLDS)
+    total = 0
+    for group in groups:
+        _, specialization, hospital, fee, years, count = group
+        if filters.matches(group, skip='specialization'):
+            specializations[specialization] = specializations.get(specialization, 0) + count
+        if filters.matches(group, skip='hospital'):
+            hospitals[hospital] = hospitals.get(hospital, 0) + count
+        if filters.matches(group, skip='fee'):
+            bucket = sum(1 for lower in FEE_BUCKETS if fee >= lower) - 1
+            fees[bucket] += count
+        if filters.matches(group, skip='experience'):
+            for index, threshold in enumerate(EXPERIENCE_THRESHOLDS):
+                if years >= threshold:
+                    experience[index] += count
+        if filters.matches(group):
+            total += count
+
+    return {
+        'total': total,
+        'specialization': [
+            {'value': value, 'count': count} for value, count in sorted(specializations.items())
+        ],
+        'hospital': [
+            {'value': value, 'count': count}
+            for value, count in sorted(hospitals.items(), key=lambda item: (-item[1], item[0]))
+        ],
+        'fee': [
+            {
+                'min': str(lower),
+                'max': str(FEE_BUCKETS[index + 1]) if index + 1 < len(FEE_BUCKETS) else None,
+                'count': fees[index],
+            }
+            for index, lower in enumerate(FEE_BUCKETS)
+        ],
+        'experience': [
+            {'min': threshold, 'count': experience[index]}
+            for index, threshold in enumerate(EXPERIENCE_THRESHOLDS)
+        ],
+    }
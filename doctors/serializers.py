@@ -1,7 +1,10 @@
+from django.db.models import Manager, prefetch_related_objects
 from rest_framework import serializers
+from healthcare_backend.serializers import SparseFieldsetSerializerMixin
+from .catalog import doctor_catalog
 from .models import Doctor
 
-class DoctorSerializer(serializers.ModelSerializer):
+class DoctorSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Doctor
         fields = [
@@ -32,10 +35,78 @@ class DoctorUpdateSerializer(DoctorSerializer):
     class Meta(DoctorSerializer.Meta):
         pass
 
-class DoctorListSerializer(serializers.ModelSerializer):
+class DoctorListSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Doctor
         fields = [
             'id', 'name', 'specialization', 'hospital_affiliation',
             'consultation_fee', 'years_of_experience', 'is_active'
         ]
+
+def uncatalogued(instances, source='doctor'):
+    """The ``instances`` whose ``source`` doctor is neither in the catalog nor loaded."""
+    return [
+        instance for instance in instances
+        if doctor_catalog.get(getattr(instance, f'{source}_id')) is None
+        and not instance._meta.get_field(source).is_cached(instance)
+    ]
+
+
+def catalog_sources(serializer):
+    """Sources of ``serializer``'s (remaining) ``CatalogDoctorSerializer`` fields."""
+    return [field.source for field in serializer.fields.values() if isinstance(field, CatalogDoctorSerializer)]
+
+
+def load_uncatalogued_doctors(instances, sources=('doctor',)):
+    """Load the doctors the catalog doesn't hold (inactive ones) in one query per source."""
+    for source in sources:
+        missing = uncatalogued(instances, source)
+        if missing:
+            prefetch_related_objects(missing, source)
+
+
+async def aload_uncatalogued_doctors(instances, sources=('doctor',)):
+    for source in sources:
+        missing = uncatalogued(instances, source)
+        if not missing:
+            continue
+        ids = {getattr(instance, f'{source}_id') for instance in missing}
+        doctors = {doctor.pk: doctor async for doctor in Doctor.objects.filter(pk__in=ids)}
+        for instance in missing:
+            doctor = doctors.get(getattr(instance, f'{source}_id'))
+            if doctor is not None:
+                setattr(instance, source, doctor)
+
+
+class CatalogDoctorListSerializer(serializers.ListSerializer):
+    """
+    ``list_serializer_class`` for serializers nesting a
+    ``CatalogDoctorSerializer``: the rows' querysets don't join the doctor,
+    and the few doctors missing from the catalog are loaded together.
+    """
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, Manager) else data)
+        load_uncatalogued_doctors(rows, catalog_sources(self.child))
+        return super().to_representation(rows)
+
+
+class CatalogDoctorSerializer(DoctorListSerializer):
+    """
+    Nested ``DoctorListSerializer`` that reads active doctors from the
+    in-process catalog instead of the related row.
+    """
+    # query_plan selects the doctor_id only
+    loads_by_id = True
+
+    def get_attribute(self, instance):
+        cached = doctor_catalog.get(getattr(instance, f'{self.source}_id', None))
+        if cached is not None:
+            return cached
+        return super().get_attribute(instance)
+
+    def to_representation(self, instance):
+        if isinstance(instance, dict):
+            if len(self.fields) != len(instance):
+                return {name: instance[name] for name in self.fields}
+            return instance
+        return super().to_representation(instance)
@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .availability import rebuild_availability
+from .catalog import doctor_catalog
+from .models import Doctor
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+def invalidate_doctor_catalog(sender, **kwargs):
+    # After commit, so a worker rebuilding in between can't label a
+    # snapshot of the old rows with the new version.
+    transaction.on_commit(doctor_catalog.invalidate)
+
+
+@receiver(post_save, sender=Doctor)
+def sync_doctor_availability(sender, instance, using, update_fields=None, **kwargs):
+    if update_fields is not None and not {'availability_hours', 'specialization'} & set(update_fields):
+        return
+    if instance.availability_changed():
+        rebuild_availability([instance], using=using)
@@ -1,10 +1,12 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from healthcare_backend.async_views import async_routes
 from .views import DoctorViewSet
 
 router = DefaultRouter()
 router.register(r'', DoctorViewSet, basename='doctor')
 
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(async_routes(router.urls) if settings.ASYNC_VIEWS_ENABLED else router.urls)),
 ]
@@ -1,25 +1,37 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from healthcare_backend.async_views import AsyncViewSetMixin
+from healthcare_backend.deletion import delete_or_start
+from jobs.serializers import JobSerializer
+from healthcare_backend.mixins import ConditionalGetMixin, SparseFieldsetMixin
+from .availability import available_doctors, parse_slot
+from .catalog import doctor_catalog
 from .models import Doctor
+from .search import DoctorSearchFilters, facet_counts, facet_groups
 from .serializers import (
     DoctorSerializer, DoctorCreateSerializer, 
     DoctorUpdateSerializer, DoctorListSerializer
 )
 
-class DoctorViewSet(viewsets.ModelViewSet):
+class DoctorViewSet(ConditionalGetMixin, SparseFieldsetMixin, AsyncViewSetMixin, viewsets.ModelViewSet):
     queryset = Doctor.objects.all()
     serializer_class = DoctorSerializer
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('name', 'id')
+    sparse_actions = ('list', 'retrieve', 'search', 'available')
+    async_actions = {'list': 'alist'}
 
     def get_serializer_class(self):
         if self.action == 'create':
             return DoctorCreateSerializer
         elif self.action in ['update', 'partial_update']:
             return DoctorUpdateSerializer
-        elif self.action == 'list':
+        elif self.action in ['list', 'search', 'available']:
             return DoctorListSerializer
         return DoctorSerializer
 
@@ -56,9 +68,64 @@ class DoctorViewSet(viewsets.ModelViewSet):
                 'details': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def get_catalog_snapshot(self):
+        """
+        The in-process doctor catalog snapshot, when it can answer this list
+        query. Keyset pagination needs a queryset, so it always uses the DB.
+        Looked up once per request so validators and body agree.
+        """
+        if not hasattr(self, '_catalog_snapshot'):
+            self._catalog_snapshot = None
+            wants_keyset = getattr(self.paginator, 'wants_keyset', None)
+            if not (wants_keyset and wants_keyset(self.request, self)):
+                is_active = self.request.query_params.get('is_active', None)
+                if is_active is not None:
+                    is_active = is_active.lower() == 'true'
+                self._catalog_snapshot = doctor_catalog.list_snapshot(is_active=is_active)
+        return self._catalog_snapshot
+
+    def get_catalog_rows(self):
+        snapshot = self.get_catalog_snapshot()
+        if snapshot is None:
+            return None
+        rows = doctor_catalog.list(
+            snapshot,
+            specialization=self.request.query_params.get('specialization', None)
+        )
+        if self.get_field_selection() is not None:
+            fields = list(self.get_serializer().fields)
+            rows = [{name: row[name] for name in fields} for row in rows]
+        return rows
+
+    def get_list_validators(self):
+        snapshot = self.get_catalog_snapshot()
+        if snapshot is not None:
+            return self.make_validators(snapshot.version)
+        return super().get_list_validators()
+
+    async def aget_list_validators(self):
+        snapshot = self.get_catalog_snapshot()
+        if snapshot is not None:
+            return self.make_validators(snapshot.version)
+        return await super().aget_list_validators()
+
+    async def aprepare(self, request):
+        await doctor_catalog.asnapshot()
+
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
+            rows = self.get_catalog_rows()
+            if rows is not None:
+                page = self.paginate_queryset(rows)
+                if page is not None:
+                    return self.get_paginated_response(page)
+                return Response({
+                    'message': 'Doctors retrieved successfully',
+                    'doctors': rows,
+                    'count': len(rows)
+                }, status=status.HTTP_200_OK)
+            
+            queryset = self.filter_queryset(self.get_queryset())
             page = self.paginate_queryset(queryset)
             
             if page is not None:
@@ -72,6 +139,50 @@ class DoctorViewSet(viewsets.ModelViewSet):
                 'count': queryset.count()
             }, status=status.HTTP_200_OK)
         
+        except NotFound as e:
+            return Response({
+                'error': str(e.detail)
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        except Exception as e:
+            return Response({
+                'error': 'Internal server error',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def alist(self, request, *args, **kwargs):
+        try:
+            rows = self.get_catalog_rows()
+            if rows is not None:
+                page = self.paginate_queryset(rows)
+                if page is not None:
+                    return self.get_paginated_response(page)
+                return Response({
+                    'message': 'Doctors retrieved successfully',
+                    'doctors': rows,
+                    'count': len(rows)
+                }, status=status.HTTP_200_OK)
+            
+            queryset = self.filter_queryset(self.get_queryset())
+            page = await self.apaginate_queryset(queryset)
+            
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            
+            doctors = [doctor async for doctor in queryset]
+            serializer = self.get_serializer(doctors, many=True)
+            return Response({
+                'message': 'Doctors retrieved successfully',
+                'doctors': serializer.data,
+                'count': len(doctors)
+            }, status=status.HTTP_200_OK)
+        
+        except NotFound as e:
+            return Response({
+                'error': str(e.detail)
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         except Exception as e:
             return Response({
                 'error': 'Internal server error',
@@ -130,7 +241,15 @@ class DoctorViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
-            self.perform_destroy(instance)
+            # Large deletes are queued; poll the job
+            job = delete_or_start(instance, request.user)
+            if job is not None:
+                return Response({
+                    'message': 'Doctor deletion queued',
+                    'job': JobSerializer(job).data
+                }, status=status.HTTP_202_ACCEPTED, headers={
+                    'Location': reverse('job-detail', args=[job.pk])
+                })
             return Response({
                 'message': 'Doctor deleted successfully'
             }, status=status.HTTP_200_OK)
@@ -157,3 +276,81 @@ class DoctorViewSet(viewsets.ModelViewSet):
             'message': 'Specializations retrieved successfully',
             'specializations': specializations
         }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Filter doctors by specialization, hospital, fee range and experience, with facet counts"""
+        try:
+            filters, errors = DoctorSearchFilters.from_query_params(request.query_params)
+            if errors:
+                return Response({
+                    'error': 'Invalid search filters',
+                    'details': errors
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            facets = facet_counts(facet_groups(), filters)
+            queryset = self.filter_queryset(filters.apply(Doctor.objects.all())).order_by(*self.keyset_ordering)
+            page = self.paginate_queryset(queryset)
+            
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                response = self.get_paginated_response(serializer.data)
+                response.data['facets'] = facets
+                return response
+            
+            serializer = self.get_serializer(queryset, many=True)
+            return Response({
+                'message': 'Doctors retrieved successfully',
+                'doctors': serializer.data,
+                'count': facets['total'],
+                'facets': facets
+            }, status=status.HTTP_200_OK)
+        
+        except NotFound as e:
+            return Response({
+                'error': str(e.detail)
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        except Exception as e:
+            return Response({
+                'error': 'Internal server error',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'])
+    def available(self, request):
+        """Active doctors free for a time slot (day, time, duration), optionally of one specialization"""
+        try:
+            slot, errors = parse_slot(request.query_params)
+            if errors:
+                return Response({
+                    'error': 'Invalid time slot',
+                    'details': errors
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            queryset = self.filter_queryset(
+                available_doctors(Doctor.objects.all(), *slot)
+            ).order_by(*self.keyset_ordering)
+            page = self.paginate_queryset(queryset)
+            
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            
+            serializer = self.get_serializer(queryset, many=True)
+            return Response({
+                'message': 'Available doctors retrieved successfully',
+                'doctors': serializer.data,
+                'count': len(serializer.data)
+            }, status=status.HTTP_200_OK)
+        
+        except NotFound as e:
+            return Response({
+                'error': str(e.detail)
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        except Exception as e:
+            return Response({
+                'error': 'Internal server error',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
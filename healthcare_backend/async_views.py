@@ -0,0 +1,149 @@
+"""
+Async GET handlers for the hot read endpoints.
+
+DRF 3.14 views are sync only, so under ASGI every request is handed to a
+thread. Viewsets using ``AsyncViewSetMixin`` declare ``async_actions``,
+coroutine versions of some of their GET actions. When
+``ASYNC_VIEWS_ENABLED`` is set, ``async_routes`` wraps the router's URL
+patterns so a GET to one of those actions runs ``adispatch`` in the event
+loop. Every other method (and ``?format=`` suffix routes) still goes
+through the normal sync viewset.
+
+``adispatch`` follows ``APIView.dispatch`` step by step and reuses the
+viewset's own ``get_queryset``, ``filter_queryset``, serializers, paginator
+and exception handling. Only the steps that touch the database are
+replaced: authentication (``aauthenticate``), conditional-GET validators,
+pagination and the object lookup. URLs and responses are unchanged.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from django.urls import URLPattern, URLResolver
+from rest_framework.response import Response
+
+
+class AsyncViewSetMixin:
+    async_actions = {}
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            handler = getattr(self, self.async_actions[self.action])
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.render_response(self.response)
+
+    async def ainitial(self, request, *args, **kwargs):
+        """``initial`` with authentication awaited."""
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        self.check_throttles(request)
+        await self.aprepare(request)
+
+    async def aperform_authentication(self, request):
+        for authenticator in request.authenticators:
+            aauthenticate = getattr(authenticator, 'aauthenticate', None)
+            try:
+                if aauthenticate is not None:
+                    user_auth_tuple = await aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except Exception:
+                request._not_authenticated()
+                raise
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+        request._not_authenticated()
+
+    async def aprepare(self, request):
+        """Hook to load, off the event loop, state the sync code reads lazily."""
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = await aget_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+
+    def render_response(self, response):
+        # Render here: Django would otherwise call a DRF Response's render()
+        # through sync_to_async, which costs a thread hop.
+        if not isinstance(response, Response):
+            return response
+        response.render()
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        return rendered
+
+
+async def aget_object_or_404(queryset, **kwargs):
+    """``get_object_or_404`` as DRF uses it, through the async ORM."""
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+    except (TypeError, ValueError, ValidationError):
+        raise Http404
+
+
+def async_route(sync_view):
+    """
+    Wrap a router-generated viewset view: GETs for an action in the viewset's
+    ``async_actions`` run ``adispatch``, everything else the sync view.
+    """
+    cls, actions, initkwargs = sync_view.cls, dict(sync_view.actions), sync_view.initkwargs
+    if 'get' in actions and 'head' not in actions:
+        actions['head'] = actions['get']
+    run_sync = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD') and 'format' not in kwargs:
+            self = cls(**initkwargs)
+            self.action_map = actions
+            return await self.adispatch(request, *args, **kwargs)
+        return await run_sync(request, *args, **kwargs)
+
+    view.cls = cls
+    view.initkwargs = initkwargs
+    view.actions = sync_view.actions
+    view.csrf_exempt = True
+    return view
+
+
+def async_routes(urlpatterns):
+    """Return ``urlpatterns`` with the views that have async GET actions wrapped."""
+    routes = []
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLResolver):
+            routes.append(pattern)
+            continue
+        callback = pattern.callback
+        cls = getattr(callback, 'cls', None)
+        action = getattr(callback, 'actions', {}).get('get')
+        if action is not None and action in getattr(cls, 'async_actions', {}):
+            pattern = URLPattern(pattern.pattern, async_route(callback), pattern.default_args, pattern.name)
+        routes.append(pattern)
+    return routes
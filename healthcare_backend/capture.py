@@ -0,0 +1,218 @@
+"""
+Sampled request capture, for replaying real traffic shapes with
+``replay_requests``.
+
+``RequestCaptureMiddleware`` picks ``REQUEST_CAPTURE_SAMPLE_RATE`` of the
+requests and records method, path, route name, query, JSON body, user id,
+status and latency. Unsampled requests cost one ``random()`` call. Values of
+``REQUEST_CAPTURE_MASKED_FIELDS`` (patient details, passwords, tokens, the
+search query) are replaced by ``{"$masked": "<type>", "len": n}`` at any
+depth, so a capture holds the shape of a body but no PHI; ``unmask`` fills
+them back in with generated values for the replay. Bodies that aren't JSON
+or are larger than ``REQUEST_CAPTURE_MAX_BODY`` bytes are recorded by size
+only.
+
+Records are handed to a background thread that appends them to
+``<REQUEST_CAPTURE_DIR>/requests-<pid>.jsonl``, one file per worker process so
+writes never interleave. If the writer falls behind, records are dropped
+rather than slowing requests down; ``get_writer().stats()`` counts them.
+"""
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from authentication.tokens import bearer_user_id
+
+MASK_KEY = '$masked'
+
+
+def mask(data, fields):
+    """``data`` with the values of ``fields`` (at any depth) replaced by their shape."""
+    if isinstance(data, dict):
+        return {
+            key: masked_value(value) if key in fields else mask(value, fields)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [mask(item, fields) for item in data]
+    return data
+
+
+def masked_value(value):
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return [masked_value(item) for item in value]
+    return {MASK_KEY: type(value).__name__, 'len': len(str(value))}
+
+
+def unmask(data, fill, field=None):
+    """
+    The reverse of ``mask`` for replays: every masked value is replaced by
+    ``fill(field, marker)``, where ``field`` is the key it was found under.
+    """
+    if isinstance(data, dict):
+        if MASK_KEY in data:
+            return fill(field, data)
+        return {key: unmask(value, fill, key) for key, value in data.items()}
+    if isinstance(data, list):
+        return [unmask(item, fill, field) for item in data]
+    return data
+
+
+class CaptureWriter:
+    """Appends records to this process' capture file from a daemon thread."""
+
+    def __init__(self, directory, queue_size):
+        self.directory = directory
+        self.queue_size = queue_size
+        self.written = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def submit(self, record):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self):
+        return {
+            'written': self.written,
+            'dropped': self.dropped,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    def close(self, timeout=5.0):
+        """Write out what is queued; called at exit."""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _ensure_thread(self):
+        # A forked worker inherits the queue but not the thread.
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(self.queue_size)
+                    self._thread = threading.Thread(target=self._run, name='request-capture', daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+
+    def _run(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'requests-{os.getpid()}.jsonl')
+        with open(path, 'a', encoding='utf-8') as f:
+            while True:
+                record = self._queue.get()
+                batch = [record]
+                # Drain whatever else is waiting into the same write
+                while record is not None and len(batch) < 1000:
+                    try:
+                        record = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.append(record)
+                lines = [json.dumps(item, separators=(',', ':'), default=str) for item in batch if item is not None]
+                if lines:
+                    f.write('\n'.join(lines) + '\n')
+                    f.flush()
+                    self.written += len(lines)
+                if batch[-1] is None:
+                    return
+
+
+_writer = None
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        _writer = CaptureWriter(settings.REQUEST_CAPTURE_DIR, settings.REQUEST_CAPTURE_QUEUE_SIZE)
+        atexit.register(_writer.close)
+    return _writer
+
+
+class RequestCaptureMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_CAPTURE_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_CAPTURE_SAMPLE_RATE
+        self.max_body = settings.REQUEST_CAPTURE_MAX_BODY
+        self.masked_fields = frozenset(settings.REQUEST_CAPTURE_MASKED_FIELDS)
+        self.writer = get_writer()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        record = self.start(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.finish(record, request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+        record = self.start(request)
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.finish(record, request, response, time.perf_counter() - started)
+        return response
+
+    def start(self, request):
+        # The body has to be read before the view consumes the stream.
+        content_type = request.content_type or ''
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        body = None
+        if 0 < length <= self.max_body and content_type == 'application/json':
+            try:
+                body = mask(json.loads(request.body), self.masked_fields)
+            except ValueError:
+                body = None
+        query = {
+            key: masked_value(values) if key in self.masked_fields else values
+            for key, values in request.GET.lists()
+        }
+        return {
+            'ts': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'query': query,
+            'content_type': content_type,
+            'accept': request.META.get('HTTP_ACCEPT', ''),
+            'body_bytes': length,
+            'body': body,
+            'user': bearer_user_id(request),
+        }
+
+    def finish(self, record, request, response, duration):
+        match = getattr(request, 'resolver_match', None)
+        record['endpoint'] = (match.url_name or match.route) if match is not None else None
+        record['status'] = response.status_code
+        record['latency_ms'] = round(duration * 1000, 3)
+        self.writer.submit(record)
@@ -0,0 +1,94 @@
+"""
+Opt-in response compression.
+
+Like Django's ``GZipMiddleware``, but only above ``RESPONSE_COMPRESSION_MIN_SIZE``
+bytes, and with Brotli preferred when the ``brotli`` package is installed and
+the client accepts it. Streaming responses (the exports) are gzipped chunk
+by chunk.
+"""
+import gzip
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+
+def accepted_encodings(header):
+    """Codings in an ``Accept-Encoding`` header, minus any with ``q=0``."""
+    codings = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        params = params.replace(' ', '')
+        if coding and params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            codings.add(coding.lower())
+    return codings
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'RESPONSE_COMPRESSION_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.min_size = settings.RESPONSE_COMPRESSION_MIN_SIZE
+        self.gzip_level = settings.RESPONSE_COMPRESSION_GZIP_LEVEL
+        self.brotli_quality = settings.RESPONSE_COMPRESSION_BROTLI_QUALITY
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if response.has_header('Content-Encoding') or getattr(response, 'is_async', False):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codings = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+
+        if response.streaming:
+            if 'gzip' not in codings:
+                return response
+            response.streaming_content = compress_sequence(response.streaming_content)
+            del response.headers['Content-Length']
+            return self.mark_encoded(response, 'gzip')
+
+        if len(response.content) < self.min_size:
+            return response
+        if brotli is not None and 'br' in codings:
+            coding = 'br'
+            content = brotli.compress(response.content, quality=self.brotli_quality)
+        elif 'gzip' in codings:
+            coding = 'gzip'
+            content = gzip.compress(response.content, compresslevel=self.gzip_level, mtime=0)
+        else:
+            return response
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        return self.mark_encoded(response, coding)
+
+    def mark_encoded(self, response, coding):
+        # The body is no longer byte-identical, so a strong ETag must become
+        # weak (as Django's GZipMiddleware does); If-None-Match still matches.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        if not response.streaming:
+            response['Content-Length'] = str(len(response.content))
+        response['Content-Encoding'] = coding
+        return response
@@ -0,0 +1,18 @@
+def replica_databases(primary, hosts):
+    """
+    ``DATABASES`` entries for replicas of ``primary``, one per item of the
+    comma-separated ``hosts`` (``host[:port][/name]``). Tests mirror them to
+    ``default``.
+    """
+    databases = {}
+    for index, spec in enumerate(filter(None, (item.strip() for item in hosts.split(','))), 1):
+        address, _, name = spec.partition('/')
+        host, _, port = address.partition(':')
+        databases[f'replica_{index}'] = {
+            **primary,
+            'HOST': host or primary.get('HOST', ''),
+            'PORT': port or primary.get('PORT', ''),
+            'NAME': name or primary['NAME'],
+            'TEST': {'MIRROR': 'default'},
+        }
+    return databases
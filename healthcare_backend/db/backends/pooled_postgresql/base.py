@@ -0,0 +1,63 @@
+"""
+PostgreSQL backend that reuses connections from a per-process pool.
+
+Use it as the ``ENGINE`` and size the pool with a ``POOL`` dict next to it in
+``DATABASES`` (keys as in ``POOL_DEFAULTS``). Keep ``CONN_MAX_AGE`` at 0:
+Django then "closes" the connection at the end of each request, which here
+hands it back to the pool.
+"""
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+
+from .creation import DatabaseCreation
+from .pool import get_pool
+
+POOL_DEFAULTS = {
+    'MIN_SIZE': 0,
+    'MAX_SIZE': 10,
+    # Seconds to wait for a free connection before raising OperationalError.
+    'TIMEOUT': 10.0,
+    # Idle connections above MIN_SIZE are closed after this many seconds.
+    'IDLE_TIMEOUT': 300.0,
+    'MAX_LIFETIME': 3600.0,
+    # A connection idle for longer than this runs SELECT 1 before reuse.
+    'HEALTH_CHECK_INTERVAL': 30.0,
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connection_pool = None
+
+    def get_connection_pool(self, conn_params):
+        options = {**POOL_DEFAULTS, **self.settings_dict.get('POOL', {})}
+        # Keyed on the parameters too: the test runner points the same alias
+        # at another database.
+        key = tuple(sorted((name, repr(value)) for name, value in conn_params.items()))
+        return get_pool(self.alias, key, {name.lower(): value for name, value in options.items()})
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self.get_connection_pool(conn_params)
+
+        def connect():
+            connection = super(DatabaseWrapper, self).get_new_connection(conn_params)
+            return connection, self.isolation_level
+
+        pool.fill(connect)
+        connection, self.isolation_level = pool.checkout(connect)
+        self.connection_pool = pool
+        return connection
+
+    def _close(self):
+        if self.connection is None or self.connection_pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # Django keeps using this connection object until the atomic
+                # block exits, so it can't go back to the pool.
+                self.connection.close()
+            self.connection_pool.release(self.connection)
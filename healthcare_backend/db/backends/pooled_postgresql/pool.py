@@ -0,0 +1,301 @@
+"""
+A thread-safe pool of raw database connections, shared by every
+``DatabaseWrapper`` of one alias in the process.
+
+Django keeps one connection per thread and, with ``CONN_MAX_AGE = 0``, closes
+it when the request finishes. The pooled backend checks connections out of
+here instead of opening them and hands them back instead of closing them,
+so a request reuses a warm connection. ASGI requests run their ORM calls in
+worker threads as well, so both paths share the same pool; a thread waiting
+for a free connection never blocks the event loop.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.db.backends.postgresql.base import Database
+
+# psycopg2 and psycopg 3 share these transaction status values.
+TRANSACTION_IDLE = 0
+TRANSACTION_INTRANS = 2
+TRANSACTION_INERROR = 3
+
+
+class PoolTimeout(Database.OperationalError):
+    pass
+
+
+class _Entry:
+    __slots__ = ('connection', 'created', 'last_used', 'isolation_level')
+
+    def __init__(self, connection, isolation_level):
+        self.connection = connection
+        self.created = self.last_used = time.monotonic()
+        self.isolation_level = isolation_level
+
+
+class ConnectionPool:
+    def __init__(self, name, min_size=0, max_size=10, timeout=10.0, idle_timeout=300.0,
+                 max_lifetime=3600.0, health_check_interval=30.0):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError('POOL needs 1 <= MAX_SIZE and MIN_SIZE <= MAX_SIZE')
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        self._opening = 0
+        self._waiting = 0
+        self._pid = os.getpid()
+        self.closed = False
+
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        self.opened = 0
+        self.discarded = 0
+        self.failed_checks = 0
+        self.peak_in_use = 0
+
+    @property
+    def size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def checkout(self, connect):
+        """
+        Return ``(connection, isolation_level)``, reusing an idle connection
+        if a healthy one exists. ``connect()`` opens a new connection and
+        returns the same pair. Waits up to ``timeout`` seconds when the pool
+        is at ``max_size``, then raises ``PoolTimeout``.
+        """
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            self._check_pid()
+            while True:
+                if self.closed:
+                    raise Database.InterfaceError(f'Connection pool {self.name} is closed')
+                entry = self._take_idle()
+                if entry is not None:
+                    break
+                if self.size < self.max_size:
+                    self._opening += 1
+                    break
+                remaining = started + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f'Connection pool {self.name} exhausted: no connection free '
+                        f'after {self.timeout:g}s ({self.max_size} in use)'
+                    )
+                waited = True
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        if entry is not None and not self._is_healthy(entry):
+            with self._cond:
+                self.failed_checks += 1
+                self._discard(entry.connection)
+                self._opening += 1
+            entry = None
+
+        if entry is None:
+            try:
+                connection, isolation_level = connect()
+            except BaseException:
+                with self._cond:
+                    self._opening -= 1
+                    self._cond.notify()
+                raise
+            entry = _Entry(connection, isolation_level)
+            with self._cond:
+                self._opening -= 1
+                self.opened += 1
+
+        with self._cond:
+            self._in_use[id(entry.connection)] = entry
+            self.checkouts += 1
+            self.peak_in_use = max(self.peak_in_use, len(self._in_use))
+            if waited:
+                elapsed = time.monotonic() - started
+                self.waits += 1
+                self.wait_time += elapsed
+                self.max_wait = max(self.max_wait, elapsed)
+        return entry.connection, entry.isolation_level
+
+    def fill(self, connect):
+        """Open connections until the pool holds ``min_size``."""
+        while True:
+            with self._cond:
+                if self.closed or self.size >= self.min_size:
+                    return
+                self._opening += 1
+            try:
+                connection, isolation_level = connect()
+            finally:
+                with self._cond:
+                    self._opening -= 1
+            with self._cond:
+                self.opened += 1
+                self._idle.appendleft(_Entry(connection, isolation_level))
+                self._cond.notify()
+
+    def release(self, connection):
+        """Give ``connection`` back, or close it if it isn't reusable."""
+        with self._cond:
+            self._check_pid()
+            entry = self._in_use.pop(id(connection), None)
+        if entry is None:
+            # Checked out before a fork.
+            self._close(connection)
+            return
+
+        now = time.monotonic()
+        reusable = not self.closed and not connection.closed and now - entry.created < self.max_lifetime
+        if reusable:
+            status = connection.info.transaction_status
+            if status in (TRANSACTION_INTRANS, TRANSACTION_INERROR):
+                try:
+                    connection.rollback()
+                except Database.Error:
+                    reusable = False
+            elif status != TRANSACTION_IDLE:
+                reusable = False
+
+        with self._cond:
+            if reusable and self._pid == os.getpid():
+                entry.last_used = now
+                self._idle.append(entry)
+                self._cond.notify()
+                expired = self._expire_idle(now)
+            else:
+                self.discarded += 1
+                self._cond.notify()
+                expired = [connection]
+        for stale in expired:
+            self._close(stale)
+
+    def close(self):
+        """Close idle connections; the ones in use are closed when released."""
+        with self._cond:
+            self.closed = True
+            idle = [entry.connection for entry in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for connection in idle:
+            self._close(connection)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': self._waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'peak_in_use': self.peak_in_use,
+                'saturation': len(self._in_use) / self.max_size,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_time': self.wait_time,
+                'avg_wait': self.wait_time / self.waits if self.waits else 0.0,
+                'max_wait': self.max_wait,
+                'timeouts': self.timeouts,
+                'opened': self.opened,
+                'discarded': self.discarded,
+                'failed_checks': self.failed_checks,
+            }
+
+    def _take_idle(self):
+        # Most recently used first, so surplus connections go idle and expire.
+        now = time.monotonic()
+        while self._idle:
+            entry = self._idle.pop()
+            if now - entry.created < self.max_lifetime:
+                return entry
+            self._discard(entry.connection)
+        return None
+
+    def _expire_idle(self, now):
+        expired = []
+        while (
+            self._idle and len(self._idle) + len(self._in_use) > self.min_size
+            and now - self._idle[0].last_used >= self.idle_timeout
+        ):
+            expired.append(self._idle.popleft().connection)
+            self.discarded += 1
+        return expired
+
+    def _is_healthy(self, entry):
+        if entry.connection.closed:
+            return False
+        if time.monotonic() - entry.last_used < self.health_check_interval:
+            return True
+        try:
+            with entry.connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if entry.connection.info.transaction_status != TRANSACTION_IDLE:
+                entry.connection.rollback()
+        except Database.Error:
+            return False
+        return True
+
+    def _discard(self, connection):
+        self.discarded += 1
+        self._close(connection)
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Database.Error:
+            pass
+
+    def _check_pid(self):
+        # Connections inherited over fork() belong to the parent: forget them
+        # without closing, which would end the parent's sessions.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle.clear()
+            self._in_use.clear()
+            self._opening = 0
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, key, options):
+    """The pool for ``alias`` and connection parameters ``key``."""
+    with _pools_lock:
+        pool = _pools.get((alias, key))
+        if pool is None or pool.closed:
+            pool = _pools[(alias, key)] = ConnectionPool(alias, **options)
+        return pool
+
+
+def close_pools(alias=None):
+    """Close the pools of ``alias`` (or all of them), e.g. before dropping a database."""
+    with _pools_lock:
+        pools = [pool for (name, _), pool in _pools.items() if alias is None or name == alias]
+    for pool in pools:
+        pool.close()
+
+
+def pool_stats():
+    """Stats of the open pool of each alias."""
+    with _pools_lock:
+        pools = [pool for pool in _pools.values() if not pool.closed]
+    return {pool.name: pool.stats() for pool in pools}
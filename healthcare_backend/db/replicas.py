@@ -0,0 +1,126 @@
+"""
+Read replicas with read-your-writes stickiness.
+
+``PrimaryReplicaRouter`` sends ORM reads to a random replica and every
+write to ``default``, but only inside a GET/HEAD/OPTIONS request that
+``ReplicaRoutingMiddleware`` has marked as safe. Reads go to the primary:
+
+- outside requests (management commands, shells, streamed response bodies);
+- in unsafe requests, and after the request has written anything;
+- for ``REPLICA_STICKY_SECONDS`` after the user's last write, so a list
+  right after a create sees the new row. The user comes from the bearer
+  token, and the pin lives in the shared cache so every worker honours it;
+- inside ``use_primary()``, which the per-process caches (doctor catalog,
+  revocation list, user cache) use so that replica lag is never cached.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+from authentication.tokens import bearer_user_id
+
+STICKY_KEY = 'db:primary-pin:{}'
+
+_request_state = ContextVar('replica_request_state', default=None)
+_force_primary = ContextVar('replica_force_primary', default=False)
+
+
+class RequestState:
+    __slots__ = ('replica_reads', 'wrote')
+
+    def __init__(self, replica_reads):
+        self.replica_reads = replica_reads
+        self.wrote = False
+
+
+@contextmanager
+def use_primary():
+    """
+    Send every read in the block to the primary. Meant for per-process
+    housekeeping, so writes in the block don't pin the request's user.
+    """
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def __init__(self):
+        self.replicas = list(getattr(settings, 'DATABASE_REPLICAS', ()))
+        self.databases = {DEFAULT_DB_ALIAS, *self.replicas}
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas or _force_primary.get():
+            return DEFAULT_DB_ALIAS
+        state = _request_state.get()
+        if state is None or not state.replica_reads or state.wrote:
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None and not _force_primary.get():
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._state.db in self.databases and obj2._state.db in self.databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        return db not in self.replicas
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'DATABASE_REPLICAS', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sticky_seconds = settings.REPLICA_STICKY_SECONDS
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        user_id = bearer_user_id(request)
+        replica_reads = request.method in SAFE_METHODS and not (
+            user_id is not None and cache.get(STICKY_KEY.format(user_id))
+        )
+        state = RequestState(replica_reads)
+        token = _request_state.set(state)
+        try:
+            return self.get_response(request)
+        finally:
+            _request_state.reset(token)
+            if state.wrote and user_id is not None:
+                cache.set(STICKY_KEY.format(user_id), True, self.sticky_seconds)
+
+    async def __acall__(self, request):
+        user_id = bearer_user_id(request)
+        replica_reads = request.method in SAFE_METHODS and not (
+            user_id is not None and await cache.aget(STICKY_KEY.format(user_id))
+        )
+        state = RequestState(replica_reads)
+        token = _request_state.set(state)
+        try:
+            return await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+            if state.wrote and user_id is not None:
+                await cache.aset(STICKY_KEY.format(user_id), True, self.sticky_seconds)
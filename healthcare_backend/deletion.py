@@ -0,0 +1,143 @@
+"""
+Chunked deletes of users, patients and doctors.
+
+``Model.delete()`` collects every dependent row before deleting anything:
+deleting a user loads all of their patients into memory, and a doctor's or
+patient's mappings go in one DELETE that holds its row locks until the end.
+The ``delete_*`` functions here delete the dependents DELETE_BATCH_SIZE rows
+at a time instead, walking the primary key, each batch in its own short
+transaction, and the object itself last. Every batch is an ordinary
+queryset delete, so signals and the analytics rollups stay correct. If a
+delete fails midway the batches already done stay deleted; deleting again
+finishes the job.
+
+Deletes of more than DELETE_ASYNC_THRESHOLD rows are queued as a job
+(``start_deletion``) that reports its progress on the job. Re-running it
+after an interruption picks up where it stopped.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+
+from analytics.models import DoctorCaseload, UserRollup
+from doctors.models import Doctor
+from jobs.queue import enqueue, task
+from mappings.models import PatientDoctorMapping
+from patients.models import Patient
+
+User = get_user_model()
+
+
+def id_batches(queryset, batch_size):
+    """Lists of up to ``batch_size`` primary keys of ``queryset``, in ascending order."""
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        batch = queryset if last is None else queryset.filter(pk__gt=last)
+        ids = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def delete_in_batches(queryset, batch_size=None, progress=None):
+    """
+    Delete the rows of ``queryset`` ``batch_size`` at a time. ``progress``
+    is called with the rows each batch removed, cascades included; returns
+    their total.
+    """
+    model = queryset.model
+    using = router.db_for_write(model)
+    manager = model._default_manager.using(using)
+    deleted = 0
+    for ids in id_batches(queryset.using(using), batch_size or settings.DELETE_BATCH_SIZE):
+        with transaction.atomic(using=using):
+            count, _ = manager.filter(pk__in=ids).delete()
+        deleted += count
+        if progress is not None:
+            progress(count)
+    return deleted
+
+
+def delete_instance(instance, progress=None):
+    count, _ = instance.delete(using=router.db_for_write(type(instance), instance=instance))
+    if progress is not None:
+        progress(count)
+    return count
+
+
+def delete_patient(patient, batch_size=None, progress=None):
+    mappings = PatientDoctorMapping.objects.filter(patient_id=patient.pk)
+    return delete_in_batches(mappings, batch_size, progress) + delete_instance(patient, progress)
+
+
+def delete_doctor(doctor, batch_size=None, progress=None):
+    mappings = PatientDoctorMapping.objects.filter(doctor_id=doctor.pk)
+    return delete_in_batches(mappings, batch_size, progress) + delete_instance(doctor, progress)
+
+
+def delete_user(user, batch_size=None, progress=None):
+    # Each batch of patients takes its mappings along in one DELETE
+    patients = Patient.objects.filter(created_by_id=user.pk)
+    return delete_in_batches(patients, batch_size, progress) + delete_instance(user, progress)
+
+
+DELETERS = {Patient: delete_patient, Doctor: delete_doctor, User: delete_user}
+
+
+def estimated_rows(instance):
+    """Patients, mappings and the object itself that deleting ``instance`` removes."""
+    model = type(instance)
+    if model is Doctor:
+        # The rollups are kept current, and cheaper than counting
+        mappings = DoctorCaseload.objects.filter(pk=instance.pk).values_list('mappings', flat=True).first()
+        return 1 + (mappings or 0)
+    if model is User:
+        counts = UserRollup.objects.filter(pk=instance.pk).values_list('patients', 'mappings').first()
+        return 1 + sum(counts or ())
+    return 1 + PatientDoctorMapping.objects.filter(patient_id=instance.pk).count()
+
+
+def delete_or_start(instance, user):
+    """
+    Delete ``instance`` now, or queue the delete if it removes more than
+    DELETE_ASYNC_THRESHOLD rows. Returns the queued job, or None if the
+    object was deleted right away.
+    """
+    total = estimated_rows(instance)
+    threshold = settings.DELETE_ASYNC_THRESHOLD
+    if threshold and total > threshold:
+        return start_deletion(instance, user, total)
+    DELETERS[type(instance)](instance)
+    return None
+
+
+def start_deletion(instance, user, total=None):
+    """
+    Queue the delete of ``instance``. A queued or running delete of the
+    same object is returned instead of queueing another.
+    """
+    label = instance._meta.label
+    return enqueue(
+        run_deletion, user=user, key=f'delete:{label}:{instance.pk}',
+        model=label, pk=instance.pk, total=estimated_rows(instance) if total is None else total,
+    )
+
+
+@task()
+def run_deletion(job, model, pk, total=None):
+    model = apps.get_model(model)
+    deleted = 0
+
+    def progress(count):
+        nonlocal deleted
+        deleted += count
+        job.set_progress(deleted)
+
+    job.set_progress(0, total)
+    instance = model._default_manager.using(router.db_for_write(model)).filter(pk=pk).first()
+    if instance is not None:
+        DELETERS[model](instance, progress=progress)
+    return {'deleted': deleted}
@@ -0,0 +1,139 @@
+"""
+A small HTTP/1.1 load generator for the benchmark commands.
+
+Uses only the standard library: every simulated client is an asyncio task
+with its own keep-alive connection, cycling through a list of ``Request``s
+until the deadline.
+"""
+import asyncio
+import json
+import statistics
+import time
+
+
+class Request:
+    """
+    One request to send. ``body`` is JSON-serialisable data, or a callable
+    returning it, called per request so writes can use unique values.
+    """
+    __slots__ = ('method', 'path', 'body', 'accept')
+
+    def __init__(self, method, path, body=None, accept='application/json'):
+        self.method = method
+        self.path = path
+        self.body = body
+        self.accept = accept
+
+    def encode(self, host, port, token):
+        body = self.body() if callable(self.body) else self.body
+        head = f'{self.method} {self.path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+        if token:
+            head += f'Authorization: Bearer {token}\r\n'
+        head += f'Accept: {self.accept}\r\nConnection: keep-alive\r\n'
+        payload = b''
+        if body is not None:
+            payload = json.dumps(body).encode()
+            head += f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n'
+        return (head + '\r\n').encode('latin-1') + payload
+
+
+async def run_load(host, port, requests, token, clients, duration):
+    """
+    Run ``clients`` concurrent clients for ``duration`` seconds; client ``i``
+    starts at ``requests[i % len(requests)]``. Returns throughput, latency
+    percentiles, status code counts and connection errors.
+    """
+    latencies, statuses, errors = [], {}, [0]
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, requests[i % len(requests):] + requests[:i % len(requests)], token,
+               deadline, latencies, statuses, errors)
+        for i in range(clients)
+    ))
+    elapsed = time.perf_counter() - started
+    if len(latencies) > 1:
+        quantiles = statistics.quantiles(latencies, n=100)
+    else:
+        quantiles = [latencies[0] if latencies else 0.0] * 99
+    return {
+        'clients': clients,
+        'duration': elapsed,
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': quantiles[49] * 1000,
+        'p95_ms': quantiles[94] * 1000,
+        'p99_ms': quantiles[98] * 1000,
+        'max_ms': max(latencies, default=0.0) * 1000,
+        'status_codes': statuses,
+        'errors': errors[0],
+    }
+
+
+async def client(host, port, requests, token, deadline, latencies, statuses, errors):
+    reader = writer = None
+    index = 0
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            request = requests[index % len(requests)].encode(host, port, token)
+            index += 1
+            sent = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+            latencies.append(time.perf_counter() - sent)
+            statuses[status] = statuses.get(status, 0) + 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            errors[0] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def fetch(host, port, request, token=None):
+    """Send one request on a new connection; returns ``(status, body)``."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(request.encode(host, port, token))
+        await writer.drain()
+        status, _, body = await read_response(reader, keep_body=True)
+        return status, body
+    finally:
+        writer.close()
+
+
+async def read_response(reader, keep_body=False):
+    """
+    Read one HTTP/1.1 response; returns ``(status, keep_alive)``, or
+    ``(status, keep_alive, body)`` with ``keep_body``.
+    """
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    chunks = []
+    if 'content-length' in headers:
+        chunks.append(await reader.readexactly(int(headers['content-length'])))
+    elif headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            chunks.append((await reader.readexactly(size + 2))[:-2])
+            if size == 0:
+                break
+    keep_alive = headers.get('connection', '').lower() != 'close'
+    if keep_body:
+        return status, keep_alive, b''.join(chunks)
+    return status, keep_alive
@@ -0,0 +1,281 @@
+"""
+Per-endpoint request metrics in the Prometheus text format.
+
+``MetricsMiddleware`` labels each request with its resolved URL name (the
+DRF router's ``patient-list``, ``mapping-bulk-assign``, ...) and records
+its latency, SQL query count, SQL time and response size into histograms.
+SQL is timed by an execute wrapper that every database connection gets when
+it opens; it only counts while a request is being measured.
+
+Each worker process aggregates in memory. With ``METRICS_DIR`` set, every
+process also writes its totals to ``metrics-<pid>.json`` there at most once
+per ``METRICS_FLUSH_INTERVAL`` seconds (write to a temp file, then rename),
+and ``/metrics`` sums the files of all processes, so any worker can answer a
+scrape. Files of exited workers are kept so counters don't go backwards;
+empty the directory when the service is restarted.
+"""
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Request latency in seconds.', LATENCY_BUCKETS),
+    'http_request_db_queries': ('SQL queries per request.', QUERY_BUCKETS),
+    'http_request_db_seconds': ('Time spent in SQL per request, in seconds.', LATENCY_BUCKETS),
+    'http_response_size_bytes': ('Response body size in bytes (streamed bodies are not counted).', SIZE_BUCKETS),
+}
+COUNTERS = {
+    'http_requests_total': 'Requests by endpoint, method and status code.',
+}
+
+_current = ContextVar('metrics_current_request', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'sql_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.queries += 1
+        current.sql_time += time.perf_counter() - started
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsRegistry:
+    """Counters and histograms of one process, keyed by ``(name, labels)``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._check_pid()
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, labels)
+        with self._lock:
+            self._check_pid()
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # Per-bucket (not cumulative) counts, +Inf last, then the sum
+                histogram = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            histogram[bisect_left(buckets, value)] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            self._check_pid()
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, list(values)] for (name, labels), values in self.histograms.items()],
+            }
+
+    def _check_pid(self):
+        # A forked worker starts from zero; the parent's totals are its own.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self.counters.clear()
+            self.histograms.clear()
+
+
+registry = MetricsRegistry()
+
+
+class MetricsStore:
+    """Writes this process' snapshot to ``directory`` and merges all of them."""
+
+    def __init__(self, directory, flush_interval):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._flush_lock = threading.Lock()
+
+    def maybe_flush(self):
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self.directory or not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = time.monotonic()
+            os.makedirs(self.directory, exist_ok=True)
+            fd, path = tempfile.mkstemp(dir=self.directory, prefix='.metrics-', suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(registry.snapshot(), f)
+            os.replace(path, os.path.join(self.directory, f'metrics-{os.getpid()}.json'))
+        finally:
+            self._flush_lock.release()
+
+    def collect(self):
+        """Totals across every process (or just this one without a directory)."""
+        if not self.directory:
+            return [registry.snapshot()]
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = MetricsStore(
+            getattr(settings, 'METRICS_DIR', ''),
+            getattr(settings, 'METRICS_FLUSH_INTERVAL', 5.0)
+        )
+        atexit.register(_store.flush)
+    return _store
+
+
+def merge(snapshots):
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snapshot['histograms']:
+            if name not in HISTOGRAMS or len(values) != len(HISTOGRAMS[name][1]) + 2:
+                continue  # written with other buckets
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.get(key)
+            histograms[key] = values if total is None else [a + b for a, b in zip(total, values)]
+    return counters, histograms
+
+
+def render(snapshots):
+    """Prometheus text exposition format (version 0.0.4)."""
+    counters, histograms = merge(snapshots)
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{format_labels(labels)} {value}')
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), values):
+                cumulative += count
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", format_value(bound)),))} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {format_value(values[-1])}')
+            lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels) + '}'
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    if isinstance(value, str):
+        return value
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.store = get_store()
+        connection_created.connect(install_query_recorder, dispatch_uid='healthcare_backend.metrics')
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # Connections opened in this thread before the signal was connected
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        current = RequestMetrics()
+        token = _current.set(current)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, time.perf_counter() - started, current)
+        return response
+
+    async def __acall__(self, request):
+        current = RequestMetrics()
+        token = _current.set(current)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, time.perf_counter() - started, current)
+        return response
+
+    def record(self, request, response, duration, current):
+        match = getattr(request, 'resolver_match', None)
+        endpoint = (match.url_name or match.route) if match is not None else 'unmatched'
+        labels = (('endpoint', endpoint), ('method', request.method))
+        registry.inc('http_requests_total', labels + (('status', str(response.status_code)),))
+        registry.observe('http_request_duration_seconds', labels, duration)
+        registry.observe('http_request_db_queries', labels, current.queries)
+        registry.observe('http_request_db_seconds', labels, current.sql_time)
+        if not response.streaming:
+            registry.observe('http_response_size_bytes', labels, len(response.content))
+        self.store.maybe_flush()
@@ -0,0 +1,227 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import NotFound
+
+from .serializers import FieldSelection, query_plan
+
+
+class EagerLoadingMixin:
+    """
+    Load the relations a viewset's serializers walk in the same query as the
+    rows themselves.
+
+    Viewsets declare ``select_related_fields`` / ``prefetch_related_fields``
+    and the mixin applies them in ``filter_queryset``, which DRF runs for
+    ``get_object`` and which our ``list`` actions call explicitly.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return self.eager_load(queryset)
+
+    def eager_load(self, queryset):
+        if self.select_related_fields:
+            queryset = queryset.select_related(*self.select_related_fields)
+        if self.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*self.prefetch_related_fields)
+        return queryset
+
+
+class SparseFieldsetMixin(EagerLoadingMixin):
+    """
+    ``?fields=`` / ``?expand=`` support (see ``healthcare_backend.serializers``)
+    for the actions in ``sparse_actions``.
+
+    The parsed selection goes to the serializer context, where
+    ``SparseFieldsetSerializerMixin`` trims the fields. The queryset then
+    selects only the columns and joins the remaining fields read, instead of
+    the viewset's default eager loading.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def get_field_selection(self):
+        if self.request is None or self.action not in self.sparse_actions:
+            return None
+        return FieldSelection.from_query_params(self.request.query_params)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['field_selection'] = self.get_field_selection()
+        return context
+
+    def eager_load(self, queryset):
+        sparse = self.get_sparse_queryset(queryset, self.get_serializer())
+        if sparse is not None:
+            return sparse
+        return super().eager_load(queryset)
+
+    def get_sparse_queryset(self, queryset, serializer):
+        """
+        ``queryset`` restricted to what ``serializer`` reads, or None when no
+        selection applies or the serializer's sources can't be mapped.
+        """
+        if serializer.context.get('field_selection') is None:
+            return None
+        plan = query_plan(serializer)
+        if plan is None:
+            return None
+        only, related = plan
+        # Keyset pagination reads the ordering columns to build cursors.
+        only |= {field.lstrip('-') for field in getattr(self, 'keyset_ordering', ())}
+        if related:
+            queryset = queryset.select_related(*sorted(related))
+        return queryset.only(*sorted(only))
+
+
+class NotModified(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Strong ``ETag`` and ``Last-Modified`` validators for ``list`` and
+    ``retrieve``, computed from ``updated_at`` without serializing the body.
+
+    Lists use one aggregate query (row count, sum of ids and max
+    ``updated_at``, plus the max ``updated_at`` of every relation in
+    ``validator_related_fields``). Page-number lists aggregate the whole
+    collection and hand the count to the paginator, which then skips its own
+    COUNT; keyset pages aggregate only the rows of the requested page.
+    Details read only the timestamps of the requested row. When
+    ``If-None-Match`` / ``If-Modified-Since`` match, the view answers 304
+    before running the handler.
+
+    A list's newest ``updated_at`` doesn't move when a row is deleted, so
+    list 304s are only answered from ``If-None-Match``; ``If-Modified-Since``
+    alone gets the full list.
+    """
+    conditional_actions = ('list', 'retrieve')
+    validator_related_fields = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validators = None
+        self.list_count = None
+        if self.is_conditional(request):
+            if self.action == 'list':
+                self.validators = self.get_list_validators()
+            else:
+                self.validators = self.get_detail_validators()
+        self.check_not_modified(request)
+
+    async def ainitial(self, request, *args, **kwargs):
+        await super().ainitial(request, *args, **kwargs)
+        self.validators = None
+        self.list_count = None
+        if self.is_conditional(request):
+            if self.action == 'list':
+                self.validators = await self.aget_list_validators()
+            else:
+                self.validators = await self.aget_detail_validators()
+        self.check_not_modified(request)
+
+    def is_conditional(self, request):
+        return request.method in ('GET', 'HEAD') and self.action in self.conditional_actions
+
+    def check_not_modified(self, request):
+        if self.validators is None:
+            return
+        etag, last_modified = self.validators
+        if self.action == 'list':
+            last_modified = None
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified and int(last_modified.timestamp())
+        )
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, 'validators', None)
+        if validators is not None and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+    def get_list_validators(self):
+        query = self.get_list_validator_query()
+        return self.list_validators(*query, query[0].aggregate(**query[1])) if query is not None else None
+
+    async def aget_list_validators(self):
+        query = self.get_list_validator_query()
+        return self.list_validators(*query, await query[0].aaggregate(**query[1])) if query is not None else None
+
+    def get_list_validator_query(self):
+        """``(queryset, aggregates, whole)``, or None if the page can't be read (the list reports why)."""
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = self.paginator
+        whole = not (hasattr(paginator, 'wants_keyset') and paginator.wants_keyset(self.request, self))
+        if whole:
+            queryset = queryset.order_by()
+        else:
+            try:
+                queryset = paginator.keyset_class().get_page_queryset(queryset, self.request, self)
+            except NotFound:
+                return None
+        # The ids catch a row swapped for another, which count and max(updated_at) can miss
+        aggregates = {'count': Count('pk'), 'ids': Sum('pk'), 'updated_at': Max('updated_at')}
+        for field in self.validator_related_fields:
+            aggregates[field] = Max(f'{field}__updated_at')
+        return queryset, aggregates, whole
+
+    def list_validators(self, queryset, aggregates, whole, result):
+        if whole:
+            # Page-number pagination uses it instead of running its own COUNT
+            self.list_count = result['count']
+        timestamps = [result.pop('updated_at')] + [result.pop(field) for field in self.validator_related_fields]
+        return self.make_validators(result['count'], result['ids'], *timestamps)
+
+    def get_detail_validators(self):
+        queryset = self.get_detail_validator_query()
+        timestamps = queryset.first() if queryset is not None else None
+        return self.make_validators(*timestamps) if timestamps is not None else None
+
+    async def aget_detail_validators(self):
+        queryset = self.get_detail_validator_query()
+        timestamps = await queryset.afirst() if queryset is not None else None
+        return self.make_validators(*timestamps) if timestamps is not None else None
+
+    def get_detail_validator_query(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg not in self.kwargs:
+            return None
+        fields = ['updated_at'] + [f'{field}__updated_at' for field in self.validator_related_fields]
+        try:
+            return self.filter_queryset(self.get_queryset()).order_by().filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).values_list(*fields)
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+    def make_validators(self, *parts):
+        """Build ``(etag, last_modified)`` from the row-set state in ``parts``."""
+        user = getattr(self.request, 'user', None)
+        key = '|'.join([
+            self.__class__.__name__,
+            str(getattr(user, 'pk', '')),
+            self.request.get_full_path(),
+        ] + [part.isoformat() if hasattr(part, 'isoformat') else str(part) for part in parts])
+        etag = quote_etag(hashlib.sha1(key.encode('utf-8')).hexdigest())
+        timestamps = [part for part in parts if hasattr(part, 'timestamp')]
+        return etag, max(timestamps) if timestamps else None
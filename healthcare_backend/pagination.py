@@ -0,0 +1,238 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the ordering declared on the view as
+    ``keyset_ordering``, e.g. ``('-created_at', '-id')``.
+
+    The last ordering field must be unique so that rows sharing the same
+    leading value are still visited exactly once. Every page is fetched with
+    a range condition on the ordering columns instead of an OFFSET, and no
+    COUNT(*) is issued, so page N costs the same as page 1.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        return self.finalize_page(list(queryset))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Return the (unevaluated) queryset for the requested page. Split out
+        from ``paginate_queryset`` so async views can evaluate it themselves
+        and then hand the rows to ``finalize_page``.
+        """
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor['r'])
+
+        if self.cursor is not None:
+            queryset = queryset.filter(self.get_seek_condition(queryset.model))
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self._invert(field) for field in ordering]
+        return queryset.order_by(*ordering)[:self.page_size + 1]
+
+    def finalize_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_ordering(self, view):
+        ordering = getattr(view, 'keyset_ordering', None)
+        assert ordering, (
+            f'{view.__class__.__name__} must define `keyset_ordering` to use '
+            f'{self.__class__.__name__}.'
+        )
+        return list(ordering)
+
+    def get_seek_condition(self, model):
+        """
+        Build ``(a < x) OR (a = x AND b < y) ...`` for the cursor position,
+        AND-ed with ``a <= x`` so the database can start the index range scan
+        at the cursor instead of filtering from the top of the index.
+        """
+        values = self.cursor['v']
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            value = model._meta.get_field(name).to_python(value)
+            lookup = 'lt' if field.startswith('-') != self.reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+
+        first = self.ordering[0]
+        name = first.lstrip('-')
+        bound = 'lte' if first.startswith('-') != self.reverse else 'gte'
+        first_value = model._meta.get_field(name).to_python(values[0])
+        return Q(**{f'{name}__{bound}': first_value}) & condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            values, reverse = cursor['v'], cursor['r']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return {'v': values, 'r': bool(reverse)}
+
+    def encode_cursor(self, obj, reverse):
+        values = [
+            self._encode_value(getattr(obj, field.lstrip('-')))
+            for field in self.ordering
+        ]
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def _encode_value(value):
+        # Full precision matters here: DjangoJSONEncoder truncates datetimes
+        # to milliseconds, which would make the seek condition skip rows.
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        if isinstance(value, (int, float, str, bool)) or value is None:
+            return value
+        return str(value)
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+
+class HybridPagination(PageNumberPagination):
+    """
+    Default page-number pagination with an opt-in keyset mode.
+
+    Clients keep today's ``count``/``next``/``previous``/``results`` envelope
+    unless they ask for ``?pagination=cursor`` (or follow a ``cursor`` link),
+    in which case the view's ``keyset_ordering`` is used and ``count`` is
+    dropped from the envelope.
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        self.known_count = getattr(view, 'list_count', None)
+        if self.wants_keyset(request, view):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        ``paginate_queryset`` for async views: the same page, with the page
+        (and COUNT) queries run through the async ORM.
+        """
+        if not isinstance(queryset, QuerySet):
+            return self.paginate_queryset(queryset, request, view)
+
+        self.keyset = None
+        self.known_count = getattr(view, 'list_count', None)
+        if self.wants_keyset(request, view):
+            self.keyset = self.keyset_class()
+            queryset = self.keyset.get_page_queryset(queryset, request, view)
+            return self.keyset.finalize_page([row async for row in queryset])
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        if self.known_count is None:
+            paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.request = request
+        self.page.object_list = [row async for row in self.page.object_list]
+        return list(self.page)
+
+    def get_page_number(self, request, paginator):
+        if self.known_count is not None:
+            # Counted by the list's validator query (ConditionalGetMixin)
+            paginator.count = self.known_count
+        return super().get_page_number(request, paginator)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def wants_keyset(self, request, view):
+        if not getattr(view, 'keyset_ordering', None):
+            return False
+        # Relevance-ranked search results can only be paged by number.
+        get_search_query = getattr(view, 'get_search_query', None)
+        if get_search_query is not None and get_search_query():
+            return False
+        params = request.query_params
+        return (
+            params.get(self.mode_query_param) == 'cursor'
+            or self.keyset_class.cursor_query_param in params
+        )
@@ -0,0 +1,75 @@
+import codecs
+import csv
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+try:
+    import orjson
+except ImportError:  # optional, see FastJSONParser
+    orjson = None
+
+
+class FastJSONParser(JSONParser):
+    """``JSONParser`` backed by ``orjson`` for UTF-8 bodies when it is installed."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class NDJSONParser(BaseParser):
+    """Parse newline-delimited JSON into a list of row dicts."""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        return parse_ndjson(codecs.getreader(encoding)(stream))
+
+
+class CSVParser(BaseParser):
+    """Parse CSV with a header row into a list of row dicts."""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        return parse_csv(codecs.getreader(encoding)(stream))
+
+
+def parse_ndjson(lines):
+    rows = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise ParseError(f'NDJSON parse error on line {number}: {exc}')
+        if not isinstance(row, dict):
+            raise ParseError(f'NDJSON line {number} is not an object.')
+        rows.append(row)
+    return rows
+
+
+def parse_csv(lines):
+    try:
+        return list(csv.DictReader(lines))
+    except csv.Error as exc:
+        raise ParseError(f'CSV parse error: {exc}')
+
+
+def parse_upload(upload):
+    """Parse an uploaded NDJSON or CSV file, picking the format from its name."""
+    lines = codecs.iterdecode(upload, settings.DEFAULT_CHARSET)
+    name = (upload.name or '').lower()
+    if name.endswith('.csv') or upload.content_type == CSVParser.media_type:
+        return parse_csv(lines)
+    return parse_ndjson(lines)
@@ -0,0 +1,72 @@
+"""
+Test-mode guard against N+1 queries.
+
+An endpoint whose query count grows with page size almost always does so by
+running the same SELECT once per row. ``QueryGuard`` counts SELECT statements
+by their SQL template (parameters are not part of the template) and raises
+``RepeatedQueryError`` when any template runs more than ``max_repeats`` times.
+"""
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+class RepeatedQueryError(AssertionError):
+    pass
+
+
+class QueryGuard:
+    def __init__(self, max_repeats=None, label=''):
+        if max_repeats is None:
+            max_repeats = getattr(settings, 'QUERY_GUARD_MAX_REPEATS', 3)
+        self.max_repeats = max_repeats
+        self.label = label
+        self.counts = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip()[:6].upper() == 'SELECT':
+            self.counts[sql] += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stack.close()
+        if exc_type is None:
+            self.check()
+
+    def check(self):
+        repeated = [
+            (count, sql) for sql, count in self.counts.items()
+            if count > self.max_repeats
+        ]
+        if repeated:
+            count, sql = max(repeated)
+            where = f' in {self.label}' if self.label else ''
+            raise RepeatedQueryError(
+                f'Query ran {count} times{where} (limit {self.max_repeats}); '
+                f'the query count grows with the number of rows: {sql}'
+            )
+
+
+class QueryGuardMiddleware:
+    """
+    Wrap every request in a ``QueryGuard``. Only active when
+    ``QUERY_GUARD_ENABLED`` is set, which test settings should do.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_GUARD_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryGuard(label=f'{request.method} {request.path}'):
+            return self.get_response(request)
@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional, see FastJSONRenderer
+    orjson = None
+
+if orjson is not None:
+    # Datetimes go through DRF's encoder (``default``) so their format, e.g.
+    # millisecond precision and a ``Z`` suffix, stays exactly as before.
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` backed by ``orjson`` when it is installed. Output matches
+    ``JSONRenderer`` byte for byte; types orjson doesn't handle natively
+    (``Decimal``, ``datetime``, lazy strings) go through DRF's encoder.
+    Indented (browsable) output and installs without orjson use the stdlib
+    path.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        # Same as JSONRenderer: keep the output a strict JavaScript subset.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+def _column_names(row, prefix=''):
+    for key, value in row.items():
+        if isinstance(value, dict):
+            yield from _column_names(value, f'{prefix}{key}.')
+        else:
+            yield f'{prefix}{key}'
+
+
+class StreamingRenderer(BaseRenderer):
+    """
+    Renderer for export actions. ``render`` handles ordinary (error)
+    responses, ``stream`` turns an iterator of row dicts into byte chunks for
+    a ``StreamingHttpResponse``.
+    """
+    charset = 'utf-8'
+    rows_per_chunk = 500
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        columns = list(_column_names(rows[0])) if rows and isinstance(rows[0], dict) else []
+        return b''.join(self.stream(columns, iter(rows)))
+
+    def stream(self, columns, rows):
+        raise NotImplementedError('.stream() must be implemented.')
+
+
+class NDJSONRenderer(StreamingRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def stream(self, columns, rows):
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        lines = []
+        for row in rows:
+            lines.append(dumps(row))
+            if len(lines) >= self.rows_per_chunk:
+                yield ('\n'.join(lines) + '\n').encode(self.charset)
+                lines = []
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode(self.charset)
+
+
+class CSVRenderer(StreamingRenderer):
+    """
+    CSV with one column per exported field. Nested objects are flattened to
+    ``parent.child`` columns, ``None`` becomes an empty cell.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, columns, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        count = 0
+        for row in rows:
+            writer.writerow(['' if value is None else value for value in self.flatten(row)])
+            count += 1
+            if count % self.rows_per_chunk == 0:
+                yield buffer.getvalue().encode(self.charset)
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode(self.charset)
+
+    def flatten(self, row):
+        for value in row.values():
+            if isinstance(value, dict):
+                yield from self.flatten(value)
+            else:
+                yield value
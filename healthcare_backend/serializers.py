@@ -0,0 +1,129 @@
+"""
+Sparse fieldsets: ``?fields=`` and ``?expand=``.
+
+``fields`` is a comma-separated list of the fields to return, with dots
+reaching into nested objects (``fields=id,patient_details.name``).
+``expand`` lists the nested objects to embed. With neither parameter the
+full legacy payload is returned. With either one, a nested object is only
+embedded when it is named in ``expand`` or ``fields``.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+
+
+def parse_field_list(value):
+    """Turn ``'a,b.c,b.d'`` into ``{'a': {}, 'b': {'c': {}, 'd': {}}}``."""
+    tree = {}
+    for item in value.split(','):
+        node = tree
+        for part in item.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+class FieldSelection:
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_query_params(cls, query_params):
+        fields = query_params.get('fields', None)
+        expand = query_params.get('expand', None)
+        if fields is None and expand is None:
+            return None
+        return cls(
+            parse_field_list(fields) if fields is not None else None,
+            parse_field_list(expand) if expand is not None else None
+        )
+
+    def at(self, path):
+        """
+        Return ``(only, expand)`` for the serializer at ``path``: the field
+        names to keep (None for all of them) and the nested fields to embed.
+        """
+        fields, expand = self.fields, self.expand
+        for name in path:
+            fields = fields.get(name) if fields else None
+            expand = expand.get(name, {}) if expand is not None else None
+        return fields or None, expand
+
+
+class SparseFieldsetSerializerMixin:
+    """Drop the fields not selected by the ``field_selection`` in the context."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.context.get('field_selection')
+        if selection is None:
+            return fields
+        only, expand = selection.at(self._selection_path())
+        for name in list(fields):
+            if isinstance(fields[name], serializers.BaseSerializer):
+                keep = (only is not None and name in only) or (expand is not None and name in expand)
+            else:
+                keep = only is None or name in only
+            if not keep:
+                del fields[name]
+        return fields
+
+    def _selection_path(self):
+        path = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return path[::-1]
+
+
+def query_plan(serializer, prefix=''):
+    """
+    Work out the columns and joins ``serializer`` reads, as
+    ``(only_paths, select_related_paths)`` for ``QuerySet.only()`` and
+    ``select_related()``. Returns None when a field's source can't be mapped
+    to model fields (``source='*'``, properties, to-many relations).
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    model = serializer.Meta.model
+    only, related = set(), set()
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*' or isinstance(field, ManyRelatedField):
+            return None
+
+        current, parts = model, []
+        for index, attr in enumerate(field.source_attrs):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete or model_field.many_to_many:
+                return None
+            parts.append(attr)
+            if index < len(field.source_attrs) - 1:
+                if not model_field.is_relation:
+                    return None
+                related.add(prefix + '__'.join(parts))
+                current = model_field.related_model
+        path = prefix + '__'.join(parts)
+        only.add(path)
+
+        if getattr(field, 'loads_by_id', False):
+            # Looks the object up by its key itself (e.g. in a cache): no join
+            continue
+        if isinstance(field, serializers.BaseSerializer):
+            related.add(path)
+            nested = query_plan(field, prefix=path + '__')
+            if nested is not None:
+                only |= nested[0]
+                related |= nested[1]
+        elif isinstance(field, RelatedField) and not (
+            isinstance(field, PrimaryKeyRelatedField) and field.use_pk_only_optimization()
+        ):
+            related.add(path)
+    return only, related
@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
+from healthcare_backend.db import replica_databases
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -31,10 +32,16 @@ INSTALLED_APPS = [
     'patients',
     'doctors',
     'mappings',
+    'analytics',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'healthcare_backend.metrics.MetricsMiddleware',
+    'healthcare_backend.capture.RequestCaptureMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'healthcare_backend.compression.CompressionMiddleware',
+    'healthcare_backend.db.replicas.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -42,6 +49,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'healthcare_backend.query_guard.QueryGuardMiddleware',
 ]
 
 ROOT_URLCONF = 'healthcare_backend.urls'
@@ -64,15 +72,49 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'healthcare_backend.wsgi.application'
 
-# Database
+# Database. Connections come from a per-process pool instead of being
+# opened for every request (see healthcare_backend/db/backends/pooled_postgresql);
+# DB_POOL_ENABLED=False switches back to Django's plain backend. CONN_MAX_AGE
+# stays 0 so each request returns its connection to the pool.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'healthcare_backend.db.backends.pooled_postgresql'
+            if config('DB_POOL_ENABLED', default=True, cast=bool)
+            else 'django.db.backends.postgresql'
+        ),
         'NAME': config('DB_NAME', default='healthcare_db'),
         'USER': config('DB_USER', default='postgres'),
         'PASSWORD': config('DB_PASSWORD', default='password'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        'POOL': {
+            'MIN_SIZE': config('DB_POOL_MIN_SIZE', default=0, cast=int),
+            'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=10.0, cast=float),
+            'IDLE_TIMEOUT': config('DB_POOL_IDLE_TIMEOUT', default=300.0, cast=float),
+            'MAX_LIFETIME': config('DB_POOL_MAX_LIFETIME', default=3600.0, cast=float),
+            'HEALTH_CHECK_INTERVAL': config('DB_POOL_HEALTH_CHECK_INTERVAL', default=30.0, cast=float),
+        },
+    }
+}
+
+# Read replicas: DB_REPLICAS is a comma-separated list of host[:port][/name]
+# entries sharing the primary's credentials. Reads in GET requests go to a
+# replica, except for REPLICA_STICKY_SECONDS after the user's last write
+# (tracked in the cache, so use a shared backend with several workers).
+DATABASES.update(replica_databases(DATABASES['default'], config('DB_REPLICAS', default='')))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['healthcare_backend.db.replicas.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10.0, cast=float)
+
+# Cache. The default is per-process local memory; point CACHE_BACKEND /
+# CACHE_LOCATION at a shared backend (e.g. Redis or Memcached) in production
+# so per-worker caches are invalidated across processes.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
     }
 }
 
@@ -107,18 +149,103 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.backends.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'healthcare_backend.renderers.FastJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'healthcare_backend.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'healthcare_backend.pagination.HybridPagination',
     'PAGE_SIZE': 20
 }
 
+# N+1 guard: fail any request that repeats the same SELECT more than
+# QUERY_GUARD_MAX_REPEATS times. Meant for test and development settings.
+QUERY_GUARD_ENABLED = config('QUERY_GUARD_ENABLED', default=False, cast=bool)
+QUERY_GUARD_MAX_REPEATS = config('QUERY_GUARD_MAX_REPEATS', default=3, cast=int)
+
+# Response compression (healthcare_backend.compression): gzip, or Brotli when
+# the brotli package is installed, for bodies of at least MIN_SIZE bytes.
+RESPONSE_COMPRESSION_ENABLED = config('RESPONSE_COMPRESSION_ENABLED', default=False, cast=bool)
+RESPONSE_COMPRESSION_MIN_SIZE = config('RESPONSE_COMPRESSION_MIN_SIZE', default=1024, cast=int)
+RESPONSE_COMPRESSION_GZIP_LEVEL = config('RESPONSE_COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+RESPONSE_COMPRESSION_BROTLI_QUALITY = config('RESPONSE_COMPRESSION_BROTLI_QUALITY', default=4, cast=int)
+
+# Per-endpoint request metrics (healthcare_backend.metrics), served at
+# /metrics. With several worker processes, point METRICS_DIR at a directory
+# local to the host (emptied on restart) so every worker reports the totals
+# of all of them. Scrapes must send METRICS_TOKEN as a bearer token; without
+# one set, /metrics answers 404 even when enabled.
+METRICS_ENABLED = config('METRICS_ENABLED', default=False, cast=bool)
+METRICS_DIR = config('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5.0, cast=float)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Sampled request capture (healthcare_backend.capture) for replay_requests.
+# Each worker appends to REQUEST_CAPTURE_DIR/requests-<pid>.jsonl; values of
+# the masked fields, in bodies and query strings, never reach the files.
+REQUEST_CAPTURE_ENABLED = config('REQUEST_CAPTURE_ENABLED', default=False, cast=bool)
+REQUEST_CAPTURE_SAMPLE_RATE = config('REQUEST_CAPTURE_SAMPLE_RATE', default=0.01, cast=float)
+REQUEST_CAPTURE_DIR = config('REQUEST_CAPTURE_DIR', default=str(BASE_DIR / 'captures'))
+REQUEST_CAPTURE_MAX_BODY = config('REQUEST_CAPTURE_MAX_BODY', default=65536, cast=int)
+REQUEST_CAPTURE_QUEUE_SIZE = config('REQUEST_CAPTURE_QUEUE_SIZE', default=10000, cast=int)
+REQUEST_CAPTURE_MASKED_FIELDS = (
+    'name', 'email', 'phone', 'date_of_birth', 'address', 'medical_history',
+    'emergency_contact', 'emergency_phone', 'bio', 'license_number', 'notes',
+    'password', 'password_confirm', 'refresh', 'access', 'q',
+)
+
+# Serve the hot read endpoints with native async views
+# (healthcare_backend.async_views). Only worthwhile under an ASGI server.
+ASYNC_VIEWS_ENABLED = config('ASYNC_VIEWS_ENABLED', default=False, cast=bool)
+
+# Per-worker snapshot of active doctors (doctors.catalog)
+DOCTOR_CATALOG_MAX_ENTRIES = config('DOCTOR_CATALOG_MAX_ENTRIES', default=10000, cast=int)
+DOCTOR_CATALOG_CHECK_INTERVAL = config('DOCTOR_CATALOG_CHECK_INTERVAL', default=1.0, cast=float)
+DOCTOR_CATALOG_MAX_AGE = config('DOCTOR_CATALOG_MAX_AGE', default=60.0, cast=float)
+
+# Per-worker cache of authenticated users (authentication.backends). The TTL
+# bounds how long another worker may keep serving a changed or deactivated
+# user; the worker that saves the user drops it immediately.
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=30.0, cast=float)
+AUTH_USER_CACHE_MAX_SIZE = config('AUTH_USER_CACHE_MAX_SIZE', default=1024, cast=int)
+
+# Revoked tokens (authentication.revocation): how often each worker pulls
+# new revocations into its in-memory filter, how often expired ones are
+# deleted, and the filter's sizing.
+REVOCATION_SYNC_INTERVAL = config('REVOCATION_SYNC_INTERVAL', default=5.0, cast=float)
+REVOCATION_PRUNE_INTERVAL = config('REVOCATION_PRUNE_INTERVAL', default=3600.0, cast=float)
+REVOCATION_FILTER_CAPACITY = config('REVOCATION_FILTER_CAPACITY', default=100000, cast=int)
+REVOCATION_FILTER_ERROR_RATE = config('REVOCATION_FILTER_ERROR_RATE', default=0.001, cast=float)
+
+# Analytics rollups (analytics.rollups): rows per specialization and for
+# the totals that writes spread over, so they rarely wait on each other.
+ANALYTICS_ROLLUP_SHARDS = config('ANALYTICS_ROLLUP_SHARDS', default=16, cast=int)
+
+# Chunked deletes of users, patients and doctors (healthcare_backend.deletion).
+# Deletes removing more than DELETE_ASYNC_THRESHOLD rows (0 = never) are
+# queued as jobs.
+DELETE_BATCH_SIZE = config('DELETE_BATCH_SIZE', default=1000, cast=int)
+DELETE_ASYNC_THRESHOLD = config('DELETE_ASYNC_THRESHOLD', default=10000, cast=int)
+
+# Job queue (jobs.queue), run by `manage.py run_jobs`. A worker extends the
+# lease on its running jobs every third of JOBS_LEASE_SECONDS; jobs of a
+# worker that stopped doing so are run again. Failed attempts are retried
+# after JOBS_RETRY_DELAY seconds, doubling each time.
+JOBS_CONCURRENCY = config('JOBS_CONCURRENCY', default=4, cast=int)
+JOBS_POLL_INTERVAL = config('JOBS_POLL_INTERVAL', default=1.0, cast=float)
+JOBS_LEASE_SECONDS = config('JOBS_LEASE_SECONDS', default=60.0, cast=float)
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', default=3, cast=int)
+JOBS_RETRY_DELAY = config('JOBS_RETRY_DELAY', default=10.0, cast=float)
+JOBS_RETENTION_DAYS = config('JOBS_RETENTION_DAYS', default=7, cast=int)
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
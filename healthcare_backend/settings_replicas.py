@@ -0,0 +1,24 @@
+"""
+Two local SQLite databases, the second one a read replica of the first, to
+try the replica routing without PostgreSQL:
+
+    python manage.py migrate --settings=healthcare_backend.settings_replicas
+    python manage.py check_replica_routing --settings=healthcare_backend.settings_replicas
+
+Nothing replicates between the two files: ``check_replica_routing`` copies
+the primary into the replica, so the replica then lags behind every write.
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'replica_1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica_1.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+DATABASE_REPLICAS = ['replica_1']
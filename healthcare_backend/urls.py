@@ -1,15 +1,20 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.http import HttpResponse
+from .views import db_pool_stats, metrics
 
 def home(request):
     return HttpResponse("Welcome to the Healthcare API")
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', home),  # Handles root URL "/"
+    path('', home, name='home'),  # Handles root URL "/"
     path('api/auth/', include('authentication.urls')),
     path('api/patients/', include('patients.urls')),
     path('api/doctors/', include('doctors.urls')),
     path('api/mappings/', include('mappings.urls')),
+    path('api/analytics/', include('analytics.urls')),
+    path('api/jobs/', include('jobs.urls')),
+    path('api/health/db-pool/', db_pool_stats, name='db-pool-stats'),
+    path('metrics', metrics, name='metrics'),
 ]
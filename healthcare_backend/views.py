@@ -0,0 +1,47 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from healthcare_backend.db.backends.pooled_postgresql.pool import pool_stats
+from healthcare_backend.metrics import get_store, render
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def db_pool_stats(request):
+    """
+    Connection pool counters of the worker process serving the request
+    """
+    try:
+        return Response({
+            'message': 'Connection pool stats retrieved successfully',
+            'pools': pool_stats()
+        }, status=status.HTTP_200_OK)
+    
+    except Exception as e:
+        return Response({
+            'error': 'Internal server error',
+            'details': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def metrics(request):
+    """
+    Request metrics of every worker on this host in the Prometheus text
+    format. Plain Django view: scrapers send a static METRICS_TOKEN, not a JWT.
+    Not served at all until a token is configured.
+    """
+    token = settings.METRICS_TOKEN
+    if not settings.METRICS_ENABLED or not token:
+        return HttpResponse('Metrics are disabled\n', status=404, content_type='text/plain')
+    if not hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', '').encode(), f'Bearer {token}'.encode()
+    ):
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    return HttpResponse(
+        render(get_store().collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Job
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'progress', 'total', 'created_by', 'created_at', 'finished_at')
+    list_select_related = ('created_by',)
+    list_filter = ('status', 'name', 'created_at')
+    search_fields = ('name', 'key', 'created_by__email')
+    raw_id_fields = ('created_by',)
+    readonly_fields = ('locked_by', 'locked_until', 'created_at', 'started_at', 'finished_at', 'updated_at')
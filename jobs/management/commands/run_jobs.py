@@ -0,0 +1,39 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued jobs (bulk assignments, large deletes) in a pool of threads. '
+        'Start as many workers as needed, on any host; they share the queue '
+        'table. SIGTERM and SIGINT stop claiming and let the running jobs finish.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help='Jobs run at once (default: JOBS_CONCURRENCY).')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Seconds between polls while the queue is empty (default: JOBS_POLL_INTERVAL).')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is due, e.g. from cron or in tests.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] is not None and options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+        if options['poll_interval'] is not None and options['poll_interval'] <= 0:
+            raise CommandError('--poll-interval must be positive')
+        log = self.stdout.write if options['verbosity'] >= 1 else None
+        worker = Worker(options['concurrency'], options['poll_interval'], log=log)
+
+        def stop(signum, frame):
+            self.stdout.write('Stopping after the running jobs')
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        self.stdout.write(f'Worker {worker.id} running up to {worker.concurrency} jobs at once')
+        worker.run(burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS('Worker stopped'))
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A call of a ``jobs.queue.task`` function, run by ``run_jobs`` workers.
+    The row is the queue entry, the worker's lease and the status report.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    ACTIVE = (QUEUED, RUNNING)
+
+    name = models.CharField(max_length=200, help_text="Import path of the task function")
+    payload = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    key = models.CharField(max_length=200, blank=True, null=True,
+                           help_text="At most one queued or running job per key")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=1)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=200, blank=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    progress = models.PositiveBigIntegerField(default=0)
+    total = models.PositiveBigIntegerField(blank=True, null=True)
+    result = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True, related_name='jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Claiming: status = 'queued' AND run_after <= now ORDER BY run_after, id
+            models.Index(fields=['run_after', 'id'], name='job_queued_idx', condition=models.Q(status='queued')),
+            # Expired leases: status = 'running' AND locked_until < now
+            models.Index(fields=['locked_until'], name='job_running_idx', condition=models.Q(status='running')),
+            # Pruning finished jobs
+            models.Index(fields=['finished_at'], name='job_finished_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'], condition=models.Q(status__in=['queued', 'running']),
+                name='job_one_active_per_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Job {self.pk} {self.name} ({self.status})"
+
+    def set_progress(self, progress, total=None):
+        """Record how far a running job got; the status endpoint shows it right away."""
+        self.progress = progress
+        if total is not None:
+            self.total = total
+        using = router.db_for_write(type(self), instance=self)
+        type(self).objects.using(using).filter(pk=self.pk).update(
+            progress=self.progress, total=self.total, updated_at=timezone.now()
+        )
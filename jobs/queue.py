@@ -0,0 +1,175 @@
+"""
+A job queue in the database, without a broker.
+
+Mark a module-level function with ``@task()`` and queue a call with
+``enqueue(func, user=..., **kwargs)``. The keyword arguments (JSON) are
+stored on a ``Job`` row in the caller's transaction, so a job of a request
+that rolls back is never run. ``run_jobs`` workers call ``func(job,
+**kwargs)`` and store its return value (JSON) as the job's result.
+
+Workers claim due jobs with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any
+number of them can poll the same table without blocking each other, and
+hold a lease (``locked_until``) that they keep extending while the job
+runs. A job whose worker dies is claimed again once the lease expires:
+jobs run at least once, so task functions have to be safe to re-run. A
+failed attempt is retried after JOBS_RETRY_DELAY seconds, doubling each
+time, until the task's ``max_attempts``; raise ``JobFailed`` to give up
+right away.
+
+SQLite has no row locks (``select_for_update`` is a no-op there) and
+allows one writer at a time; run a single worker with ``--concurrency 1``
+against it.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+class JobFailed(Exception):
+    """Raised by a task to fail its job without retrying."""
+
+
+def task(max_attempts=None):
+    """Allow ``enqueue`` to queue the decorated (module-level) function."""
+    def register(func):
+        func.job_name = f'{func.__module__}.{func.__qualname__}'
+        func.max_attempts = max_attempts
+        return func
+    return register
+
+
+def resolve(name):
+    try:
+        func = import_string(name)
+    except ImportError as e:
+        raise JobFailed(str(e))
+    if getattr(func, 'job_name', None) != name:
+        raise JobFailed(f'{name} is not a task')
+    return func
+
+
+def enqueue(func, user=None, key=None, run_after=None, **kwargs):
+    """
+    Queue a call of the task ``func`` with ``kwargs``. With a ``key``, a
+    queued or running job with the same key is returned instead of
+    queueing another.
+    """
+    if getattr(func, 'job_name', None) is None:
+        raise TypeError(f'{func!r} is not a task; decorate it with @task()')
+    using = router.db_for_write(Job)
+    manager = Job.objects.using(using)
+    for _ in range(3):
+        try:
+            with transaction.atomic(using=using):
+                return manager.create(
+                    name=func.job_name,
+                    payload=kwargs,
+                    key=key,
+                    max_attempts=func.max_attempts or settings.JOBS_MAX_ATTEMPTS,
+                    run_after=run_after or timezone.now(),
+                    created_by=user,
+                )
+        except IntegrityError:
+            if key is None:
+                raise
+            existing = manager.filter(key=key, status__in=Job.ACTIVE).first()
+            if existing is not None:
+                return existing
+            # It finished in between; try again
+    raise IntegrityError(f'Could not queue a job with key {key}')
+
+
+def claim(worker, limit, using=None):
+    """
+    Lock up to ``limit`` due jobs for ``worker``: queued ones and running
+    ones whose lease expired, oldest first. Returns them, counted as an
+    attempt each.
+    """
+    using = using or router.db_for_write(Job)
+    manager = Job.objects.using(using)
+    now = timezone.now()
+    with transaction.atomic(using=using):
+        ids = list(
+            manager.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Job.QUEUED, run_after__lte=now)
+                | Q(status=Job.RUNNING, locked_until__lt=now, attempts__lt=F('max_attempts'))
+            )
+            .order_by('run_after', 'id')
+            .values_list('pk', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        manager.filter(pk__in=ids).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_by=worker,
+            locked_until=now + timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+            started_at=now,
+            updated_at=now,
+        )
+        return list(manager.filter(pk__in=ids).order_by('run_after', 'id'))
+
+
+def held(job, worker):
+    """The job's row, as long as ``worker`` still holds this attempt."""
+    return Job.objects.using(router.db_for_write(Job)).filter(
+        pk=job.pk, status=Job.RUNNING, locked_by=worker, attempts=job.attempts
+    )
+
+
+def complete(job, worker, result=None):
+    """Store the result; False if the lease was lost and the job is someone else's now."""
+    now = timezone.now()
+    return bool(held(job, worker).update(
+        status=Job.SUCCEEDED, result=result, error='', locked_until=None, finished_at=now, updated_at=now
+    ))
+
+
+def fail(job, worker, error, retry=True):
+    """Queue the job again after a delay, or fail it after its last attempt."""
+    now = timezone.now()
+    if retry and job.attempts < job.max_attempts:
+        delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+        changes = {'status': Job.QUEUED, 'run_after': now + timedelta(seconds=delay)}
+    else:
+        changes = {'status': Job.FAILED, 'finished_at': now}
+    return bool(held(job, worker).update(
+        error=error, locked_by='', locked_until=None, updated_at=now, **changes
+    ))
+
+
+def heartbeat(worker, ids):
+    """Extend the leases ``worker`` holds on the jobs ``ids``."""
+    if not ids:
+        return 0
+    now = timezone.now()
+    return Job.objects.using(router.db_for_write(Job)).filter(
+        pk__in=ids, status=Job.RUNNING, locked_by=worker
+    ).update(locked_until=now + timedelta(seconds=settings.JOBS_LEASE_SECONDS), updated_at=now)
+
+
+def reap():
+    """Fail jobs whose worker died during their last attempt."""
+    now = timezone.now()
+    return Job.objects.using(router.db_for_write(Job)).filter(
+        status=Job.RUNNING, locked_until__lt=now, attempts__gte=F('max_attempts')
+    ).update(
+        status=Job.FAILED, error='The worker stopped before the job finished',
+        locked_until=None, finished_at=now, updated_at=now
+    )
+
+
+def prune():
+    """Delete jobs that finished more than JOBS_RETENTION_DAYS ago."""
+    cutoff = timezone.now() - timedelta(days=settings.JOBS_RETENTION_DAYS)
+    deleted, _ = Job.objects.using(router.db_for_write(Job)).filter(
+        status__in=(Job.SUCCEEDED, Job.FAILED), finished_at__lt=cutoff
+    ).delete()
+    return deleted
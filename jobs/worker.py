@@ -0,0 +1,95 @@
+"""
+The ``run_jobs`` worker: one process running jobs in a thread pool.
+
+The main thread claims as many jobs as there are idle threads, extends
+the leases of the running ones every third of JOBS_LEASE_SECONDS, fails
+jobs abandoned by dead workers and prunes old ones. ``stop()`` (SIGTERM,
+SIGINT) stops claiming; the running jobs finish, with their leases kept,
+before ``run()`` returns.
+"""
+import os
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections
+
+from . import queue
+
+PRUNE_INTERVAL = 3600.0
+
+
+class Worker:
+    def __init__(self, concurrency=None, poll_interval=None, log=None):
+        self.concurrency = concurrency or settings.JOBS_CONCURRENCY
+        self.poll_interval = poll_interval if poll_interval is not None else settings.JOBS_POLL_INTERVAL
+        self.id = f'{socket.gethostname()}:{os.getpid()}'
+        self.log = log or (lambda message: None)
+        self.running = {}
+        self.stopping = threading.Event()
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self, burst=False):
+        """Run jobs until stopped; with ``burst``, until none are due either."""
+        pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix='job')
+        maintained = pruned = float('-inf')
+        try:
+            while self.running or not self.stopping.is_set():
+                # Like the end of a request: drop broken or expired connections
+                close_old_connections()
+                claimed = []
+                try:
+                    if time.monotonic() - maintained >= settings.JOBS_LEASE_SECONDS / 3:
+                        queue.heartbeat(self.id, list(self.running))
+                        queue.reap()
+                        maintained = time.monotonic()
+                    if time.monotonic() - pruned >= PRUNE_INTERVAL:
+                        queue.prune()
+                        pruned = time.monotonic()
+                    idle = self.concurrency - len(self.running)
+                    if idle and not self.stopping.is_set():
+                        claimed = queue.claim(self.id, idle)
+                except DatabaseError as e:
+                    self.log(f'Database error, retrying: {e}')
+                    connections.close_all()
+                for job in claimed:
+                    self.log(f'Running job {job.pk} {job.name} (attempt {job.attempts}/{job.max_attempts})')
+                    self.running[job.pk] = pool.submit(self.execute, job)
+                if claimed and len(self.running) < self.concurrency:
+                    continue
+                if not self.running and burst and not claimed:
+                    break
+                timeout = min(self.poll_interval, settings.JOBS_LEASE_SECONDS / 3)
+                if self.running:
+                    wait(self.running.values(), timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    self.stopping.wait(timeout)
+                self.running = {pk: future for pk, future in self.running.items() if not future.done()}
+        finally:
+            pool.shutdown(wait=True)
+            connections.close_all()
+
+    def execute(self, job):
+        close_old_connections()
+        started = time.perf_counter()
+        try:
+            try:
+                result = queue.resolve(job.name)(job, **job.payload)
+                outcome = 'succeeded' if queue.complete(job, self.id, result) else 'lost its lease'
+            except queue.JobFailed as e:
+                queue.fail(job, self.id, str(e), retry=False)
+                outcome = f'failed: {e}'
+            except Exception as e:
+                queue.fail(job, self.id, f'{type(e).__name__}: {e}')
+                retry = ', will retry' if job.attempts < job.max_attempts else ''
+                outcome = f'failed{retry}: {type(e).__name__}: {e}'
+            self.log(f'Job {job.pk} {outcome} in {time.perf_counter() - started:.2f}s')
+        except Exception as e:
+            # Recording the outcome failed; the lease runs out and the job is claimed again
+            self.log(f'Job {job.pk}: could not record the outcome: {e}')
+        finally:
+            close_old_connections()
@@ -0,0 +1,90 @@
+"""
+Bulk assignment of doctors to patients, in the request (``assign_doctors``)
+or as a job (``run_bulk_assign``).
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from doctors.models import Doctor
+from jobs.queue import JobFailed, task
+from patients.models import Patient
+from .models import PatientDoctorMapping
+from .serializers import PatientDoctorMappingSerializer
+
+User = get_user_model()
+
+
+def assign_doctors(user, patient_ids, doctor_ids, notes='', single_patient=False):
+    """
+    Assign every doctor to every patient of ``user`` and return the
+    bulk_assign response body. Missing patients and doctors and existing
+    assignments are reported in ``errors``; raises Patient.DoesNotExist if
+    ``single_patient`` isn't one of the user's.
+    """
+    errors = []
+
+    with transaction.atomic():
+        # Lock the patients so concurrent bulk assignments to the same
+        # patient serialize instead of racing on unique_together
+        patients = Patient.objects.select_for_update().filter(
+            id__in=patient_ids,
+            created_by=user
+        ).only('id', 'name').in_bulk()
+
+        if single_patient and not patients:
+            raise Patient.DoesNotExist
+        for patient_id in patient_ids:
+            if patient_id not in patients:
+                errors.append(
+                    f'Patient with ID {patient_id} not found or you do not have permission to access this patient'
+                )
+
+        doctors = Doctor.objects.only('id', 'name').in_bulk(doctor_ids)
+        for doctor_id in doctor_ids:
+            if doctor_id not in doctors:
+                errors.append(f'Doctor with ID {doctor_id} not found')
+
+        patients = [patients[pk] for pk in patient_ids if pk in patients]
+        doctors = [doctors[pk] for pk in doctor_ids if pk in doctors]
+        created_mappings, existing = PatientDoctorMapping.objects.bulk_assign(
+            patients, doctors, notes=notes
+        )
+
+    patients_by_id = {patient.pk: patient for patient in patients}
+    doctors_by_id = {doctor.pk: doctor for doctor in doctors}
+    for patient_id, doctor_id in sorted(existing):
+        doctor_name = doctors_by_id[doctor_id].name
+        if single_patient:
+            errors.append(f'Dr. {doctor_name} is already assigned to this patient')
+        else:
+            patient_name = patients_by_id[patient_id].name
+            errors.append(f'Dr. {doctor_name} is already assigned to patient {patient_name}')
+
+    # Serialize created mappings
+    serializer = PatientDoctorMappingSerializer(created_mappings, many=True)
+
+    response_data = {
+        'message': f'{len(created_mappings)} doctors assigned successfully',
+        'created_mappings': serializer.data,
+        'created_count': len(created_mappings)
+    }
+
+    if errors:
+        response_data['errors'] = errors
+        response_data['error_count'] = len(errors)
+    return response_data
+
+
+@task()
+def run_bulk_assign(job, user_id, patient_ids, doctor_ids, notes='', single_patient=False):
+    """
+    assign_doctors as a job. Safe to run again: pairs assigned by an earlier
+    attempt are reported as already assigned.
+    """
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        raise JobFailed('User not found')
+    try:
+        return assign_doctors(user, patient_ids, doctor_ids, notes, single_patient)
+    except Patient.DoesNotExist:
+        raise JobFailed('Patient not found or you do not have permission to access this patient')
@@ -0,0 +1,169 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+from sys import maxsize
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+from rest_framework.test import APIClient
+
+from authentication.models import CustomUser
+from doctors.models import Doctor
+from healthcare_backend.pagination import HybridPagination, KeysetPagination
+from healthcare_backend.query_guard import QueryGuard
+from patients.models import Patient
+
+# Page sizes show up in the SQL as LIMITs and as the length of IN lists
+SQL_SIZES = (
+    (re.compile(r'\bLIMIT \d+'), 'LIMIT ?'),
+    (re.compile(r'\bOFFSET \d+'), 'OFFSET ?'),
+    (re.compile(r'\bIN \((?:%s, )*%s\)'), 'IN (...)'),
+)
+
+
+def template(sql):
+    for pattern, replacement in SQL_SIZES:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+@contextmanager
+def page_size(size):
+    """Serve every paginated list ``size`` rows per page."""
+    saved = HybridPagination.page_size, KeysetPagination.page_size
+    HybridPagination.page_size = KeysetPagination.page_size = size
+    try:
+        yield
+    finally:
+        HybridPagination.page_size, KeysetPagination.page_size = saved
+
+
+class Command(BaseCommand):
+    help = (
+        'Request each list endpoint at two page sizes against the current data '
+        'and fail if any query runs more often for the larger page, i.e. if the '
+        'number of queries grows with the number of rows served.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Email of the user whose data is used (default: the user with the most patients).'
+        )
+        parser.add_argument(
+            '--page-sizes', type=int, nargs=2, default=(2, 20), metavar=('SMALL', 'LARGE'),
+            help='The two page sizes to compare (default: 2 20).'
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        small, large = sorted(options['page_sizes'])
+        if small < 2 or small == large:
+            raise CommandError('Give two different page sizes of at least 2.')
+        patient = Patient.objects.filter(created_by=user).first()
+        if patient is None:
+            raise CommandError(f'{user} has no patients; seed some data first.')
+        doctor = Doctor.objects.filter(is_active=True).first()
+        specialization = doctor.specialization if doctor else 'CARDIOLOGY'
+
+        # name -> path, at both page sizes
+        lists = {
+            'patient-list': '/api/patients/',
+            'patient-list-cursor': '/api/patients/?pagination=cursor',
+            'patient-search': '/api/patients/?' + urlencode({'q': patient.name.split()[0][:5]}),
+            'doctor-list': '/api/doctors/',
+            'doctor-list-cursor': '/api/doctors/?pagination=cursor',
+            'doctor-list-inactive': '/api/doctors/?is_active=false',
+            'doctor-search': '/api/doctors/search/?' + urlencode({'specialization': specialization}),
+            'doctor-available': '/api/doctors/available/?' + urlencode({'day': 'monday', 'time': '09:00'}),
+            'mapping-list': '/api/mappings/',
+            'mapping-list-cursor': '/api/mappings/?pagination=cursor',
+            'mapping-list-sparse': '/api/mappings/?fields=id,patient_details,doctor_details',
+        }
+        # Not paginated: the patients with the fewest and the most active mappings instead
+        by_mappings = Patient.objects.filter(created_by=user).annotate(
+            n=Count('doctor_mappings', filter=Q(doctor_mappings__is_active=True))
+        ).filter(n__gt=0).order_by('n', 'pk')
+        fewest, most = by_mappings.first(), by_mappings.last()
+        runs = {
+            name: [(path, small), (path, large)] for name, path in lists.items()
+        }
+        if fewest is not None:
+            runs['mapping-doctors-by-patient'] = [
+                (f'/api/mappings/patient/{fewest.pk}/', large), (f'/api/mappings/patient/{most.pk}/', large),
+            ]
+
+        client = APIClient(SERVER_NAME=self.server_name())
+        client.force_authenticate(user)
+        failures = []
+        for name, sizes in runs.items():
+            # Warm up first: catalogs and caches are filled on the first request
+            self.request(client, *sizes[-1])
+            (rows, queries), (more_rows, more_queries) = [self.request(client, *run) for run in sizes]
+            problems = []
+            if rows is None or more_rows is None:
+                problems.append('request failed')
+            elif more_rows <= rows:
+                problems.append(f'{more_rows} rows at most; seed more data to compare')
+            elif self.repeated(queries, more_queries):
+                problems.append(
+                    f'{sum(queries.values())} queries for {rows} rows, '
+                    f'{sum(more_queries.values())} for {more_rows}'
+                )
+            status = self.style.ERROR('; '.join(problems)) if problems else self.style.SUCCESS(
+                f'ok ({sum(queries.values())} and {sum(more_queries.values())} queries '
+                f'for {rows} and {more_rows} rows)'
+            )
+            self.stdout.write(f'{name}: {status}')
+            if problems or options['verbosity'] > 1:
+                shown = self.repeated(queries, more_queries) if options['verbosity'] < 2 else (
+                    set(queries) | set(more_queries)
+                )
+                for sql in sorted(shown):
+                    self.stdout.write(f'  {queries[sql]} -> {more_queries[sql]}: {sql}')
+            if problems:
+                failures.append(name)
+
+        if failures:
+            raise CommandError(f'Query count check failed for: {", ".join(failures)}')
+
+    def request(self, client, path, size):
+        """``(rows, {sql template: count})`` of one GET; rows is None if it failed."""
+        guard = QueryGuard(max_repeats=maxsize)
+        with page_size(size), guard:
+            response = client.get(path)
+        queries = Counter()
+        for sql, count in guard.counts.items():
+            queries[template(sql)] += count
+        if response.status_code != 200:
+            self.stdout.write(self.style.WARNING(f'  GET {path}: {response.status_code}'))
+            return None, queries
+        data = response.json()
+        return len(data['results'] if 'results' in data else data['doctors']), queries
+
+    @staticmethod
+    def repeated(queries, more_queries):
+        """
+        The queries that ran more often for the larger page. A query that
+        runs once for the larger page (say, loading the few doctors the
+        catalog doesn't hold) depends on the rows served, not their number.
+        """
+        return {sql for sql, count in more_queries.items() if count > max(queries[sql], 1)}
+
+    def get_user(self, email):
+        if email:
+            try:
+                return CustomUser.objects.get(email=email)
+            except CustomUser.DoesNotExist:
+                raise CommandError(f'No user with email {email}')
+        user = CustomUser.objects.annotate(n=Count('patients')).order_by('-n').first()
+        if user is None:
+            raise CommandError('No users found; seed some data first.')
+        return user
+
+    @staticmethod
+    def server_name():
+        hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+        return hosts[0] if hosts else 'localhost'
@@ -0,0 +1,148 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count
+
+from authentication.models import CustomUser
+from doctors.availability import available_doctors
+from doctors.models import Doctor, DoctorAvailability
+from doctors.search import DoctorSearchFilters, facet_queryset
+from mappings.models import PatientDoctorMapping
+from mappings.views import PatientDoctorMappingViewSet
+from patients.models import Patient
+from patients.search import search_patients
+from patients.views import PatientViewSet
+
+# SQLite reports full table scans as "SCAN <table>" without "USING ... INDEX"
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (?!.*\bUSING\b.*INDEX)')
+
+# Below this many mappings a planner rightly prefers scanning small tables
+MIN_ROWS = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        'ANALYZE, then EXPLAIN the main query behind each API endpoint against '
+        'the current data and fail if any of them needs a sequential scan or '
+        'skips the index built for it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Email of the user whose data is used (default: the user with the most patients).'
+        )
+        parser.add_argument(
+            '--force-indexes', action='store_true',
+            help='Turn enable_seqscan off (PostgreSQL) and skip the data size check: '
+                 'only a query without any usable index fails.'
+        )
+        parser.add_argument(
+            '--min-rows', type=int, default=MIN_ROWS,
+            help=f'Mappings needed for plans to be meaningful (default: {MIN_ROWS}).'
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        patient = Patient.objects.filter(created_by=user).first()
+        if patient is None:
+            raise CommandError(f'{user} has no patients; seed some data first.')
+        doctor = Doctor.objects.first()
+        specialization = doctor.specialization if doctor else 'CARDIOLOGY'
+        force = options['force_indexes']
+        mappings = PatientDoctorMapping.objects.count()
+        if not force and mappings < options['min_rows']:
+            raise CommandError(
+                f'Only {mappings} mappings: with planner defaults, scans of tables this small are '
+                f'expected. Seed more data (seed_data --scale) or pass --force-indexes.'
+            )
+
+        # The list queries as the viewsets build them: same joins, same order
+        patient_list = Patient.objects.filter(created_by=user).select_related(*PatientViewSet.select_related_fields)
+        mapping_list = PatientDoctorMapping.objects.filter(patient__created_by=user).select_related(
+            *PatientDoctorMappingViewSet.select_related_fields
+        )
+        # name -> (queryset, indexes the plan must use)
+        queries = {
+            'patient-list': (
+                patient_list.order_by(*PatientViewSet.keyset_ordering)[:21], ['patient_owner_created_idx']
+            ),
+            'patient-email-unique': (Patient.objects.filter(created_by=user, email=patient.email), []),
+            'patient-search': (search_patients(
+                Patient.objects.filter(created_by=user), patient.name.split()[0][:5]
+            )[:21], []),
+            'doctor-list': (Doctor.objects.order_by('name', 'id')[:21], ['doctor_name_idx']),
+            'doctor-list-filtered': (Doctor.objects.filter(
+                specialization=specialization, is_active=True
+            ).order_by('name', 'id')[:21], ['doctor_spec_active_name_idx']),
+            'doctor-list-active': (
+                Doctor.objects.filter(is_active=True).order_by('name', 'id')[:21], ['doctor_active_name_idx']
+            ),
+            'doctor-search': (DoctorSearchFilters(specializations=[specialization], experience_min=5)
+                .apply(Doctor.objects.all()).order_by('name', 'id')[:21], ['doctor_spec_active_name_idx']),
+            'doctor-facets': (facet_queryset(), ['doctor_facet_idx']),
+            'doctor-available': (available_doctors(Doctor.objects.all(), 1, 14 * 60, 30, specialization)
+                .order_by('name', 'id')[:21], ['availability_spec_slot_idx']),
+            # Filtered through the patient join: the owner's patients come from
+            # their index, each patient's mappings from the per-patient one
+            'mapping-list': (
+                mapping_list.order_by(*PatientDoctorMappingViewSet.keyset_ordering)[:21],
+                ['patient_owner_created_idx', 'mapping_patient_assigned_idx'],
+            ),
+            'mapping-doctors-by-patient': (PatientDoctorMapping.objects.filter(
+                patient=patient, is_active=True
+            ), ['mapping_patient_active_idx']),
+        }
+
+        self.analyze([Patient, Doctor, PatientDoctorMapping, CustomUser, DoctorAvailability])
+        failures = []
+        for name, (queryset, indexes) in queries.items():
+            plan = self.explain(queryset, force)
+            problems = self.sequential_scans(queryset.db, plan)
+            if not force:
+                problems += [f'does not use {index}' for index in indexes if index not in plan]
+            status = self.style.ERROR('; '.join(problems)) if problems else self.style.SUCCESS('ok')
+            self.stdout.write(f'{name}: {status}')
+            if problems or options['verbosity'] > 1:
+                self.stdout.write(plan + '\n')
+            if problems:
+                failures.append(name)
+
+        if failures:
+            raise CommandError(f'Bad plans for: {", ".join(failures)}')
+
+    def get_user(self, email):
+        if email:
+            try:
+                return CustomUser.objects.get(email=email)
+            except CustomUser.DoesNotExist:
+                raise CommandError(f'No user with email {email}')
+        user = CustomUser.objects.annotate(n=Count('patients')).order_by('-n').first()
+        if user is None:
+            raise CommandError('No users found; seed some data first.')
+        return user
+
+    def analyze(self, models):
+        # Fresh statistics, so the plans are the ones production would get
+        for model in models:
+            connection = connections[model.objects.db]
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+    def explain(self, queryset, force_indexes):
+        connection = connections[queryset.db]
+        with transaction.atomic(using=queryset.db):
+            if connection.vendor == 'postgresql' and force_indexes:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    def sequential_scans(self, alias, plan):
+        vendor = connections[alias].vendor
+        lines = plan.splitlines()
+        if vendor == 'postgresql':
+            return [line for line in lines if 'Seq Scan' in line]
+        if vendor == 'sqlite':
+            return [line for line in lines if SQLITE_FULL_SCAN.search(line)]
+        return []
@@ -0,0 +1,122 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.models import CustomUser
+from healthcare_backend.db.replicas import STICKY_KEY, ReplicaRoutingMiddleware, use_primary
+from patients.models import Patient
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database into its replicas, write to the primary '
+        'only, and check which database serves the reads: replicas in safe '
+        'requests, the primary after a write, while the user is pinned, and '
+        'inside use_primary(). Try it with --settings=healthcare_backend.settings_replicas.'
+    )
+
+    def handle(self, *args, **options):
+        replicas = list(getattr(settings, 'DATABASE_REPLICAS', ()))
+        if not replicas:
+            raise CommandError(
+                'No DATABASE_REPLICAS configured; run with --settings=healthcare_backend.settings_replicas.'
+            )
+        aliases = [DEFAULT_DB_ALIAS, *replicas]
+        if any(connections[alias].vendor != 'sqlite' for alias in aliases):
+            raise CommandError('The replicas are copied from the primary here, which needs SQLite databases.')
+
+        email = f'replica-check-{uuid.uuid4().hex[:12]}@example.com'
+        user = CustomUser.objects.create_user(
+            username=email, email=email, password=uuid.uuid4().hex, name='Replica check'
+        )
+        try:
+            replicated = self.create_patient(user, 'Replicated')
+            for alias in replicas:
+                self.copy_database(DEFAULT_DB_ALIAS, alias)
+            # Only on the primary from here on: seen in a response, it was read there
+            lagging = self.create_patient(user, 'Lagging')
+            failures = self.run_checks(user, replicated, lagging)
+        finally:
+            cache.delete(STICKY_KEY.format(user.pk))
+            user.delete()
+
+        if failures:
+            raise CommandError(f'Replica routing failed: {", ".join(failures)}')
+
+    def run_checks(self, user, replicated, lagging):
+        client = APIClient(SERVER_NAME=self.server_name())
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        pin = STICKY_KEY.format(user.pk)
+        on_replica, on_primary = {replicated.pk}, {replicated.pk, lagging.pk}
+
+        def listed():
+            response = client.get('/api/patients/?pagination=cursor')
+            return {row['id'] for row in response.json()['results']} if response.status_code == 200 else None
+
+        checks = {}
+        checks['safe-request-reads-replica'] = listed() == on_replica and cache.get(pin) is None
+        checks['write-then-read-in-request'] = self.in_safe_request(lambda: (
+            not Patient.objects.filter(pk=lagging.pk).exists()
+            and Patient.objects.filter(pk=lagging.pk).update(name=F('name')) == 1
+            and Patient.objects.filter(pk=lagging.pk).exists()
+        ))
+
+        def housekeeping():
+            with use_primary():
+                seen = Patient.objects.filter(pk=lagging.pk).exists()
+                Patient.objects.filter(pk=lagging.pk).update(name=F('name'))
+            # The write inside use_primary() doesn't send later reads to the primary
+            return seen and not Patient.objects.filter(pk=lagging.pk).exists()
+        checks['use-primary'] = self.in_safe_request(housekeeping)
+
+        response = client.post('/api/patients/', self.patient_data(user, 'Created'), format='json')
+        created = response.json()['patient']['id'] if response.status_code == 201 else None
+        checks['write-pins-user'] = created is not None and bool(cache.get(pin))
+        checks['pinned-user-reads-primary'] = listed() == on_primary | {created}
+        # As if REPLICA_STICKY_SECONDS had passed
+        cache.delete(pin)
+        checks['unpinned-user-reads-replica'] = listed() == on_replica
+
+        failures = []
+        for name, passed in checks.items():
+            status = self.style.SUCCESS('ok') if passed else self.style.ERROR('failed')
+            self.stdout.write(f'{name}: {status}')
+            if not passed:
+                failures.append(name)
+        return failures
+
+    @staticmethod
+    def in_safe_request(probe):
+        """Run ``probe`` as the view of an anonymous GET request."""
+        middleware = ReplicaRoutingMiddleware(lambda request: probe())
+        return middleware(RequestFactory().get('/'))
+
+    @staticmethod
+    def copy_database(source, target):
+        connections[target].close()
+        for alias in (source, target):
+            connections[alias].ensure_connection()
+        connections[source].connection.backup(connections[target].connection)
+
+    @staticmethod
+    def patient_data(user, name):
+        return {
+            'name': name, 'email': f'{name.lower()}-{user.email}', 'phone': '5550100',
+            'date_of_birth': '1980-01-01', 'gender': 'O', 'address': 'n/a',
+            'emergency_contact': 'n/a', 'emergency_phone': '5550101',
+        }
+
+    def create_patient(self, user, name):
+        return Patient.objects.create(created_by=user, **self.patient_data(user, name))
+
+    @staticmethod
+    def server_name():
+        hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+        return hosts[0] if hosts else 'localhost'
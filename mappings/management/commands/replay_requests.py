@@ -0,0 +1,266 @@
+import asyncio
+import glob
+import itertools
+import json
+import os
+import time
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.models import CustomUser
+from healthcare_backend.capture import MASK_KEY, unmask
+from healthcare_backend.loadgen import Request, read_response
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Generated values for masked fields that need a particular format
+FILLERS = {
+    'email': lambda n, length: f'replay-{n}@example.com',
+    'license_number': lambda n, length: f'REPLAY-{n}',
+    'date_of_birth': lambda n, length: '1990-01-01',
+    'phone': lambda n, length: '+91 90000 00000',
+    'emergency_phone': lambda n, length: '+91 90000 00001',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay captured requests (see REQUEST_CAPTURE_ENABLED) against a running '
+        'server, keeping their original spacing or sped up, and report the '
+        'latency per endpoint next to the captured latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*',
+                            help='Capture files (default: every requests-*.jsonl in REQUEST_CAPTURE_DIR).')
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server base URL (http only).')
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help='Most requests in flight at once, one connection each (default: 50).')
+        parser.add_argument('--speedup', type=float, default=1.0,
+                            help='Replay this many times faster than captured; 0 sends as fast as possible (default: 1).')
+        parser.add_argument('--writes', action='store_true',
+                            help='Also replay POST/PUT/PATCH/DELETE requests. They change the database.')
+        parser.add_argument('--user', help='Email of the user to send requests of users missing from this database as.')
+        parser.add_argument('--password', default='benchmark-pass', help='Password put into masked password fields.')
+        parser.add_argument('--limit', type=int, help='Replay only the first N requests.')
+        parser.add_argument('--output', help='Also write the report to this JSON file.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError('Only http:// URLs are supported.')
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1.')
+        if options['speedup'] < 0:
+            raise CommandError('--speedup must not be negative.')
+        self.host, self.port = url.hostname, url.port or 80
+        self.password = options['password']
+        self.fallback = None
+        if options['user']:
+            try:
+                self.fallback = CustomUser.objects.get(email=options['user'])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f'No user with email {options["user"]}')
+
+        records = self.load(options['files'] or sorted(glob.glob(
+            os.path.join(settings.REQUEST_CAPTURE_DIR, 'requests-*.jsonl')
+        )))
+        if options['limit']:
+            records = records[:options['limit']]
+        self.tokens = {}
+        self.counter = itertools.count()
+        jobs, skipped = [], {}
+        for record in records:
+            reason = self.skip_reason(record, options['writes'])
+            if reason:
+                skipped[reason] = skipped.get(reason, 0) + 1
+                continue
+            jobs.append((record, self.request(record), self.token(record['user'])))
+        if not jobs:
+            raise CommandError('No requests to replay.')
+
+        self.stdout.write(f'Replaying {len(jobs)} requests with up to {options["concurrency"]} in flight')
+        results, elapsed = asyncio.run(self.replay(jobs, options['concurrency'], options['speedup']))
+        report = self.summarize(results, elapsed, skipped)
+        self.report(report)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Wrote the report to {options["output"]}'))
+
+    def load(self, paths):
+        """Records of all files, in the order they were captured."""
+        if not paths:
+            raise CommandError(f'No capture files in {settings.REQUEST_CAPTURE_DIR}')
+        records = []
+        for path in paths:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            records.append(json.loads(line))
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Could not read {path}: {e}')
+        records.sort(key=lambda record: record['ts'])
+        return records
+
+    def skip_reason(self, record, writes):
+        if record['method'] not in SAFE_METHODS and not writes:
+            return 'writes not enabled (--writes)'
+        if record.get('body_bytes') and record.get('body') is None:
+            return 'body was not captured'
+        return None
+
+    def request(self, record):
+        query = unmask(record['query'], self.fill)
+        path = record['path'] + ('?' + urlencode(query, doseq=True) if query else '')
+        body = record.get('body')
+        if body is not None:
+            # Filled per send, so masked emails etc. stay unique
+            body = lambda body=body: unmask(body, self.fill)
+        return Request(record['method'], path, body, accept=record.get('accept') or 'application/json')
+
+    def fill(self, field, marker):
+        if marker[MASK_KEY] != 'str':
+            return None
+        n = next(self.counter)
+        if field in FILLERS:
+            return FILLERS[field](n, marker['len'])
+        if field and 'password' in field:
+            return self.password
+        return ('replay ' * (marker['len'] // 7 + 1))[:marker['len']].strip() or 'replay'
+
+    def token(self, user_id):
+        """An access token for the captured user, the --user fallback or nobody."""
+        if user_id is None:
+            return None
+        if user_id not in self.tokens:
+            user = CustomUser.objects.filter(pk=user_id).first() or self.fallback
+            self.tokens[user_id] = str(RefreshToken.for_user(user).access_token) if user else None
+        return self.tokens[user_id]
+
+    async def replay(self, jobs, concurrency, speedup):
+        """Send every job at its (scaled) captured offset; returns the results and the elapsed time."""
+        pending = asyncio.Queue()
+        results = []
+        started = time.perf_counter()
+        first = jobs[0][0]['ts']
+
+        async def schedule():
+            for job in jobs:
+                due = started + (job[0]['ts'] - first) / speedup if speedup else started
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                pending.put_nowait((job, due))
+            for _ in range(concurrency):
+                pending.put_nowait(None)
+
+        async def worker():
+            reader = writer = None
+            while True:
+                item = await pending.get()
+                if item is None:
+                    break
+                (record, request, token), due = item
+                sent = time.perf_counter()
+                status = None
+                try:
+                    if writer is None:
+                        reader, writer = await asyncio.open_connection(self.host, self.port)
+                    writer.write(request.encode(self.host, self.port, token))
+                    await writer.drain()
+                    status, keep_alive = await read_response(reader)
+                    if not keep_alive:
+                        writer.close()
+                        writer = None
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    if writer is not None:
+                        writer.close()
+                    writer = None
+                results.append((record, status, time.perf_counter() - sent, sent - due))
+            if writer is not None:
+                writer.close()
+
+        await asyncio.gather(schedule(), *(worker() for _ in range(concurrency)))
+        return results, time.perf_counter() - started
+
+    def summarize(self, results, elapsed, skipped):
+        endpoints = {}
+        for record, status, latency, lag in results:
+            key = (record.get('endpoint') or 'unmatched', record['method'])
+            entry = endpoints.setdefault(key, {'captured': [], 'replayed': [], 'mismatches': 0, 'errors': 0})
+            entry['captured'].append(record['latency_ms'])
+            if status is None:
+                entry['errors'] += 1
+                continue
+            entry['replayed'].append(latency * 1000)
+            if status != record['status']:
+                entry['mismatches'] += 1
+        rows = []
+        for (endpoint, method), entry in sorted(endpoints.items()):
+            captured_p50, captured_p95 = percentile(entry['captured'], 50), percentile(entry['captured'], 95)
+            replay_p50, replay_p95 = percentile(entry['replayed'], 50), percentile(entry['replayed'], 95)
+            rows.append({
+                'endpoint': endpoint,
+                'method': method,
+                'requests': len(entry['captured']),
+                'captured_p50_ms': captured_p50,
+                'captured_p95_ms': captured_p95,
+                'replay_p50_ms': replay_p50,
+                'replay_p95_ms': replay_p95,
+                'p50_change': change(captured_p50, replay_p50),
+                'p95_change': change(captured_p95, replay_p95),
+                'status_mismatches': entry['mismatches'],
+                'errors': entry['errors'],
+            })
+        lags = [lag * 1000 for _, _, _, lag in results]
+        return {
+            'requests': len(results),
+            'duration': elapsed,
+            'throughput': len(results) / elapsed if elapsed else 0.0,
+            'lag_p95_ms': percentile(lags, 95),
+            'lag_max_ms': max(lags, default=0.0),
+            'endpoints': rows,
+            'skipped': skipped,
+        }
+
+    def report(self, report):
+        for row in report['endpoints']:
+            self.stdout.write(
+                f"{row['method']:<6} {row['endpoint']:<28} n={row['requests']:<6} "
+                f"p50 {row['captured_p50_ms']:7.1f} -> {row['replay_p50_ms']:7.1f} ({format_change(row['p50_change'])})  "
+                f"p95 {row['captured_p95_ms']:7.1f} -> {row['replay_p95_ms']:7.1f} ms ({format_change(row['p95_change'])})"
+                + (f"  status differs {row['status_mismatches']}" if row['status_mismatches'] else '')
+                + (f"  errors {row['errors']}" if row['errors'] else '')
+            )
+        for reason, count in report['skipped'].items():
+            self.stdout.write(f'skipped {count}: {reason}')
+        # Requests that went out late mean --concurrency limited the replay
+        self.stdout.write(
+            f"{report['requests']} requests in {report['duration']:.1f}s ({report['throughput']:.1f} req/s), "
+            f"send lag p95 {report['lag_p95_ms']:.1f} ms, max {report['lag_max_ms']:.1f} ms"
+        )
+
+
+def percentile(values, q):
+    """The ``q``th percentile of ``values`` (nearest rank), 0 when empty."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return float(values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))])
+
+
+def change(old, new):
+    """Percent change from ``old`` to ``new``."""
+    if not old:
+        return None
+    return round((new - old) / old * 100, 1)
+
+
+def format_change(value):
+    return '-' if value is None else f'{value:+.0f}%'
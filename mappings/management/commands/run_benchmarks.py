@@ -0,0 +1,352 @@
+import asyncio
+import itertools
+import json
+import re
+import subprocess
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.models import CustomUser
+from doctors.models import Doctor
+from healthcare_backend.loadgen import Request, fetch, run_load
+from mappings.models import PatientDoctorMapping
+from patients.models import Patient
+
+# Query strings for routes that need parameters to do real work
+QUERY_STRINGS = {
+    'doctor-available': 'day=tue&time=14:00&duration=30',
+    'doctor-search': 'specialization=CARDIOLOGY&experience_min=5',
+}
+# Routes that don't render JSON
+ACCEPT = {
+    'patient-export': 'application/x-ndjson',
+    'mapping-export': 'application/x-ndjson',
+}
+# Routes that can't be repeated against the same data
+NOT_REPEATABLE = {
+    ('refresh', 'POST'): 'refresh tokens are single-use',
+    ('logout', 'POST'): 'revokes the benchmark token',
+}
+METRIC_LINE = re.compile(r'^http_request_db_queries_(sum|count)\{endpoint="([^"]*)",method="([^"]*)"\} (\S+)$')
+
+_unique = itertools.count()
+
+
+def unique():
+    return f'{datetime.now(timezone.utc):%Y%m%d%H%M%S}-{next(_unique)}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every route in the URLconf against a running server at each '
+        'concurrency level, reporting latency percentiles, throughput and SQL '
+        'queries per request (read from /metrics). Writes the results to a JSON '
+        'file; --baseline flags regressions against an earlier run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server base URL (http only).')
+        parser.add_argument('--user', help='Email of the user to benchmark as (default: the user with the most patients).')
+        parser.add_argument('--password', default='benchmark-pass',
+                            help='Password of --user, for the login route (default: the seed_data password).')
+        parser.add_argument('--concurrency', default='1,10,50',
+                            help='Comma-separated concurrent client counts (default: 1,10,50).')
+        parser.add_argument('--duration', type=float, default=3.0, help='Seconds per route and level (default: 3).')
+        parser.add_argument('--route', action='append', dest='routes',
+                            help='Only benchmark routes whose name contains this; repeatable.')
+        parser.add_argument('--writes', action='store_true',
+                            help='Also benchmark POST/PUT/PATCH routes. They add rows to the database.')
+        parser.add_argument('--metrics-token', default=settings.METRICS_TOKEN, help='Bearer token for /metrics.')
+        parser.add_argument('--output', default='benchmark-results.json', help='Results file (default: benchmark-results.json).')
+        parser.add_argument('--baseline', help='Earlier results file to compare against.')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Percent change in p95 latency or throughput counted as a regression (default: 10).')
+        parser.add_argument('--diff', nargs=2, metavar=('OLD', 'NEW'),
+                            help='Only compare two results files, without running anything.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if options['diff']:
+            old, new = (self.load(path) for path in options['diff'])
+            self.compare(old, new, options['threshold'])
+            return
+
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError('Only http:// URLs are supported.')
+        try:
+            levels = sorted({int(level) for level in options['concurrency'].split(',') if level.strip()})
+        except ValueError:
+            raise CommandError('--concurrency must be a comma-separated list of integers.')
+        if not levels or levels[0] < 1:
+            raise CommandError('--concurrency levels must be at least 1.')
+
+        user = self.get_user(options['user'])
+        token = str(RefreshToken.for_user(user).access_token)
+        scenarios, skipped = self.scenarios(user, options['password'], options['writes'], options['routes'])
+        if not scenarios:
+            raise CommandError('No routes to benchmark.')
+
+        self.host, self.port = url.hostname, url.port or 80
+        self.metrics_token = options['metrics_token']
+        results = []
+        for name, method, request, scenario_token in scenarios:
+            for clients in levels:
+                before = self.query_totals()
+                result = asyncio.run(run_load(
+                    self.host, self.port, [request], scenario_token and token, clients, options['duration']
+                ))
+                after = self.query_totals()
+                result.update(
+                    name=name, method=method, path=request.path,
+                    queries_per_request=self.queries_per_request(before, after, name, method),
+                )
+                results.append(result)
+                self.report(result)
+
+        run = {
+            'meta': {
+                'url': options['url'],
+                'started_at': datetime.now(timezone.utc).isoformat(),
+                'revision': self.revision(),
+                'user': user.email,
+                'concurrency': levels,
+                'duration': options['duration'],
+                'data': {
+                    'users': CustomUser.objects.count(),
+                    'doctors': Doctor.objects.count(),
+                    'patients': Patient.objects.count(),
+                    'mappings': PatientDoctorMapping.objects.count(),
+                },
+            },
+            'results': results,
+            'skipped': skipped,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(run, f, indent=2)
+        for entry in skipped:
+            self.stdout.write(f"skipped {entry['method']} {entry['name']}: {entry['reason']}")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}"))
+
+        if options['baseline']:
+            self.compare(self.load(options['baseline']), run, options['threshold'])
+
+    def get_user(self, email):
+        if email:
+            try:
+                return CustomUser.objects.get(email=email)
+            except CustomUser.DoesNotExist:
+                raise CommandError(f'No user with email {email}')
+        user = CustomUser.objects.annotate(n=Count('patients')).order_by('-n').first()
+        if user is None:
+            raise CommandError('No users found; run seed_data first.')
+        return user
+
+    def scenarios(self, user, password, writes, only):
+        """``(name, method, request, authenticated)`` for every route, plus the skipped ones."""
+        mapping = (
+            PatientDoctorMapping.objects.filter(patient__created_by=user)
+            .select_related('patient', 'doctor').order_by('-id').first()
+        )
+        if mapping is None:
+            raise CommandError(f'{user} has no patients with doctors; run seed_data first.')
+        ids = {'patient': mapping.patient_id, 'doctor': mapping.doctor_id, 'mapping': mapping.pk}
+        doctor_ids = list(Doctor.objects.order_by('pk').values_list('pk', flat=True)[:50])
+        bodies = {
+            ('register', 'POST'): lambda: {
+                'name': 'Benchmark User', 'email': f'bench-{unique()}@example.com',
+                'password': 'Benchmark-pass-1', 'password_confirm': 'Benchmark-pass-1',
+            },
+            ('login', 'POST'): {'email': user.email, 'password': password},
+            ('patient-list', 'POST'): lambda: self.patient_body(),
+            ('patient-import', 'POST'): lambda: [self.patient_body()],
+            ('patient-detail', 'PATCH'): {'address': '1 Benchmark Road'},
+            ('patient-detail', 'PUT'): lambda: self.patient_body(email=mapping.patient.email),
+            ('doctor-list', 'POST'): lambda: self.doctor_body(),
+            ('doctor-detail', 'PATCH'): {'bio': 'Benchmark bio'},
+            ('doctor-detail', 'PUT'): lambda: self.doctor_body(),
+            ('mapping-detail', 'PATCH'): {'notes': 'Benchmark note'},
+            ('mapping-detail', 'PUT'): {'notes': 'Benchmark note', 'is_primary': False, 'is_active': True},
+            ('mapping-bulk-assign', 'POST'): {'patient_id': mapping.patient_id, 'doctor_ids': doctor_ids},
+            ('mapping-make-primary', 'POST'): None,
+        }
+
+        scenarios, skipped = [], []
+        for name, pattern, methods, authenticated in self.routes():
+            if only and not any(part in name for part in only):
+                continue
+            kwargs = {key: ids['patient' if key == 'patient_id' else name.split('-')[0]] for key in pattern}
+            path = reverse(name, kwargs=kwargs)
+            for method in methods:
+                if method == 'GET':
+                    query = QUERY_STRINGS.get(name)
+                    request = Request(
+                        'GET', f'{path}?{query}' if query else path,
+                        accept=ACCEPT.get(name, 'application/json')
+                    )
+                elif method == 'DELETE':
+                    skipped.append({'name': name, 'method': method, 'reason': 'would delete the benchmark data'})
+                    continue
+                elif (name, method) in NOT_REPEATABLE:
+                    skipped.append({'name': name, 'method': method, 'reason': NOT_REPEATABLE[(name, method)]})
+                    continue
+                elif not writes:
+                    skipped.append({'name': name, 'method': method, 'reason': 'writes not enabled (--writes)'})
+                    continue
+                elif (name, method) not in bodies:
+                    skipped.append({'name': name, 'method': method, 'reason': 'no request body defined'})
+                    continue
+                else:
+                    request = Request(method, path, bodies[(name, method)])
+                scenarios.append((name, method, request, authenticated))
+        return scenarios, skipped
+
+    def routes(self, patterns=None):
+        """``(name, kwarg names, methods, authenticated)`` of the named API routes."""
+        if patterns is None:
+            patterns = get_resolver().url_patterns
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                if pattern.app_name == 'admin':
+                    continue
+                yield from self.routes(pattern.url_patterns)
+                continue
+            if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name == 'api-root':
+                continue
+            kwargs = list(pattern.pattern.regex.groupindex)
+            if 'format' in kwargs:
+                continue  # format-suffix duplicate of another route
+            callback = pattern.callback
+            if hasattr(callback, 'actions'):
+                methods = [method.upper() for method in callback.actions]
+            elif hasattr(callback, 'cls'):
+                methods = [
+                    method.upper() for method in callback.cls.http_method_names
+                    if method not in ('head', 'options') and hasattr(callback.cls, method)
+                ]
+            else:
+                methods = ['GET']
+            authenticated = pattern.name not in ('register', 'login')
+            yield pattern.name, kwargs, methods, authenticated
+
+    def patient_body(self, email=None):
+        return {
+            'name': 'Benchmark Patient', 'email': email or f'bench-{unique()}@example.com',
+            'phone': '+91 90000 00000', 'date_of_birth': '1990-01-01', 'gender': 'O',
+            'address': '1 Benchmark Road', 'medical_history': 'None',
+            'emergency_contact': 'Benchmark Contact', 'emergency_phone': '+91 90000 00001',
+        }
+
+    def doctor_body(self):
+        key = unique()
+        return {
+            'name': 'Benchmark Doctor', 'email': f'bench-{key}@example.com', 'phone': '+91 90000 00002',
+            'specialization': 'CARDIOLOGY', 'license_number': f'BENCH-{key}', 'years_of_experience': 10,
+            'hospital_affiliation': 'Benchmark Hospital', 'consultation_fee': '100.00',
+            'availability_hours': 'Mon-Fri 9AM-5PM',
+        }
+
+    def query_totals(self):
+        """``{(endpoint, method): [queries, requests]}`` from /metrics, or None."""
+        try:
+            status, body = asyncio.run(fetch(self.host, self.port, Request('GET', reverse('metrics')), self.metrics_token))
+        except OSError:
+            return None
+        if status != 200:
+            return None
+        totals = {}
+        for line in body.decode().splitlines():
+            match = METRIC_LINE.match(line)
+            if match:
+                kind, endpoint, method, value = match.groups()
+                totals.setdefault((endpoint, method), [0.0, 0.0])[kind == 'count'] = float(value)
+        return totals
+
+    def queries_per_request(self, before, after, name, method):
+        if before is None or after is None:
+            return None
+        queries, requests = after.get((name, method), (0.0, 0.0))
+        old_queries, old_requests = before.get((name, method), (0.0, 0.0))
+        if requests <= old_requests:
+            return None
+        return round((queries - old_queries) / (requests - old_requests), 2)
+
+    def report(self, result):
+        queries = result['queries_per_request']
+        self.stdout.write(
+            f"{result['method']:<6} {result['name']:<28} c={result['clients']:<4} "
+            f"{result['throughput']:8.1f} req/s  p50 {result['p50_ms']:7.1f}  p95 {result['p95_ms']:7.1f}  "
+            f"p99 {result['p99_ms']:7.1f} ms  queries {'-' if queries is None else queries}  "
+            f"status {result['status_codes']}" + (f"  errors {result['errors']}" if result['errors'] else '')
+        )
+
+    def revision(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+    def compare(self, old, new, threshold):
+        """Print the changes per route and level; fail if any regressed."""
+        baseline = {(r['name'], r['method'], r['clients']): r for r in old['results']}
+        regressions = 0
+        for result in new['results']:
+            before = baseline.get((result['name'], result['method'], result['clients']))
+            if before is None:
+                continue
+            problems = []
+            p95 = change(before['p95_ms'], result['p95_ms'])
+            throughput = change(before['throughput'], result['throughput'])
+            if p95 is not None and p95 > threshold:
+                problems.append(f'p95 {before["p95_ms"]:.1f} -> {result["p95_ms"]:.1f} ms (+{p95:.0f}%)')
+            if throughput is not None and -throughput > threshold:
+                problems.append(
+                    f'throughput {before["throughput"]:.1f} -> {result["throughput"]:.1f} req/s ({throughput:.0f}%)'
+                )
+            old_failures, new_failures = failure_rate(before), failure_rate(result)
+            if new_failures > old_failures + 0.01:
+                problems.append(f'failed requests {old_failures:.0%} -> {new_failures:.0%}')
+            old_queries, new_queries = before.get('queries_per_request'), result.get('queries_per_request')
+            if old_queries is not None and new_queries is not None and new_queries > old_queries + 0.5:
+                problems.append(f'queries {old_queries} -> {new_queries}')
+            label = f"{result['method']} {result['name']} c={result['clients']}"
+            if problems:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(f'REGRESSION {label}: ' + '; '.join(problems)))
+            elif self.verbosity > 1:
+                self.stdout.write(f'ok {label}')
+        if regressions:
+            raise CommandError(f'{regressions} regressions over {threshold:g}%')
+        self.stdout.write(self.style.SUCCESS('No regressions.'))
+
+
+def change(old, new):
+    """Percent change from ``old`` to ``new``."""
+    if not old:
+        return None
+    return (new - old) / old * 100
+
+
+def failure_rate(result):
+    """Share of requests that got a 4xx/5xx or failed to connect."""
+    failed = result['errors'] + sum(
+        count for status, count in result['status_codes'].items() if int(status) >= 400
+    )
+    total = result['requests'] + result['errors']
+    return failed / total if total else 0.0
@@ -0,0 +1,216 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from analytics.rebuild import rebuild_rollups
+from authentication.models import CustomUser
+from doctors.availability import rebuild_availability
+from doctors.catalog import doctor_catalog
+from doctors.models import Doctor
+from healthcare_backend.deletion import delete_in_batches
+from mappings.models import PatientDoctorMapping
+from patients.models import Patient
+
+USER_EMAIL = 'seed-user-{}@example.com'
+DOCTOR_EMAIL = 'seed-doctor-{}@example.com'
+PATIENT_EMAIL = 'seed-patient-{}@example.com'
+
+FIRST_NAMES = (
+    'Aarav', 'Aisha', 'Alex', 'Amelia', 'Ananya', 'Ben', 'Carlos', 'Chen', 'Chloe', 'Daniel',
+    'Diya', 'Elena', 'Emma', 'Fatima', 'Gabriel', 'Hana', 'Ishaan', 'James', 'Kavya', 'Leila',
+    'Liam', 'Lucas', 'Maria', 'Mei', 'Mohammed', 'Noah', 'Olivia', 'Priya', 'Rahul', 'Sara',
+    'Sofia', 'Tariq', 'Wei', 'Yuki', 'Zara',
+)
+LAST_NAMES = (
+    'Ahmed', 'Brown', 'Chen', 'Das', 'Evans', 'Fernandez', 'Garcia', 'Gupta', 'Hassan', 'Ito',
+    'Johnson', 'Kim', 'Kumar', 'Lee', 'Lopez', 'Martin', 'Mehta', 'Nguyen', 'Okafor', 'Patel',
+    'Rossi', 'Sato', 'Shah', 'Singh', 'Smith', 'Tanaka', 'Walker', 'Wang', 'Williams', 'Zhang',
+)
+HOSPITALS = tuple(
+    f'{city} {kind}' for city in ('Mumbai', 'Delhi', 'Pune', 'Chennai', 'Kolkata', 'Jaipur', 'Surat', 'Nagpur')
+    for kind in ('General Hospital', 'Medical Center', 'Clinic', 'Heart Institute', "Children's Hospital")
+)
+AVAILABILITY = (
+    'Mon-Fri 9AM-5PM', 'Mon-Fri 10AM-6PM', 'Mon-Sat 9AM-1PM', 'Mon, Wed, Fri 9AM-4PM',
+    'Tue, Thu 11AM-7PM', 'Weekdays 8:30am-12pm, 1pm-5pm', 'Mon-Fri 9AM-5PM; Sat 10AM-2PM',
+    'Sat-Sun 10AM-4PM', 'Fri 10PM-6AM', '24/7', 'By appointment',
+)
+CONDITIONS = (
+    'Hypertension', 'Type 2 diabetes', 'Asthma', 'Migraine', 'Hypothyroidism', 'Osteoarthritis',
+    'Seasonal allergies', 'Anxiety', 'High cholesterol', 'Eczema', 'No known conditions',
+)
+FEES = tuple(Decimal(fee) for fee in ('25', '40', '50', '75', '100', '120', '150', '200', '300', '500', '800'))
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate realistic users, doctors, patients and mappings with bulk '
+        'inserts for load testing. Sizes default to a production-like data set '
+        'and scale with --scale. Seeded users share one password.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users (default: 1000).')
+        parser.add_argument('--doctors', type=int, default=5000, help='Doctors (default: 5000).')
+        parser.add_argument('--patients', type=int, default=1000000, help='Patients (default: 1000000).')
+        parser.add_argument('--mappings', type=int, default=3000000, help='Patient-doctor mappings (default: 3000000).')
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Multiply every size, e.g. 0.01 for a quick data set (default: 1).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT (default: 5000).')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for repeatable data (default: 42).')
+        parser.add_argument('--password', default='benchmark-pass', help='Password of the seeded users.')
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded rows first.')
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        sizes = {name: max(int(options[name] * scale), 0) for name in ('users', 'doctors', 'patients', 'mappings')}
+        if sizes['patients'] and not sizes['users']:
+            raise CommandError('Patients need at least one user.')
+        if sizes['mappings'] and not (sizes['patients'] and sizes['doctors']):
+            raise CommandError('Mappings need patients and doctors.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        self.batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        self.rng = random.Random(options['seed'])
+
+        if options['clear']:
+            self.clear()
+        elif CustomUser.objects.filter(email=USER_EMAIL.format(0)).exists():
+            raise CommandError('Seed data already exists; pass --clear to replace it.')
+
+        started = time.perf_counter()
+        user_ids = self.create_users(sizes['users'], options['password'])
+        doctor_ids = self.create_doctors(sizes['doctors'])
+        patients, mappings = self.create_patients(sizes['patients'], sizes['mappings'], user_ids, doctor_ids)
+        doctor_catalog.invalidate()
+        self.analyze()
+        # bulk_create skips the analytics signals too
+        rebuild_rollups()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(user_ids)} users, {len(doctor_ids)} doctors, {patients} patients and '
+            f'{mappings} mappings in {time.perf_counter() - started:.1f}s.'
+        ))
+        if user_ids:
+            self.stdout.write(f'Log in as {USER_EMAIL.format(0)} / {options["password"]}.')
+
+    def clear(self):
+        users = CustomUser.objects.filter(email__startswith='seed-user-', email__endswith='@example.com')
+        patients = Patient.objects.filter(created_by__in=users)
+        for label, queryset in (
+            ('mappings', PatientDoctorMapping.objects.filter(patient__created_by__in=users)),
+            ('patients', patients),
+            ('doctors', Doctor.objects.filter(email__startswith='seed-doctor-', email__endswith='@example.com')),
+            ('users', users),
+        ):
+            deleted = delete_in_batches(queryset, self.batch_size)
+            self.stdout.write(f'Deleted seeded {label} ({deleted} rows with cascades)')
+        doctor_catalog.invalidate()
+
+    def create_users(self, count, password):
+        # One hash for everyone: hashing per user would take minutes.
+        password = make_password(password)
+        ids = []
+        for start in range(0, count, self.batch_size):
+            users = []
+            for i in range(start, min(start + self.batch_size, count)):
+                email = USER_EMAIL.format(i)
+                users.append(CustomUser(
+                    username=email, email=email, name=self.person_name(), password=password
+                ))
+            ids.extend(user.pk for user in CustomUser.objects.bulk_create(users))
+        self.stdout.write(f'Created {len(ids)} users')
+        return ids
+
+    def create_doctors(self, count):
+        rng = self.rng
+        specializations = [code for code, _ in Doctor.SPECIALIZATION_CHOICES]
+        ids = []
+        for start in range(0, count, self.batch_size):
+            doctors = []
+            for i in range(start, min(start + self.batch_size, count)):
+                years = rng.randint(0, 40)
+                doctors.append(Doctor(
+                    name=self.person_name(),
+                    email=DOCTOR_EMAIL.format(i),
+                    phone=self.phone(),
+                    specialization=rng.choice(specializations),
+                    license_number=f'SEED-{i:08d}',
+                    years_of_experience=years,
+                    hospital_affiliation=rng.choice(HOSPITALS),
+                    consultation_fee=rng.choice(FEES),
+                    availability_hours=rng.choice(AVAILABILITY),
+                    bio=f'{years} years of clinical practice.',
+                    is_active=rng.random() < 0.95,
+                ))
+            with transaction.atomic():
+                doctors = Doctor.objects.bulk_create(doctors)
+                # bulk_create skips post_save, which maintains these
+                rebuild_availability(doctors)
+            ids.extend(doctor.pk for doctor in doctors)
+        self.stdout.write(f'Created {len(ids)} doctors')
+        return ids
+
+    def create_patients(self, count, mapping_count, user_ids, doctor_ids):
+        """Create patients batch by batch, each batch with its share of the mappings."""
+        rng = self.rng
+        per_patient, extra = divmod(mapping_count, count) if count else (0, 0)
+        if per_patient + (1 if extra else 0) > len(doctor_ids):
+            raise CommandError('More mappings per patient than there are doctors.')
+        today = date.today()
+        created = mapped = 0
+        for start in range(0, count, self.batch_size):
+            stop = min(start + self.batch_size, count)
+            patients = [
+                Patient(
+                    name=self.person_name(),
+                    email=PATIENT_EMAIL.format(i),
+                    phone=self.phone(),
+                    date_of_birth=today - timedelta(days=rng.randint(365, 90 * 365)),
+                    gender=rng.choice('MFO'),
+                    address=f'{rng.randint(1, 999)} {rng.choice(LAST_NAMES)} Road, {rng.choice(HOSPITALS).split()[0]}',
+                    medical_history=', '.join(rng.sample(CONDITIONS, rng.randint(1, 3))),
+                    emergency_contact=self.person_name(),
+                    emergency_phone=self.phone(),
+                    created_by_id=rng.choice(user_ids),
+                )
+                for i in range(start, stop)
+            ]
+            with transaction.atomic():
+                patients = Patient.objects.bulk_create(patients)
+                mappings = []
+                for offset, patient in enumerate(patients):
+                    k = per_patient + (1 if start + offset < extra else 0)
+                    primary = rng.random() < 0.7
+                    for n, doctor_id in enumerate(rng.sample(doctor_ids, k)):
+                        mappings.append(PatientDoctorMapping(
+                            patient_id=patient.pk, doctor_id=doctor_id,
+                            is_primary=primary and n == 0, is_active=rng.random() < 0.9,
+                        ))
+                PatientDoctorMapping.objects.bulk_create(mappings, batch_size=self.batch_size)
+            created += len(patients)
+            mapped += len(mappings)
+            if self.verbosity > 1 or stop == count or (start // self.batch_size) % 20 == 19:
+                self.stdout.write(f'Created {created} patients, {mapped} mappings')
+        return created, mapped
+
+    def analyze(self):
+        # Fresh planner statistics, so the benchmarks see production-like plans
+        tables = [model._meta.db_table for model in (CustomUser, Doctor, Patient, PatientDoctorMapping)]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'ANALYZE {", ".join(connection.ops.quote_name(table) for table in tables)}')
+            elif connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+
+    def person_name(self):
+        return f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}'
+
+    def phone(self):
+        return f'+91 {self.rng.randint(70000, 99999)} {self.rng.randint(0, 99999):05d}'
@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def dedupe_primary_mappings(apps, schema_editor):
+    """Keep the most recently updated primary mapping of each patient."""
+    PatientDoctorMapping = apps.get_model('mappings', 'PatientDoctorMapping')
+    mappings = PatientDoctorMapping.objects.using(schema_editor.connection.alias)
+    patient_ids = (
+        mappings.filter(is_primary=True).order_by().values('patient_id')
+        .annotate(n=Count('id')).filter(n__gt=1).values_list('patient_id', flat=True)
+    )
+    for patient_id in list(patient_ids):
+        primaries = mappings.filter(patient_id=patient_id, is_primary=True).order_by('-updated_at', '-id')
+        keep = primaries.values_list('id', flat=True)[0]
+        primaries.exclude(id=keep).update(is_primary=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mappings', '0002_mapping_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_primary_mappings, migrations.RunPython.noop),
+    ]
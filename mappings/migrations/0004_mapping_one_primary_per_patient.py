@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mappings', '0003_dedupe_primary_mappings'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='patientdoctormapping',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_primary', True)), fields=('patient',), name='mapping_one_primary_per_patient'),
+        ),
+    ]
@@ -1,7 +1,120 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
+from analytics.rollups import RollupDeltas
 from patients.models import Patient
 from doctors.models import Doctor
 
+# Fields the analytics rollups count mappings by
+ROLLUP_FIELDS = ('patient_id', 'doctor_id', 'is_active', 'is_primary')
+
+class PatientDoctorMappingQuerySet(models.QuerySet):
+    def bulk_assign(self, patients, doctors, notes=''):
+        """
+        Create every missing (patient, doctor) pair in one set-based pass.
+
+        Runs one SELECT for the pairs that already exist, one INSERT that
+        skips conflicting rows (so a concurrent assignment can't turn into an
+        IntegrityError) and one SELECT to read the new rows back.
+        Returns ``(created_mappings, existing_pairs)``.
+        """
+        patient_ids = [patient.pk for patient in patients]
+        doctor_ids = [doctor.pk for doctor in doctors]
+        if not patient_ids or not doctor_ids:
+            return [], set()
+
+        with transaction.atomic(using=self.db):
+            existing = set(
+                self.filter(patient_id__in=patient_ids, doctor_id__in=doctor_ids)
+                .values_list('patient_id', 'doctor_id')
+            )
+            new_pairs = [
+                (patient_id, doctor_id)
+                for patient_id in patient_ids
+                for doctor_id in doctor_ids
+                if (patient_id, doctor_id) not in existing
+            ]
+            if not new_pairs:
+                return [], existing
+
+            self.bulk_create(
+                [
+                    self.model(patient_id=patient_id, doctor_id=doctor_id, notes=notes)
+                    for patient_id, doctor_id in new_pairs
+                ],
+                ignore_conflicts=True,
+            )
+
+            wanted = set(new_pairs)
+            created = [
+                mapping for mapping in self.filter(
+                    patient_id__in={patient_id for patient_id, _ in new_pairs},
+                    doctor_id__in={doctor_id for _, doctor_id in new_pairs},
+                ).select_related('patient__created_by', 'doctor').order_by('patient_id', 'doctor_id')
+                if (mapping.patient_id, mapping.doctor_id) in wanted
+            ]
+            deltas = RollupDeltas()
+            for mapping in created:
+                deltas.mapping(
+                    mapping.patient_id, mapping.doctor_id, mappings=1, active=int(mapping.is_active),
+                    owner_id=mapping.patient.created_by_id, specialization=mapping.doctor.specialization
+                )
+            deltas.apply(self.db)
+        return created, existing
+
+    def demote_primary(self, patient_id, exclude=None, deltas=None):
+        """
+        Clear the primary flag of ``patient_id``'s mappings (except
+        ``exclude``) and return their ids. Locks the patient row first, so
+        concurrent primary changes for one patient run one after the other
+        and each sees the previous one's result. Call inside a transaction;
+        pass ``deltas`` to add the rollup changes to it instead of applying
+        them here.
+        """
+        owner_id = Patient.objects.using(self.db).select_for_update().filter(pk=patient_id).values_list(
+            'created_by_id', flat=True
+        ).first()
+        current = self.filter(patient_id=patient_id, is_primary=True)
+        if exclude is not None:
+            current = current.exclude(pk=exclude)
+        demoted = list(current.values_list('pk', 'doctor_id'))
+        if demoted:
+            self.filter(pk__in=[pk for pk, _ in demoted]).update(is_primary=False, updated_at=timezone.now())
+            pending = deltas if deltas is not None else RollupDeltas()
+            for _, doctor_id in demoted:
+                pending.mapping(patient_id, doctor_id, primary=-1, owner_id=owner_id)
+            if deltas is None:
+                pending.apply(self.db)
+        return [pk for pk, _ in demoted]
+
+    def set_primary(self, patient_id, mapping_id):
+        """
+        Make ``mapping_id`` the primary mapping of ``patient_id``: the old
+        primary is demoted and the new one promoted in one transaction.
+        Returns the demoted ids; nothing is written if it already is primary.
+        """
+        with transaction.atomic(using=self.db):
+            deltas = RollupDeltas()
+            demoted = self.demote_primary(patient_id, exclude=mapping_id, deltas=deltas)
+            promoted = self.filter(pk=mapping_id, patient_id=patient_id, is_primary=False)
+            doctor_id = promoted.values_list('doctor_id', flat=True).first()
+            if doctor_id is not None:
+                promoted.update(is_primary=True, updated_at=timezone.now())
+                deltas.mapping(patient_id, doctor_id, primary=1)
+            # Once, after both writes: one pass over the rollup rows, in key order
+            deltas.apply(self.db)
+        return demoted
+
+    def delete(self):
+        # Uncount the mappings in one GROUP BY; cascades from patients,
+        # doctors and users are counted by their pre_delete signals instead.
+        using = self._db or router.db_for_write(self.model, **self._hints)
+        with transaction.atomic(using=using):
+            deltas = RollupDeltas().mapping_rows(self.using(using), -1)
+            result = super().delete()
+            deltas.apply(using)
+        return result
+
+
 class PatientDoctorMapping(models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='doctor_mappings')
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='patient_mappings')
@@ -12,18 +125,98 @@ class PatientDoctorMapping(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PatientDoctorMappingQuerySet.as_manager()
+
     class Meta:
         unique_together = ('patient', 'doctor')
         ordering = ['-assigned_date']
+        indexes = [
+            # Mapping list: patient__created_by = %s ORDER BY assigned_date DESC, id DESC
+            models.Index(fields=['patient', '-assigned_date', '-id'], name='mapping_patient_assigned_idx'),
+            # doctors_by_patient: patient = %s AND is_active
+            models.Index(
+                fields=['patient', '-assigned_date'], name='mapping_patient_active_idx',
+                condition=models.Q(is_active=True)
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['patient'], condition=models.Q(is_primary=True),
+                name='mapping_one_primary_per_patient'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.patient.name} -> Dr. {self.doctor.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Deferred is_primary reads as unknown, so saving it demotes the others
+        instance._loaded_primary = instance.__dict__.get('is_primary')
+        instance._loaded_rollup = tuple(instance.__dict__.get(field) for field in ROLLUP_FIELDS)
+        return instance
+
     def save(self, *args, **kwargs):
-        # Ensure only one primary doctor per patient
-        if self.is_primary:
-            PatientDoctorMapping.objects.filter(
-                patient=self.patient, 
-                is_primary=True
-            ).exclude(pk=self.pk).update(is_primary=False)
-        super().save(*args, **kwargs)
+        # Ensure only one primary doctor per patient. The other primaries are
+        # only demoted when this one becomes primary; the database enforces
+        # the rule with mapping_one_primary_per_patient.
+        update_fields = kwargs.get('update_fields')
+        promoting = (
+            self.is_primary
+            and (self._state.adding or getattr(self, '_loaded_primary', None) is not True)
+            and (update_fields is None or 'is_primary' in update_fields)
+        )
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        previous = None if self._state.adding else self.stored_rollup(using)
+        with transaction.atomic(using=using):
+            deltas = RollupDeltas()
+            if promoting:
+                type(self).objects.using(using).demote_primary(self.patient_id, exclude=self.pk, deltas=deltas)
+            super().save(*args, **kwargs)
+            current = self.saved_rollup(previous, update_fields)
+            if current != previous:
+                patient_id, doctor_id, active, primary = current
+                self.rollup_deltas(previous, -1, deltas).mapping(
+                    patient_id, doctor_id, mappings=1, active=int(active), primary=int(primary),
+                    owner_id=self.patient.created_by_id if self.related_cached('patient', patient_id) else None,
+                    specialization=self.doctor.specialization if self.related_cached('doctor', doctor_id) else None,
+                )
+            deltas.apply(using)
+        self._loaded_primary = self.is_primary
+        self._loaded_rollup = current
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(type(self), instance=self)
+        previous = self.stored_rollup(using)
+        with transaction.atomic(using=using):
+            result = super().delete(using=using, keep_parents=keep_parents)
+            self.rollup_deltas(previous, -1).apply(using)
+        return result
+
+    def stored_rollup(self, using):
+        """The stored values of ROLLUP_FIELDS, or None if the row doesn't exist."""
+        loaded = getattr(self, '_loaded_rollup', None)
+        if loaded is not None and None not in loaded:
+            return loaded
+        return type(self).objects.using(using).filter(pk=self.pk).values_list(*ROLLUP_FIELDS).first()
+
+    def saved_rollup(self, previous, update_fields=None):
+        """The values of ROLLUP_FIELDS stored by save(update_fields=...)."""
+        if previous is None or update_fields is None:
+            return tuple(getattr(self, field) for field in ROLLUP_FIELDS)
+        return tuple(
+            getattr(self, field) if field in update_fields or field.removesuffix('_id') in update_fields else stored
+            for field, stored in zip(ROLLUP_FIELDS, previous)
+        )
+
+    def rollup_deltas(self, state, sign, deltas=None):
+        deltas = deltas if deltas is not None else RollupDeltas()
+        if state is not None:
+            patient_id, doctor_id, active, primary = state
+            deltas.mapping(patient_id, doctor_id, mappings=sign, active=sign * active, primary=sign * primary)
+        return deltas
+
+    def related_cached(self, name, pk):
+        # Use the loaded patient or doctor instead of looking it up again
+        return self._meta.get_field(name).is_cached(self) and getattr(self, name).pk == pk
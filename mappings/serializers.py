@@ -1,11 +1,12 @@
 from rest_framework import serializers
+from healthcare_backend.serializers import SparseFieldsetSerializerMixin
 from .models import PatientDoctorMapping
 from patients.serializers import PatientSerializer
-from doctors.serializers import DoctorSerializer, DoctorListSerializer
+from doctors.serializers import CatalogDoctorListSerializer, CatalogDoctorSerializer
 
-class PatientDoctorMappingSerializer(serializers.ModelSerializer):
+class PatientDoctorMappingSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     patient_details = PatientSerializer(source='patient', read_only=True)
-    doctor_details = DoctorListSerializer(source='doctor', read_only=True)
+    doctor_details = CatalogDoctorSerializer(source='doctor', read_only=True)
     
     class Meta:
         model = PatientDoctorMapping
@@ -15,6 +16,7 @@ class PatientDoctorMappingSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ('id', 'assigned_date', 'created_at', 'updated_at')
+        list_serializer_class = CatalogDoctorListSerializer
 
     def validate(self, attrs):
         patient = attrs.get('patient')
@@ -22,7 +24,7 @@ class PatientDoctorMappingSerializer(serializers.ModelSerializer):
         
         # Check if the patient belongs to the current user
         request = self.context.get('request')
-        if request and patient.created_by != request.user:
+        if request and patient.created_by_id != request.user.pk:
             raise serializers.ValidationError("You can only assign doctors to your own patients.")
         
         # Check if mapping already exists (for create operation)
@@ -43,7 +45,7 @@ class PatientDoctorMappingCreateSerializer(serializers.ModelSerializer):
         
         # Check if the patient belongs to the current user
         request = self.context.get('request')
-        if request and patient.created_by != request.user:
+        if request and patient.created_by_id != request.user.pk:
             raise serializers.ValidationError("You can only assign doctors to your own patients.")
         
         # Check if mapping already exists
@@ -57,8 +59,8 @@ class PatientDoctorMappingUpdateSerializer(serializers.ModelSerializer):
         model = PatientDoctorMapping
         fields = ['notes', 'is_primary', 'is_active']
 
-class DoctorsByPatientSerializer(serializers.ModelSerializer):
-    doctor_details = DoctorListSerializer(source='doctor', read_only=True)
+class DoctorsByPatientSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    doctor_details = CatalogDoctorSerializer(source='doctor', read_only=True)
     
     class Meta:
         model = PatientDoctorMapping
@@ -66,3 +68,8 @@ class DoctorsByPatientSerializer(serializers.ModelSerializer):
             'id', 'doctor', 'doctor_details', 'assigned_date', 
             'notes', 'is_primary', 'is_active'
         ]
+        list_serializer_class = CatalogDoctorListSerializer
+
+class MappingExportSerializer(DoctorsByPatientSerializer):
+    class Meta(DoctorsByPatientSerializer.Meta):
+        fields = ['id', 'patient'] + DoctorsByPatientSerializer.Meta.fields[1:]
@@ -1,25 +1,65 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from doctors.catalog import doctor_catalog
+from doctors.serializers import aload_uncatalogued_doctors, catalog_sources
+from healthcare_backend.async_views import AsyncViewSetMixin, aget_object_or_404
+from healthcare_backend.export import export_columns, export_response
+from healthcare_backend.mixins import ConditionalGetMixin, SparseFieldsetMixin
+from healthcare_backend.renderers import CSVRenderer, NDJSONRenderer
+from jobs.queue import enqueue
+from jobs.serializers import JobSerializer
+from .assignment import assign_doctors, run_bulk_assign
 from .models import PatientDoctorMapping
 from patients.models import Patient
-from doctors.models import Doctor
 from .serializers import (
     PatientDoctorMappingSerializer, PatientDoctorMappingCreateSerializer,
-    PatientDoctorMappingUpdateSerializer, DoctorsByPatientSerializer
+    PatientDoctorMappingUpdateSerializer, DoctorsByPatientSerializer,
+    MappingExportSerializer
 )
 
-class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
+def _parse_ids(values):
+    """Split a list of IDs into de-duplicated integers and invalid entries."""
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    ids, invalid, seen = [], [], set()
+    for value in values:
+        try:
+            pk = int(value)
+        except (TypeError, ValueError):
+            invalid.append(value)
+            continue
+        if pk not in seen:
+            seen.add(pk)
+            ids.append(pk)
+    return ids, invalid
+
+def _wants_job(request):
+    """``"async": true`` in the body, or ``Prefer: respond-async`` (RFC 7240)."""
+    flag = request.data.get('async', False)
+    if isinstance(flag, str):
+        flag = flag.lower() in ('1', 'true', 'yes')
+    return bool(flag) or 'respond-async' in request.headers.get('Prefer', '')
+
+class PatientDoctorMappingViewSet(ConditionalGetMixin, SparseFieldsetMixin, AsyncViewSetMixin, viewsets.ModelViewSet):
     serializer_class = PatientDoctorMappingSerializer
     permission_classes = [IsAuthenticated]
+    # doctor_details are read from the doctor catalog, not joined
+    select_related_fields = ('patient__created_by',)
+    validator_related_fields = ('patient', 'doctor')
+    sparse_actions = ('list', 'retrieve', 'doctors_by_patient')
+    keyset_ordering = ('-assigned_date', '-id')
+    async_actions = {'doctors_by_patient': 'adoctors_by_patient'}
 
     def get_queryset(self):
         # Users can only see mappings for their own patients
         return PatientDoctorMapping.objects.filter(
             patient__created_by=self.request.user
-        ).select_related('patient', 'doctor')
+        )
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -34,7 +74,7 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
             if serializer.is_valid():
                 self.perform_create(serializer)
                 # Return full mapping details
-                mapping = PatientDoctorMapping.objects.get(pk=serializer.instance.pk)
+                mapping = self.filter_queryset(self.get_queryset()).get(pk=serializer.instance.pk)
                 response_serializer = PatientDoctorMappingSerializer(mapping)
                 
                 return Response({
@@ -55,7 +95,7 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
 
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
+            queryset = self.filter_queryset(self.get_queryset())
             page = self.paginate_queryset(queryset)
             
             if page is not None:
@@ -69,6 +109,11 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
                 'count': queryset.count()
             }, status=status.HTTP_200_OK)
         
+        except NotFound as e:
+            return Response({
+                'error': str(e.detail)
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         except Exception as e:
             return Response({
                 'error': 'Internal server error',
@@ -97,6 +142,40 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
                 'details': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=True, methods=['post'])
+    def make_primary(self, request, pk=None):
+        """Make this the patient's primary doctor, demoting the current one"""
+        try:
+            mapping = self.get_object()
+            if mapping.is_primary:
+                # Already primary: nothing to write
+                return Response({
+                    'message': f'Dr. {mapping.doctor.name} is already the primary doctor',
+                    'mapping': self.get_serializer(mapping).data,
+                    'demoted_mapping_ids': []
+                }, status=status.HTTP_200_OK)
+            
+            demoted = PatientDoctorMapping.objects.set_primary(mapping.patient_id, mapping.pk)
+            mapping = self.filter_queryset(self.get_queryset()).get(pk=mapping.pk)
+            serializer = self.get_serializer(mapping)
+            
+            return Response({
+                'message': f'Dr. {mapping.doctor.name} is now the primary doctor',
+                'mapping': serializer.data,
+                'demoted_mapping_ids': demoted
+            }, status=status.HTTP_200_OK)
+        
+        except PatientDoctorMapping.DoesNotExist:
+            return Response({
+                'error': 'Mapping not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        except Exception as e:
+            return Response({
+                'error': 'Internal server error',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=False, methods=['get'], url_path='patient/(?P<patient_id>[^/.]+)')
     def doctors_by_patient(self, request, patient_id=None):
         """Get all doctors assigned to a specific patient"""
@@ -111,9 +190,12 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
             mappings = PatientDoctorMapping.objects.filter(
                 patient=patient,
                 is_active=True
-            ).select_related('doctor')
+            )
+            context = self.get_serializer_context()
+            sparse = self.get_sparse_queryset(mappings, DoctorsByPatientSerializer(context=context))
+            mappings = sparse if sparse is not None else mappings
             
-            serializer = DoctorsByPatientSerializer(mappings, many=True)
+            serializer = DoctorsByPatientSerializer(mappings, many=True, context=context)
             
             return Response({
                 'message': f'Doctors for patient {patient.name} retrieved successfully',
@@ -123,7 +205,7 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
                     'email': patient.email
                 },
                 'doctors': serializer.data,
-                'count': mappings.count()
+                'count': len(serializer.data)
             }, status=status.HTTP_200_OK)
         
         except Patient.DoesNotExist:
@@ -137,63 +219,106 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
                 'details': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @action(detail=False, methods=['post'])
-    def bulk_assign(self, request):
-        """Assign multiple doctors to a patient"""
+    async def aprepare(self, request):
+        # doctor_details are read from the doctor catalog
+        await doctor_catalog.asnapshot()
+
+    async def adoctors_by_patient(self, request, patient_id=None):
         try:
-            patient_id = request.data.get('patient_id')
-            doctor_ids = request.data.get('doctor_ids', [])
-            notes = request.data.get('notes', '')
-            
-            if not patient_id or not doctor_ids:
-                return Response({
-                    'error': 'patient_id and doctor_ids are required'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
             # Verify patient belongs to current user
-            patient = get_object_or_404(
-                Patient, 
+            patient = await aget_object_or_404(
+                Patient.objects.all(), 
                 id=patient_id, 
                 created_by=request.user
             )
             
-            created_mappings = []
-            errors = []
+            mappings = PatientDoctorMapping.objects.filter(
+                patient=patient,
+                is_active=True
+            )
+            context = self.get_serializer_context()
+            sparse = self.get_sparse_queryset(mappings, DoctorsByPatientSerializer(context=context))
+            serializer = DoctorsByPatientSerializer([mapping async for mapping in (sparse if sparse is not None else mappings)], many=True, context=context)
+            await aload_uncatalogued_doctors(serializer.instance, catalog_sources(serializer.child))
             
-            for doctor_id in doctor_ids:
-                try:
-                    doctor = Doctor.objects.get(id=doctor_id)
-                    
-                    # Check if mapping already exists
-                    if not PatientDoctorMapping.objects.filter(
-                        patient=patient, 
-                        doctor=doctor
-                    ).exists():
-                        mapping = PatientDoctorMapping.objects.create(
-                            patient=patient,
-                            doctor=doctor,
-                            notes=notes
-                        )
-                        created_mappings.append(mapping)
-                    else:
-                        errors.append(f'Dr. {doctor.name} is already assigned to this patient')
-                        
-                except Doctor.DoesNotExist:
-                    errors.append(f'Doctor with ID {doctor_id} not found')
+            return Response({
+                'message': f'Doctors for patient {patient.name} retrieved successfully',
+                'patient': {
+                    'id': patient.id,
+                    'name': patient.name,
+                    'email': patient.email
+                },
+                'doctors': serializer.data,
+                'count': len(serializer.data)
+            }, status=status.HTTP_200_OK)
+        
+        except Patient.DoesNotExist:
+            return Response({
+                'error': 'Patient not found or you do not have permission to view this patient'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        except Exception as e:
+            return Response({
+                'error': 'Internal server error',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """Stream all mappings of the user's patients as NDJSON (default) or CSV (?format=csv)"""
+        try:
+            queryset = self.get_queryset().order_by(*self.keyset_ordering)
+            columns = export_columns(MappingExportSerializer())
+            return export_response(queryset, columns, request.accepted_renderer, 'mappings')
+        
+        except Exception as e:
+            return Response({
+                'error': 'Internal server error',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'])
+    def bulk_assign(self, request):
+        """Assign multiple doctors to one or more patients"""
+        try:
+            patient_ids = request.data.get('patient_ids')
+            single_patient = patient_ids is None
+            if single_patient:
+                patient_id = request.data.get('patient_id')
+                patient_ids = [patient_id] if patient_id else []
+            doctor_ids = request.data.get('doctor_ids', [])
+            notes = request.data.get('notes', '')
             
-            # Serialize created mappings
-            serializer = PatientDoctorMappingSerializer(created_mappings, many=True)
+            if not patient_ids or not doctor_ids:
+                return Response({
+                    'error': '(patient_id or patient_ids) and doctor_ids are required'
+                }, status=status.HTTP_400_BAD_REQUEST)
             
-            response_data = {
-                'message': f'{len(created_mappings)} doctors assigned successfully',
-                'created_mappings': serializer.data,
-                'created_count': len(created_mappings)
-            }
+            patient_ids, invalid_patient_ids = _parse_ids(patient_ids)
+            doctor_ids, invalid_doctor_ids = _parse_ids(doctor_ids)
+            if invalid_patient_ids or invalid_doctor_ids:
+                return Response({
+                    'error': 'patient and doctor IDs must be integers',
+                    'details': {
+                        'patient_ids': invalid_patient_ids,
+                        'doctor_ids': invalid_doctor_ids
+                    }
+                }, status=status.HTTP_400_BAD_REQUEST)
             
-            if errors:
-                response_data['errors'] = errors
-                response_data['error_count'] = len(errors)
+            if _wants_job(request):
+                job = enqueue(
+                    run_bulk_assign, user=request.user, user_id=request.user.pk,
+                    patient_ids=patient_ids, doctor_ids=doctor_ids, notes=notes,
+                    single_patient=single_patient
+                )
+                return Response({
+                    'message': 'Bulk assignment queued',
+                    'job': JobSerializer(job).data
+                }, status=status.HTTP_202_ACCEPTED, headers={
+                    'Location': reverse('job-detail', args=[job.pk])
+                })
             
+            response_data = assign_doctors(request.user, patient_ids, doctor_ids, notes, single_patient)
             return Response(response_data, status=status.HTTP_201_CREATED)
         
         except Patient.DoesNotExist:
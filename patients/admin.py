@@ -4,6 +4,7 @@ from .models import Patient
 @admin.register(Patient)
 class PatientAdmin(admin.ModelAdmin):
     list_display = ('name', 'email', 'phone', 'gender', 'created_by', 'created_at')
+    list_select_related = ('created_by',)
     list_filter = ('gender', 'created_at', 'created_by')
     search_fields = ('name', 'email', 'phone')
     readonly_fields = ('created_at', 'updated_at')
@@ -0,0 +1,141 @@
+"""
+Bulk patient import.
+
+Rows are validated with ``PatientSerializer``'s own fields, but without one
+uniqueness query per row: emails are checked against the rest of the upload
+in memory and against the database with one ``email__in`` query per batch.
+Valid rows are then written in chunks inside one transaction, with ``COPY``
+on PostgreSQL and ``bulk_create`` elsewhere.
+"""
+import io
+
+from django.db import connections, router, transaction
+from rest_framework import serializers
+from rest_framework.fields import empty
+
+from analytics.rollups import RollupDeltas
+
+from .models import Patient
+from .serializers import DUPLICATE_EMAIL_MESSAGE, PatientSerializer
+
+VALIDATION_BATCH_SIZE = 1000
+INSERT_BATCH_SIZE = 5000
+
+DUPLICATE_IN_UPLOAD = 'A patient with this email appears earlier in this upload.'
+
+
+class PatientImporter:
+    def __init__(self, user, validation_batch_size=VALIDATION_BATCH_SIZE,
+                 insert_batch_size=INSERT_BATCH_SIZE):
+        self.user = user
+        self.validation_batch_size = validation_batch_size
+        self.insert_batch_size = insert_batch_size
+        self.fields = [
+            field for field in PatientSerializer().fields.values()
+            if not field.read_only
+        ]
+
+    def run(self, rows):
+        """
+        Validate and insert ``rows`` (an iterable of dicts). Returns
+        ``(created_count, errors)`` where ``errors`` is a list of
+        ``{'row': <1-based row number>, 'errors': {...}}``.
+        """
+        patients, errors = self.validate(rows)
+        self.insert(patients)
+        return len(patients), errors
+
+    def insert(self, patients):
+        using = router.db_for_write(Patient)
+        with transaction.atomic(using=using):
+            if connections[using].vendor == 'postgresql':
+                for start in range(0, len(patients), self.insert_batch_size):
+                    self._copy(patients[start:start + self.insert_batch_size], using)
+            else:
+                Patient.objects.using(using).bulk_create(
+                    patients, batch_size=self.insert_batch_size
+                )
+            # Neither path sends post_save
+            RollupDeltas().patients(self.user.pk, len(patients)).apply(using)
+
+    def validate(self, rows):
+        patients, errors = [], []
+        seen_emails = set()
+        batch = []
+        for number, row in enumerate(rows, start=1):
+            batch.append((number, row))
+            if len(batch) >= self.validation_batch_size:
+                self._validate_batch(batch, seen_emails, patients, errors)
+                batch = []
+        if batch:
+            self._validate_batch(batch, seen_emails, patients, errors)
+        return patients, errors
+
+    def _validate_batch(self, batch, seen_emails, patients, errors):
+        valid = []
+        for number, row in batch:
+            if not isinstance(row, dict):
+                errors.append({'row': number, 'errors': {'non_field_errors': ['Expected an object.']}})
+                continue
+            data, row_errors = self.validate_row(row)
+            if row_errors:
+                errors.append({'row': number, 'errors': row_errors})
+            elif data['email'] in seen_emails:
+                errors.append({'row': number, 'errors': {'email': [DUPLICATE_IN_UPLOAD]}})
+            else:
+                seen_emails.add(data['email'])
+                valid.append((number, data))
+
+        existing = set(
+            Patient.objects.filter(
+                created_by=self.user,
+                email__in=[data['email'] for _, data in valid]
+            ).values_list('email', flat=True)
+        )
+        for number, data in valid:
+            if data['email'] in existing:
+                errors.append({'row': number, 'errors': {'email': [DUPLICATE_EMAIL_MESSAGE]}})
+            else:
+                patients.append(Patient(created_by=self.user, **data))
+
+    def _copy(self, patients, using):
+        fields = [field for field in Patient._meta.concrete_fields if not field.primary_key]
+        buffer = io.StringIO()
+        for patient in patients:
+            buffer.write('\t'.join(
+                _copy_value(field.pre_save(patient, add=True)) for field in fields
+            ))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        connection = connections[using]
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        table = connection.ops.quote_name(Patient._meta.db_table)
+        with connection.cursor() as cursor, connection.wrap_database_errors:
+            cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN', buffer)
+
+    def validate_row(self, row):
+        data, row_errors = {}, {}
+        for field in self.fields:
+            value = row.get(field.field_name, empty)
+            try:
+                validated = field.run_validation(value)
+            except serializers.ValidationError as exc:
+                row_errors[field.field_name] = exc.detail
+            except serializers.SkipField:
+                continue
+            else:
+                data[field.source] = validated
+        return data, row_errors
+
+
+def _copy_value(value):
+    """Encode one value for COPY's text format."""
+    if value is None:
+        return '\\N'
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
@@ -0,0 +1,62 @@
+import asyncio
+import json
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.models import CustomUser
+from healthcare_backend.loadgen import Request, run_load
+
+DEFAULT_PATHS = ['/api/patients/', '/api/doctors/']
+
+
+class Command(BaseCommand):
+    help = (
+        'Load a running server with many concurrent keep-alive clients and '
+        'report throughput and latency. Run it once against the server with '
+        'ASYNC_VIEWS_ENABLED=False and once with it set to compare sync and '
+        'async views. Uses only the standard library (asyncio streams).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server base URL (http only).')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help=f'Path to request; repeat for several (default: {", ".join(DEFAULT_PATHS)}).')
+        parser.add_argument('--clients', type=int, default=500, help='Concurrent clients (default: 500).')
+        parser.add_argument('--duration', type=float, default=20.0, help='Seconds to run (default: 20).')
+        parser.add_argument('--user', help='Email of the user to authenticate as (a token is minted locally).')
+        parser.add_argument('--token', help='Access token to use instead of --user.')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON.')
+
+    def handle(self, *args, **options):
+        token = options['token'] or self.mint_token(options['user'])
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError('Only http:// URLs are supported.')
+        requests = [Request('GET', path) for path in options['paths'] or DEFAULT_PATHS]
+        results = asyncio.run(run_load(
+            url.hostname, url.port or 80, requests, token,
+            options['clients'], options['duration'],
+        ))
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{results['requests']} requests in {results['duration']:.1f}s "
+            f"with {results['clients']} clients: {results['throughput']:.1f} req/s"
+        )
+        self.stdout.write(
+            f"latency ms  p50 {results['p50_ms']:.1f}  p95 {results['p95_ms']:.1f}  "
+            f"p99 {results['p99_ms']:.1f}  max {results['max_ms']:.1f}"
+        )
+        self.stdout.write(f"status codes {results['status_codes']}  connection errors {results['errors']}")
+
+    def mint_token(self, email):
+        if not email:
+            raise CommandError('Pass --user or --token.')
+        try:
+            user = CustomUser.objects.get(email=email)
+        except CustomUser.DoesNotExist:
+            raise CommandError(f'No user with email {email}.')
+        return str(RefreshToken.for_user(user).access_token)
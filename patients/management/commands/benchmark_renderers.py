@@ -0,0 +1,72 @@
+import gzip
+import time
+from datetime import date, datetime, timezone
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from authentication.models import CustomUser
+from healthcare_backend.renderers import FastJSONRenderer, orjson
+from patients.models import Patient
+from patients.serializers import PatientSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare render time and response size of the stdlib and fast JSON '
+        'renderers on a page of patients. Uses in-memory rows, no database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Patients per page (default: 1000).')
+        parser.add_argument('--repeat', type=int, default=20, help='Renders per renderer (default: 20).')
+
+    def handle(self, *args, **options):
+        page = self.build_page(options['rows'])
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed; FastJSONRenderer uses the stdlib path.'))
+
+        results = {}
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            name = renderer.__class__.__name__
+            body = renderer.render(page)
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                renderer.render(page)
+            elapsed = (time.perf_counter() - started) / options['repeat']
+            results[name] = body
+            self.stdout.write(f'{name:<18} {elapsed * 1000:8.2f} ms/render')
+
+        stdlib, fast = results['JSONRenderer'], results['FastJSONRenderer']
+        if stdlib != fast:
+            self.stdout.write(self.style.ERROR('Renderers produced different output.'))
+
+        self.stdout.write('')
+        self.stdout.write(f'{"identity":<18} {len(fast):10,d} bytes')
+        self.stdout.write(f'{"gzip (level 6)":<18} {len(gzip.compress(fast, compresslevel=6)):10,d} bytes')
+        if brotli is not None:
+            self.stdout.write(f'{"brotli (quality 4)":<18} {len(brotli.compress(fast, quality=4)):10,d} bytes')
+
+    def build_page(self, rows):
+        user = CustomUser(id=1, email='benchmark@example.com', username='benchmark', name='Benchmark')
+        created = datetime(2024, 1, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+        patients = [
+            Patient(
+                id=i, name=f'Patient {i}', email=f'patient{i}@example.com', phone='+1 555 0100',
+                date_of_birth=date(1980, 1, 1 + i % 28), gender='F' if i % 2 else 'M',
+                address=f'{i} Main Street, Springfield', medical_history='Hypertension; seasonal allergies.',
+                emergency_contact='Next of Kin', emergency_phone='+1 555 0199',
+                created_by=user, created_at=created, updated_at=created,
+            )
+            for i in range(1, rows + 1)
+        ]
+        # The shape of a paginated list response
+        return {
+            'count': rows, 'next': None, 'previous': None,
+            'results': PatientSerializer(patients, many=True).data,
+        }
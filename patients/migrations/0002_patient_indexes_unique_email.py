@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:27
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_emails(apps, schema_editor):
+    Patient = apps.get_model('patients', 'Patient')
+    duplicates = (
+        Patient.objects.using(schema_editor.connection.alias)
+        .values('created_by', 'email')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .count()
+    )
+    if duplicates:
+        raise RuntimeError(
+            f'{duplicates} (created_by, email) pairs are used by more than one '
+            f'patient. Merge or fix them before adding unique_patient_email_per_user.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='patient_owner_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='patient',
+            constraint=models.UniqueConstraint(fields=('created_by', 'email'), name='unique_patient_email_per_user'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# PostgreSQL only: the search_vector column is maintained by a trigger and
+# isn't a model field, so the ORM never reads or writes it. Other databases
+# use the substring fallback in patients/search.py.
+SEARCH_SQL = [
+    'ALTER TABLE patients_patient ADD COLUMN search_vector tsvector',
+    """
+    CREATE FUNCTION patients_patient_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.email, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.phone, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.medical_history, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER patients_patient_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, email, phone, medical_history ON patients_patient
+    FOR EACH ROW EXECUTE FUNCTION patients_patient_search_vector()
+    """,
+    # Backfill: the trigger fires on this no-op update.
+    'UPDATE patients_patient SET name = name',
+    'CREATE INDEX patient_search_vector_idx ON patients_patient USING gin (search_vector)',
+    'CREATE INDEX patient_name_trgm_idx ON patients_patient USING gin (name gin_trgm_ops)',
+    # Django compiles email__icontains to UPPER(email::text) LIKE UPPER(%s).
+    'CREATE INDEX patient_email_trgm_idx ON patients_patient USING gin ((UPPER(email::text)) gin_trgm_ops)',
+    """
+    CREATE INDEX patient_phone_digits_trgm_idx ON patients_patient
+    USING gin ((regexp_replace(phone, '[^0-9]', '', 'g')) gin_trgm_ops)
+    """,
+]
+
+REVERSE_SQL = [
+    'DROP INDEX IF EXISTS patient_phone_digits_trgm_idx',
+    'DROP INDEX IF EXISTS patient_email_trgm_idx',
+    'DROP INDEX IF EXISTS patient_name_trgm_idx',
+    'DROP INDEX IF EXISTS patient_search_vector_idx',
+    'DROP TRIGGER IF EXISTS patients_patient_search_vector_update ON patients_patient',
+    'DROP FUNCTION IF EXISTS patients_patient_search_vector()',
+    'ALTER TABLE patients_patient DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in SEARCH_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in REVERSE_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0002_patient_indexes_unique_email'),
+    ]
+
+    operations = [
+        # Skipped on databases other than PostgreSQL; needs the privilege
+        # to create extensions (or pg_trgm installed beforehand).
+        TrigramExtension(),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
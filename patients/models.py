@@ -25,6 +25,21 @@ class Patient(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # PatientViewSet.list: created_by = %s ORDER BY created_at DESC, id DESC
+            models.Index(fields=['created_by', '-created_at', '-id'], name='patient_owner_created_idx'),
+        ]
+        constraints = [
+            # Also serves (email, created_by) lookups
+            models.UniqueConstraint(fields=['created_by', 'email'], name='unique_patient_email_per_user'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.email}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The owner analytics.signals last counted; deferred reads as unknown
+        instance._loaded_owner = instance.__dict__.get('created_by_id')
+        return instance
@@ -0,0 +1,107 @@
+"""
+``?q=`` patient search.
+
+On PostgreSQL a patient matches when any of these hold, each backed by a
+GIN index from migration 0003:
+
+- the ``search_vector`` column (name, email, phone and medical history,
+  kept up to date by a trigger) matches every term of ``q`` as a prefix;
+- the name is word-similar to ``q`` (pg_trgm), which tolerates typos;
+- the email contains ``q``, or the phone digits contain the digits of ``q``.
+
+Results are ordered by full-text rank plus name similarity. Other databases
+(SQLite in development and tests) get a plain substring search over the same
+fields, ranked by which field matched.
+"""
+import re
+
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, CharField, F, Func, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+# pg_trgm indexes can't serve patterns shorter than a trigram.
+MIN_SUBSTRING_LENGTH = 3
+PHONE_SEPARATORS = (' ', '-', '(', ')', '+', '.')
+
+
+def search_terms(q):
+    return re.findall(r'\w+', q.lower())
+
+
+def search_patients(queryset, q):
+    """
+    Filter ``queryset`` to the patients matching ``q``, most relevant first
+    (ties newest first).
+    """
+    q = q.strip()
+    if not search_terms(q):
+        return queryset.none()
+    if connections[queryset.db].vendor == 'postgresql':
+        queryset, condition, rank = postgres_search(queryset, q)
+    else:
+        queryset, condition, rank = fallback_search(queryset, q)
+    return queryset.filter(condition).alias(search_rank=rank).order_by('-search_rank', '-created_at', '-id')
+
+
+def phone_digits(q):
+    return re.sub(r'\D', '', q)
+
+
+def postgres_search(queryset, q):
+    table = queryset.model._meta.db_table
+    query = SearchQuery(
+        ' & '.join(f"'{term}':*" for term in search_terms(q)),
+        config='simple', search_type='raw'
+    )
+    queryset = queryset.alias(
+        search_vector=RawSQL(f'"{table}"."search_vector"', [], output_field=SearchVectorField())
+    )
+    condition = Q(search_vector=query)
+    if len(q) >= MIN_SUBSTRING_LENGTH:
+        condition |= Q(TrigramWordSimilar(F('name'), q)) | Q(email__icontains=q)
+    digits = phone_digits(q)
+    if len(digits) >= MIN_SUBSTRING_LENGTH:
+        # Same expression as patient_phone_digits_trgm_idx
+        queryset = queryset.alias(phone_digits=Func(
+            F('phone'), Value('[^0-9]'), Value(''), Value('g'),
+            function='REGEXP_REPLACE', output_field=CharField()
+        ))
+        condition |= Q(phone_digits__contains=digits)
+    rank = SearchRank(F('search_vector'), query) + TrigramWordSimilarity(q, 'name')
+    return queryset, condition, rank
+
+
+def fallback_search(queryset, q):
+    phone = F('phone')
+    for separator in PHONE_SEPARATORS:
+        phone = Func(phone, Value(separator), Value(''), function='REPLACE', output_field=CharField())
+    queryset = queryset.alias(phone_digits=phone)
+
+    condition = Q()
+    for term in search_terms(q):
+        term_condition = (
+            Q(name__icontains=term) | Q(email__icontains=term)
+            | Q(medical_history__icontains=term)
+        )
+        if term.isdigit():
+            term_condition |= Q(phone_digits__contains=term)
+        condition &= term_condition
+    digits = phone_digits(q)
+    if len(digits) >= MIN_SUBSTRING_LENGTH:
+        condition |= Q(phone_digits__contains=digits)
+
+    weights = [
+        (Q(name__istartswith=q), 4),
+        (Q(name__icontains=q), 2),
+        (Q(email__icontains=q), 2),
+        (Q(medical_history__icontains=q), 1),
+    ]
+    if digits:
+        weights.append((Q(phone_digits__contains=digits), 2))
+    rank = sum((
+        Case(When(lookup, then=Value(weight)), default=Value(0), output_field=IntegerField())
+        for lookup, weight in weights
+    ), Value(0))
+    return queryset, condition, rank
@@ -1,7 +1,37 @@
+from contextlib import contextmanager
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from healthcare_backend.serializers import SparseFieldsetSerializerMixin
 from .models import Patient
 
-class PatientSerializer(serializers.ModelSerializer):
+DUPLICATE_EMAIL_MESSAGE = "A patient with this email already exists."
+EMAIL_CONSTRAINT = 'unique_patient_email_per_user'
+
+def _is_duplicate_email(exc):
+    diag = getattr(exc.__cause__, 'diag', None)
+    if diag is not None:
+        # psycopg reports which constraint failed
+        return diag.constraint_name == EMAIL_CONSTRAINT
+    message = str(exc)
+    if EMAIL_CONSTRAINT in message:
+        return True
+    # SQLite names the constraint's columns instead
+    constraint = next(c for c in Patient._meta.constraints if c.name == EMAIL_CONSTRAINT)
+    table = Patient._meta.db_table
+    columns = ', '.join(f'{table}.{Patient._meta.get_field(name).column}' for name in constraint.fields)
+    return message == f'UNIQUE constraint failed: {columns}'
+
+@contextmanager
+def _unique_email_errors():
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if not _is_duplicate_email(exc):
+            raise
+        raise serializers.ValidationError({'email': [DUPLICATE_EMAIL_MESSAGE]})
+
+class PatientSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     created_by = serializers.StringRelatedField(read_only=True)
     
     class Meta:
@@ -14,18 +44,16 @@ class PatientSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ('id', 'created_by', 'created_at', 'updated_at')
 
-    def validate_email(self, value):
-        # Check if email is unique for the current user
-        user = self.context['request'].user
-        queryset = Patient.objects.filter(email=value, created_by=user)
-        
-        # If updating, exclude current instance
-        if self.instance:
-            queryset = queryset.exclude(pk=self.instance.pk)
-            
-        if queryset.exists():
-            raise serializers.ValidationError("A patient with this email already exists.")
-        return value
+    # Email uniqueness per created_by is enforced by the
+    # unique_patient_email_per_user constraint instead of a SELECT before
+    # every write; a violation is reported as a normal email error.
+    def create(self, validated_data):
+        with _unique_email_errors():
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with _unique_email_errors():
+            return super().update(instance, validated_data)
 
 class PatientCreateSerializer(PatientSerializer):
     class Meta(PatientSerializer.Meta):
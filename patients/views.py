@@ -1,19 +1,48 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ParseError, ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import IntegrityError
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from healthcare_backend.async_views import AsyncViewSetMixin
+from healthcare_backend.deletion import delete_or_start
+from jobs.serializers import JobSerializer
+from healthcare_backend.export import export_columns, export_response
+from healthcare_backend.mixins import ConditionalGetMixin, SparseFieldsetMixin
+from healthcare_backend.parsers import CSVParser, FastJSONParser, NDJSONParser, parse_upload
+from healthcare_backend.renderers import CSVRenderer, NDJSONRenderer
+from .importer import PatientImporter
 from .models import Patient
+from .search import search_patients
 from .serializers import PatientSerializer, PatientCreateSerializer, PatientUpdateSerializer
 
-class PatientViewSet(viewsets.ModelViewSet):
+class PatientViewSet(ConditionalGetMixin, SparseFieldsetMixin, AsyncViewSetMixin, viewsets.ModelViewSet):
     serializer_class = PatientSerializer
     permission_classes = [IsAuthenticated]
+    select_related_fields = ('created_by',)
+    keyset_ordering = ('-created_at', '-id')
+    async_actions = {'list': 'alist', 'retrieve': 'aretrieve'}
 
     def get_queryset(self):
         # Users can only see patients they created
         return Patient.objects.filter(created_by=self.request.user)
 
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        search_query = self.get_search_query()
+        if search_query:
+            queryset = search_patients(queryset, search_query)
+        return queryset
+
+    def get_search_query(self):
+        """The ``?q=`` search of a list request, or an empty string"""
+        if self.action != 'list' or self.request is None:
+            return ''
+        return self.request.query_params.get('q', '').strip()
+
     def get_serializer_class(self):
         if self.action == 'create':
             return PatientCreateSerializer
@@ -39,6 +68,12 @@ class PatientViewSet(viewsets.ModelViewSet):
                 'details': serializer.errors
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        except ValidationError as e:
+            return Response({
+                'error': 'Patient creation failed',
+                'details': e.detail
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         except Exception as e:
             return Response({
                 'error': 'Internal server error',
@@ -47,7 +82,7 @@ class PatientViewSet(viewsets.ModelViewSet):
 
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
+            queryset = self.filter_queryset(self.get_queryset())
             page = self.paginate_queryset(queryset)
             
             if page is not None:
@@ -61,6 +96,39 @@ class PatientViewSet(viewsets.ModelViewSet):
                 'count': queryset.count()
             }, status=status.HTTP_200_OK)
         
+        except NotFound as e:
+            return Response({
+                'error': str(e.detail)
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        except Exception as e:
+            return Response({
+                'error': 'Internal server error',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def alist(self, request, *args, **kwargs):
+        try:
+            queryset = self.filter_queryset(self.get_queryset())
+            page = await self.apaginate_queryset(queryset)
+            
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            
+            patients = [patient async for patient in queryset]
+            serializer = self.get_serializer(patients, many=True)
+            return Response({
+                'message': 'Patients retrieved successfully',
+                'patients': serializer.data,
+                'count': len(patients)
+            }, status=status.HTTP_200_OK)
+        
+        except NotFound as e:
+            return Response({
+                'error': str(e.detail)
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         except Exception as e:
             return Response({
                 'error': 'Internal server error',
@@ -87,6 +155,26 @@ class PatientViewSet(viewsets.ModelViewSet):
                 'details': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    async def aretrieve(self, request, *args, **kwargs):
+        try:
+            instance = await self.aget_object()
+            serializer = self.get_serializer(instance)
+            return Response({
+                'message': 'Patient retrieved successfully',
+                'patient': serializer.data
+            }, status=status.HTTP_200_OK)
+        
+        except Patient.DoesNotExist:
+            return Response({
+                'error': 'Patient not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        except Exception as e:
+            return Response({
+                'error': 'Internal server error',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     def update(self, request, *args, **kwargs):
         try:
             partial = kwargs.pop('partial', False)
@@ -105,6 +193,12 @@ class PatientViewSet(viewsets.ModelViewSet):
                 'details': serializer.errors
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        except ValidationError as e:
+            return Response({
+                'error': 'Patient update failed',
+                'details': e.detail
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         except Patient.DoesNotExist:
             return Response({
                 'error': 'Patient not found'
@@ -119,7 +213,15 @@ class PatientViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
-            self.perform_destroy(instance)
+            # Large deletes are queued; poll the job
+            job = delete_or_start(instance, request.user)
+            if job is not None:
+                return Response({
+                    'message': 'Patient deletion queued',
+                    'job': JobSerializer(job).data
+                }, status=status.HTTP_202_ACCEPTED, headers={
+                    'Location': reverse('job-detail', args=[job.pk])
+                })
             return Response({
                 'message': 'Patient deleted successfully'
             }, status=status.HTTP_200_OK)
@@ -134,3 +236,71 @@ class PatientViewSet(viewsets.ModelViewSet):
                 'error': 'Internal server error',
                 'details': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """Stream all of the user's patients as NDJSON (default) or CSV (?format=csv)"""
+        try:
+            queryset = self.get_queryset().order_by(*self.keyset_ordering)
+            columns = export_columns(
+                PatientSerializer(),
+                lookups={'created_by': 'created_by__email'}
+            )
+            return export_response(queryset, columns, request.accepted_renderer, 'patients')
+        
+        except Exception as e:
+            return Response({
+                'error': 'Internal server error',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(
+        detail=False, methods=['post'], url_path='import', url_name='import',
+        parser_classes=[NDJSONParser, CSVParser, FastJSONParser, MultiPartParser]
+    )
+    def import_patients(self, request):
+        """Bulk-create patients from an NDJSON or CSV body (or a `file` upload)"""
+        try:
+            if 'file' in request.FILES:
+                rows = parse_upload(request.FILES['file'])
+            else:
+                rows = request.data
+            
+            if not isinstance(rows, list) or not rows:
+                return Response({
+                    'error': 'Upload NDJSON or CSV rows, a JSON list, or a file field'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            created_count, errors = PatientImporter(request.user).run(rows)
+            
+            response_data = {
+                'message': f'{created_count} patients imported successfully',
+                'created_count': created_count
+            }
+            if errors:
+                response_data['errors'] = errors
+                response_data['error_count'] = len(errors)
+            
+            if not created_count and errors:
+                response_data['error'] = 'Patient import failed'
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+            
+            return Response(response_data, status=status.HTTP_201_CREATED)
+        
+        except ParseError as e:
+            return Response({
+                'error': 'Patient import failed',
+                'details': str(e.detail)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        except IntegrityError:
+            return Response({
+                'error': 'Patient import failed',
+                'details': 'Patients with the same email were created concurrently; nothing was imported, retry the upload.'
+            }, status=status.HTTP_409_CONFLICT)
+        
+        except Exception as e:
+            return Response({
+                'error': 'Internal server error',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)